@@ -6,7 +6,8 @@ Example script demonstrating batch processing of repositories.
 import os
 import sys
 import argparse
-import json
+import orjson
+from collections import Counter
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
@@ -15,39 +16,40 @@ from tqdm import tqdm
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Import project modules
-from src.api.github_client import GitHubClient
+from src.api.github_client import GitHubClient, README_NOT_MODIFIED
 from src.processor.content_processor import ContentProcessor
 from src.embeddings.embedding_manager import EmbeddingManager
 from src.search.search_engine import SearchEngine
 from src.storage.storage_manager import StorageManager
 from src.cli.utils import load_config
 
-def process_repository(repo, github_client, content_processor, storage_manager, embedding_manager):
+def process_repository(repo, readme_content, content_processor, storage_manager):
     """
-    Process a single repository.
+    Chunk and store a single repository.
+    
+    Embeddings are not generated here; the chunks are returned so they can be
+    embedded together with the chunks of the other repositories.
     
     Args:
         repo (dict): Repository data
-        github_client (GitHubClient): GitHub client
+        readme_content (str): README content, README_NOT_MODIFIED or None if not found
         content_processor (ContentProcessor): Content processor
         storage_manager (StorageManager): Storage manager
-        embedding_manager (EmbeddingManager): Embedding manager
     
     Returns:
-        tuple: (repo_id, success)
+        tuple: (repo_id, status, chunks)
     """
     repo_id = repo["id"]
     
     try:
-        # Skip if already processed and not outdated
-        if storage_manager.has_repository(repo_id) and not storage_manager.is_repository_outdated(repo):
-            return repo_id, "skipped"
-        
-        # Extract README
-        readme_content = github_client.get_readme(repo["full_name"])
+        # The README hasn't changed since it was last processed, only refresh the metadata
+        if readme_content is README_NOT_MODIFIED:
+            if not storage_manager.update_repository_metadata(repo):
+                return repo_id, "error: metadata update failed", None
+            return repo_id, "skipped", None
         
         if not readme_content:
-            return repo_id, "no_readme"
+            return repo_id, "no_readme", None
         
         # Process content
         chunks = content_processor.process_readme(readme_content, repo)
@@ -55,19 +57,17 @@ def process_repository(repo, github_client, content_processor, storage_manager,
         # Store repository data
         storage_manager.store_repository(repo, readme_content, chunks)
         
-        # Generate embeddings
-        embedding_manager.generate_embeddings(repo_id, chunks)
-        
-        return repo_id, "success"
+        return repo_id, "success", chunks
     
     except Exception as e:
-        return repo_id, f"error: {str(e)}"
+        return repo_id, f"error: {str(e)}", None
 
 def main():
     """Run the batch processing example."""
     parser = argparse.ArgumentParser(description="Batch process GitHub repositories")
     parser.add_argument("--limit", type=int, help="Limit the number of repositories to process")
-    parser.add_argument("--workers", type=int, default=4, help="Number of worker threads")
+    parser.add_argument("--workers", type=int, default=4, help="Number of worker threads for processing READMEs")
+    parser.add_argument("--concurrency", type=int, help="Number of concurrent README requests")
     parser.add_argument("--output", type=str, help="Output file for processing results")
     parser.add_argument("--force", action="store_true", help="Force processing of all repositories")
     args = parser.parse_args()
@@ -87,37 +87,83 @@ def main():
     print("\nFetching repositories...")
     repositories = github_client.get_starred_repositories(limit=args.limit)
     
-    print(f"\nProcessing {len(repositories)} repositories with {args.workers} workers...")
+    # Skip repositories that are already processed and not outdated
+    results = {}
+    to_process = []
+    for repo in repositories:
+        if not args.force and storage_manager.has_repository(repo["id"]) and not storage_manager.is_repository_outdated(repo):
+            results[repo["full_name"]] = "skipped"
+        else:
+            to_process.append(repo)
+    
+    # Fetch READMEs concurrently; network requests don't need a thread each
+    concurrency = args.concurrency or github_client.concurrency
+    print(f"\nFetching READMEs for {len(to_process)} repositories with {concurrency} concurrent requests...")
+    
+    # Send the stored README ETags so unchanged READMEs come back as 304 Not Modified
+    stored_etags = {} if args.force else storage_manager.get_readme_etags()
+    etags = {
+        repo["full_name"]: stored_etags[repo["full_name"]] for repo in to_process
+        if repo["full_name"] in stored_etags and storage_manager.has_repository(repo["id"])
+    }
+    readmes = github_client.get_readmes([repo["full_name"] for repo in to_process], concurrency=concurrency, etags=etags)
+    
+    print(f"\nProcessing {len(to_process)} repositories with {args.workers} workers...")
     
     # Process repositories in parallel
-    results = {}
+    repo_chunks = {}
+    repo_names = {}
     with ThreadPoolExecutor(max_workers=args.workers) as executor:
         # Submit tasks
         futures = {
             executor.submit(
                 process_repository, 
                 repo, 
-                github_client, 
+                readmes.get(repo["full_name"]), 
                 content_processor, 
-                storage_manager, 
-                embedding_manager
-            ): repo["full_name"] for repo in repositories
+                storage_manager
+            ): repo["full_name"] for repo in to_process
         }
         
-        # Process results as they complete
-        for future in tqdm(as_completed(futures), total=len(futures), desc="Processing"):
+        # Process results as they complete, redrawing the progress bar about 100 times in total
+        progress = tqdm(
+            as_completed(futures), total=len(futures), desc="Processing",
+            mininterval=0.5, miniters=max(1, len(futures) // 100)
+        )
+        for future in progress:
             repo_name = futures[future]
             try:
-                repo_id, status = future.result()
+                repo_id, status, chunks = future.result()
                 results[repo_name] = status
+                if chunks:
+                    repo_chunks[repo_id] = chunks
+                    repo_names[repo_id] = repo_name
             except Exception as e:
                 results[repo_name] = f"error: {str(e)}"
     
-    # Summarize results
-    success_count = sum(1 for status in results.values() if status == "success")
-    skipped_count = sum(1 for status in results.values() if status == "skipped")
-    no_readme_count = sum(1 for status in results.values() if status == "no_readme")
-    error_count = sum(1 for status in results.values() if status.startswith("error"))
+    # Embed the chunks of all processed repositories in large batches
+    if repo_chunks:
+        chunk_count = sum(len(chunks) for chunks in repo_chunks.values())
+        print(f"\nGenerating embeddings for {chunk_count} chunks from {len(repo_chunks)} repositories...")
+        embedded = embedding_manager.generate_embeddings_batch(repo_chunks)
+        saved = embedding_manager.flush()
+        
+        for repo_id, success in embedded.items():
+            if not success:
+                results[repo_names[repo_id]] = "error: embedding failed"
+            elif not saved:
+                results[repo_names[repo_id]] = "error: saving embeddings failed"
+        
+        if not saved:
+            print("\nError saving the embeddings index, run again with --force to embed the repositories again.")
+    
+    # Only remember the ETags of READMEs that made it into the index
+    storage_manager.update_readme_etags({name: etag for name, etag in etags.items() if results.get(name) == "success"})
+    
+    # Summarize results in a single pass, counting every "error: ..." status as an error
+    counts = Counter("error" if status.startswith("error") else status for status in results.values())
+    success_count, skipped_count = counts["success"], counts["skipped"]
+    no_readme_count, error_count = counts["no_readme"], counts["error"]
     
     print("\nProcessing complete!")
     print(f"  Success: {success_count}")
@@ -125,10 +171,13 @@ def main():
     print(f"  No README: {no_readme_count}")
     print(f"  Errors: {error_count}")
     
+    cache_stats = embedding_manager.get_cache_stats()
+    print(f"  Embedding cache hit rate: {cache_stats['hit_rate']:.1%} ({cache_stats['hits']} hits, {cache_stats['misses']} misses)")
+    
     # Save results to file if requested
     if args.output:
-        with open(args.output, "w") as f:
-            json.dump(results, f, indent=2)
+        with open(args.output, "wb") as f:
+            f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
         print(f"\nResults saved to {args.output}")
     
     # Perform a test search
@@ -5,15 +5,22 @@ Example script demonstrating how to export search results to different formats.
 
 import os
 import sys
-import json
 import csv
+import orjson
+import numpy as np
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
-import xml.dom.minidom as minidom
-import xml.etree.ElementTree as ET
+from xml.sax.saxutils import XMLGenerator
 from rich.console import Console
 
+# Polars writes CSV in compiled code, the csv module is used when it isn't installed
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
 # Add the parent directory to the path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -25,46 +32,102 @@ from src.search.search_engine import SearchEngine
 from src.storage.storage_manager import StorageManager
 from src.cli.utils import load_config
 
-def export_to_json(results, output_file):
+def _truncate(text, length):
     """
-    Export search results to JSON format.
+    Truncate text to a snippet.
+    
+    Args:
+        text (str): Text to truncate, may be None
+        length (int): Maximum snippet length
+    
+    Returns:
+        str: Snippet, with an ellipsis if the text was truncated
+    """
+    return text if text is None or len(text) <= length else text[:length] + "..."
+
+def _to_soa(results):
+    """
+    Convert search results into columns shared by all exporters.
     
     Args:
         results (list): Search results
+    
+    Returns:
+        dict: Column name to list (or array) of values, one entry per result, plus
+              the generation time shared by all formats
+    """
+    repos = [result["repository"] for result in results]
+    texts = [result.get("text") or "" for result in results]
+    scores = np.asarray([result["score"] for result in results])
+    
+    return {
+        "generated_at": datetime.now(),
+        "ids": [result["id"] for result in results],
+        "scores": scores,
+        "score_labels": [f"{score:.2f}" for score in scores],
+        "chunk_types": [result.get("chunk_type") for result in results],
+        "short_snippets": [_truncate(text, 200) for text in texts],
+        "snippets": [_truncate(text, 300) for text in texts],
+        "repo_ids": [repo["id"] for repo in repos],
+        "names": [repo["full_name"] for repo in repos],
+        "descriptions": [repo.get("description") for repo in repos],
+        "urls": [repo.get("html_url") for repo in repos],
+        "languages": [repo.get("language") for repo in repos],
+        "stars": [repo.get("stargazers_count", 0) for repo in repos],
+        "forks": [repo.get("forks_count", 0) for repo in repos],
+        "watchers": [repo.get("watchers_count") for repo in repos],
+        "created_at": [repo.get("created_at") for repo in repos],
+        "updated_at": [repo.get("updated_at") for repo in repos]
+    }
+
+def export_to_json(columns, output_file):
+    """
+    Export search results to JSON format.
+    
+    Args:
+        columns (dict): Search result columns from _to_soa
         output_file (str): Output file path
     """
     # Convert results to serializable format
-    serializable_results = []
-    for result in results:
-        serializable_results.append({
-            "id": result["id"],
-            "score": result["score"],
+    serializable_results = [
+        {
+            "id": result_id,
+            "score": score,
             "repository": {
-                "id": result["repository"]["id"],
-                "full_name": result["repository"]["full_name"],
-                "description": result["repository"].get("description"),
-                "html_url": result["repository"].get("html_url"),
-                "language": result["repository"].get("language"),
-                "stargazers_count": result["repository"].get("stargazers_count"),
-                "forks_count": result["repository"].get("forks_count"),
-                "watchers_count": result["repository"].get("watchers_count"),
-                "created_at": result["repository"].get("created_at"),
-                "updated_at": result["repository"].get("updated_at")
+                "id": repo_id,
+                "full_name": name,
+                "description": description,
+                "html_url": url,
+                "language": language,
+                "stargazers_count": stars,
+                "forks_count": forks,
+                "watchers_count": watchers,
+                "created_at": created_at,
+                "updated_at": updated_at
             },
-            "chunk_type": result.get("chunk_type"),
-            "text_snippet": result.get("text", "")[:200] + "..." if result.get("text") and len(result.get("text", "")) > 200 else result.get("text", "")
-        })
+            "chunk_type": chunk_type,
+            "text_snippet": snippet
+        }
+        for result_id, score, repo_id, name, description, url, language, stars, forks, watchers, created_at, updated_at, chunk_type, snippet in zip(
+            columns["ids"], columns["scores"].tolist(), columns["repo_ids"], columns["names"], columns["descriptions"],
+            columns["urls"], columns["languages"], columns["stars"], columns["forks"], columns["watchers"],
+            columns["created_at"], columns["updated_at"], columns["chunk_types"], columns["short_snippets"]
+        )
+    ]
     
     # Write to file
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump({"results": serializable_results, "timestamp": datetime.now().isoformat()}, f, indent=2)
+    with open(output_file, "wb") as f:
+        f.write(orjson.dumps(
+            {"results": serializable_results, "timestamp": columns["generated_at"].isoformat()},
+            option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+        ))
 
-def export_to_csv(results, output_file):
+def export_to_csv(columns, output_file):
     """
     Export search results to CSV format.
     
     Args:
-        results (list): Search results
+        columns (dict): Search result columns from _to_soa
         output_file (str): Output file path
     """
     # Define CSV fields
@@ -72,72 +135,60 @@ def export_to_csv(results, output_file):
         "id", "score", "repository_id", "repository_name", "description", 
         "language", "stars", "forks", "url", "chunk_type"
     ]
+    values = [
+        columns["ids"], columns["scores"].tolist(), columns["repo_ids"], columns["names"], columns["descriptions"],
+        columns["languages"], columns["stars"], columns["forks"], columns["urls"], columns["chunk_types"]
+    ]
+    
+    # Build the DataFrame straight from the columns and let Polars format every row
+    if pl is not None:
+        pl.DataFrame(dict(zip(fields, values)), strict=False).write_csv(output_file)
+        return
     
     # Write to file
     with open(output_file, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fields)
-        writer.writeheader()
-        
-        for result in results:
-            repo = result["repository"]
-            writer.writerow({
-                "id": result["id"],
-                "score": result["score"],
-                "repository_id": repo["id"],
-                "repository_name": repo["full_name"],
-                "description": repo.get("description", ""),
-                "language": repo.get("language", ""),
-                "stars": repo.get("stargazers_count", 0),
-                "forks": repo.get("forks_count", 0),
-                "url": repo.get("html_url", ""),
-                "chunk_type": result.get("chunk_type", "")
-            })
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        writer.writerows(zip(*values))
 
-def export_to_markdown(results, output_file):
+# Markdown document header and per-result templates
+MARKDOWN_HEADER_TEMPLATE = "# Search Results\n\nGenerated on: {generated_at:%Y-%m-%d %H:%M:%S}\n\n"
+MARKDOWN_RESULT_TEMPLATE = "## {index}. [{full_name}]({url})\n\n**Score:** {score}\n\n"
+MARKDOWN_DESCRIPTION_TEMPLATE = "**Description:** {description}\n\n"
+MARKDOWN_META_TEMPLATE = "**Language:** {language}  \n**Stars:** {stars}  \n**Forks:** {forks}  \n\n"
+MARKDOWN_CONTENT_TEMPLATE = "**Matching Content:**\n\n```\n{text}\n```\n\n"
+
+def export_to_markdown(columns, output_file):
     """
     Export search results to Markdown format.
     
     Args:
-        results (list): Search results
+        columns (dict): Search result columns from _to_soa
         output_file (str): Output file path
     """
-    # Generate markdown content
-    markdown_content = f"# Search Results\n\n"
-    markdown_content += f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-    
-    for i, result in enumerate(results, 1):
-        repo = result["repository"]
-        
-        markdown_content += f"## {i}. [{repo['full_name']}]({repo.get('html_url', '')})\n\n"
-        markdown_content += f"**Score:** {result['score']:.2f}\n\n"
-        
-        if repo.get("description"):
-            markdown_content += f"**Description:** {repo.get('description')}\n\n"
-        
-        markdown_content += f"**Language:** {repo.get('language', 'Unknown')}  \n"
-        markdown_content += f"**Stars:** {repo.get('stargazers_count', 0)}  \n"
-        markdown_content += f"**Forks:** {repo.get('forks_count', 0)}  \n\n"
-        
-        if result.get("text"):
-            markdown_content += "**Matching Content:**\n\n"
-            markdown_content += f"```\n{result.get('text', '')[:300]}...\n```\n\n"
-        
-        markdown_content += "---\n\n"
-    
-    # Write to file
+    # Write each result as it is formatted instead of building the whole document in memory
     with open(output_file, "w", encoding="utf-8") as f:
-        f.write(markdown_content)
+        f.write(MARKDOWN_HEADER_TEMPLATE.format_map(columns))
+        
+        rows = zip(
+            columns["names"], columns["urls"], columns["score_labels"], columns["descriptions"],
+            columns["languages"], columns["stars"], columns["forks"], columns["snippets"]
+        )
+        for i, (name, url, score, description, language, stars, forks, snippet) in enumerate(rows, 1):
+            f.write(MARKDOWN_RESULT_TEMPLATE.format_map({"index": i, "full_name": name, "url": url or "", "score": score}))
+            
+            if description:
+                f.write(MARKDOWN_DESCRIPTION_TEMPLATE.format_map({"description": description}))
+            
+            f.write(MARKDOWN_META_TEMPLATE.format_map({"language": language or "Unknown", "stars": stars, "forks": forks}))
+            
+            if snippet:
+                f.write(MARKDOWN_CONTENT_TEMPLATE.format_map({"text": snippet}))
+            
+            f.write("---\n\n")
 
-def export_to_html(results, output_file):
-    """
-    Export search results to HTML format.
-    
-    Args:
-        results (list): Search results
-        output_file (str): Output file path
-    """
-    # Generate HTML content
-    html_content = """<!DOCTYPE html>
+# HTML document header, written once before the results
+HTML_HEADER = """<!DOCTYPE html>
 <html>
 <head>
     <title>GitHub Stars Search Results</title>
@@ -204,101 +255,167 @@ def export_to_html(results, output_file):
 </head>
 <body>
     <h1>GitHub Stars Search Results</h1>
-    <div class="timestamp">Generated on: """ + datetime.now().strftime('%Y-%m-%d %H:%M:%S') + """</div>
 """
-    
-    for i, result in enumerate(results, 1):
-        repo = result["repository"]
-        
-        html_content += f"""
+
+HTML_TIMESTAMP_TEMPLATE = """    <div class="timestamp">Generated on: {generated_at:%Y-%m-%d %H:%M:%S}</div>
+"""
+
+HTML_FOOTER = """
+</body>
+</html>
+"""
+
+# Per-result HTML templates
+HTML_RESULT_TEMPLATE = """
     <div class="result">
-        <h2><a href="{repo.get('html_url', '')}" target="_blank">{repo['full_name']}</a></h2>
+        <h2><a href="{url}" target="_blank">{full_name}</a></h2>
         <div class="result-meta">
-            <span>Language: {repo.get('language', 'Unknown')}</span>
-            <span>Stars: {repo.get('stargazers_count', 0)}</span>
-            <span>Forks: {repo.get('forks_count', 0)}</span>
-            <span class="result-score">Score: {result['score']:.2f}</span>
+            <span>Language: {language}</span>
+            <span>Stars: {stars}</span>
+            <span>Forks: {forks}</span>
+            <span class="result-score">Score: {score}</span>
         </div>
 """
-        
-        if repo.get("description"):
-            html_content += f"""
+
+HTML_DESCRIPTION_TEMPLATE = """
         <div class="result-description">
-            {repo.get('description')}
+            {description}
         </div>
 """
-        
-        if result.get("text"):
-            text_snippet = result.get('text', '')[:300] + "..." if len(result.get('text', '')) > 300 else result.get('text', '')
-            html_content += f"""
+
+HTML_CONTENT_TEMPLATE = """
         <div class="result-content">
-{text_snippet}
+{text}
         </div>
 """
-        
-        html_content += """
+
+HTML_RESULT_END = """
     </div>
 """
-    
-    html_content += """
-</body>
-</html>
-"""
-    
-    # Write to file
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(html_content)
 
-def export_to_xml(results, output_file):
+def export_to_html(columns, output_file):
     """
-    Export search results to XML format.
+    Export search results to HTML format.
     
     Args:
-        results (list): Search results
+        columns (dict): Search result columns from _to_soa
         output_file (str): Output file path
     """
-    # Create XML structure
-    root = ET.Element("searchResults")
-    root.set("timestamp", datetime.now().isoformat())
-    
-    for result in results:
-        repo = result["repository"]
-        
-        result_elem = ET.SubElement(root, "result")
-        result_elem.set("id", str(result["id"]))
-        result_elem.set("score", str(result["score"]))
-        
-        repo_elem = ET.SubElement(result_elem, "repository")
-        
-        # Add repository details
-        ET.SubElement(repo_elem, "id").text = str(repo["id"])
-        ET.SubElement(repo_elem, "fullName").text = repo["full_name"]
-        
-        if repo.get("description"):
-            ET.SubElement(repo_elem, "description").text = repo.get("description")
-        
-        if repo.get("html_url"):
-            ET.SubElement(repo_elem, "url").text = repo.get("html_url")
-        
-        if repo.get("language"):
-            ET.SubElement(repo_elem, "language").text = repo.get("language")
-        
-        ET.SubElement(repo_elem, "stars").text = str(repo.get("stargazers_count", 0))
-        ET.SubElement(repo_elem, "forks").text = str(repo.get("forks_count", 0))
+    # Write each result as it is formatted instead of building the whole document in memory
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(HTML_HEADER)
+        f.write(HTML_TIMESTAMP_TEMPLATE.format_map(columns))
         
-        if result.get("chunk_type"):
-            ET.SubElement(result_elem, "chunkType").text = result.get("chunk_type")
+        rows = zip(
+            columns["urls"], columns["names"], columns["languages"], columns["stars"], columns["forks"],
+            columns["score_labels"], columns["descriptions"], columns["snippets"]
+        )
+        for url, name, language, stars, forks, score, description, snippet in rows:
+            f.write(HTML_RESULT_TEMPLATE.format_map({
+                "url": url or "",
+                "full_name": name,
+                "language": language or "Unknown",
+                "stars": stars,
+                "forks": forks,
+                "score": score
+            }))
+            
+            if description:
+                f.write(HTML_DESCRIPTION_TEMPLATE.format_map({"description": description}))
+            
+            if snippet:
+                f.write(HTML_CONTENT_TEMPLATE.format_map({"text": snippet}))
+            
+            f.write(HTML_RESULT_END)
         
-        if result.get("text"):
-            text_snippet = result.get('text', '')[:300] + "..." if len(result.get('text', '')) > 300 else result.get('text', '')
-            ET.SubElement(result_elem, "textSnippet").text = text_snippet
+        f.write(HTML_FOOTER)
+
+def _write_xml_element(generator, name, text, depth, attributes=None):
+    """
+    Write an indented XML element with text content.
     
-    # Format XML with proper indentation
-    xml_str = minidom.parseString(ET.tostring(root)).toprettyxml(indent="  ")
+    Args:
+        generator (XMLGenerator): SAX XML writer
+        name (str): Element name
+        text (str): Element text
+        depth (int): Indentation depth
+        attributes (dict): Element attributes
+    """
+    generator.ignorableWhitespace("  " * depth)
+    generator.startElement(name, attributes or {})
+    generator.characters(text)
+    generator.endElement(name)
+    generator.ignorableWhitespace("\n")
+
+def export_to_xml(columns, output_file):
+    """
+    Export search results to XML format.
     
-    # Write to file
+    Args:
+        columns (dict): Search result columns from _to_soa
+        output_file (str): Output file path
+    """
+    # Stream SAX events per result instead of building and re-parsing a document tree
     with open(output_file, "w", encoding="utf-8") as f:
-        f.write(xml_str)
+        generator = XMLGenerator(f, encoding="utf-8", short_empty_elements=True)
+        generator.startDocument()
+        generator.startElement("searchResults", {"timestamp": columns["generated_at"].isoformat()})
+        generator.ignorableWhitespace("\n")
+        
+        rows = zip(
+            columns["ids"], columns["scores"].tolist(), columns["repo_ids"], columns["names"], columns["descriptions"],
+            columns["urls"], columns["languages"], columns["stars"], columns["forks"], columns["chunk_types"],
+            columns["snippets"]
+        )
+        for result_id, score, repo_id, name, description, url, language, stars, forks, chunk_type, snippet in rows:
+            generator.ignorableWhitespace("  ")
+            generator.startElement("result", {"id": str(result_id), "score": str(score)})
+            generator.ignorableWhitespace("\n    ")
+            generator.startElement("repository", {})
+            generator.ignorableWhitespace("\n")
+            
+            # Add repository details
+            _write_xml_element(generator, "id", str(repo_id), 3)
+            _write_xml_element(generator, "fullName", name, 3)
+            
+            if description:
+                _write_xml_element(generator, "description", description, 3)
+            
+            if url:
+                _write_xml_element(generator, "url", url, 3)
+            
+            if language:
+                _write_xml_element(generator, "language", language, 3)
+            
+            _write_xml_element(generator, "stars", str(stars), 3)
+            _write_xml_element(generator, "forks", str(forks), 3)
+            
+            generator.ignorableWhitespace("    ")
+            generator.endElement("repository")
+            generator.ignorableWhitespace("\n")
+            
+            if chunk_type:
+                _write_xml_element(generator, "chunkType", chunk_type, 2)
+            
+            if snippet:
+                _write_xml_element(generator, "textSnippet", snippet, 2)
+            
+            generator.ignorableWhitespace("  ")
+            generator.endElement("result")
+            generator.ignorableWhitespace("\n")
+        
+        generator.endElement("searchResults")
+        generator.ignorableWhitespace("\n")
+        generator.endDocument()
+
+# Export format to display name, exporter function and file extension
+EXPORTERS = {
+    "json": ("JSON", export_to_json, "json"),
+    "csv": ("CSV", export_to_csv, "csv"),
+    "markdown": ("Markdown", export_to_markdown, "md"),
+    "html": ("HTML", export_to_html, "html"),
+    "xml": ("XML", export_to_xml, "xml")
+}
 
 def main():
     """Run the export results example."""
@@ -344,34 +461,35 @@ def main():
     output_dir = Path(args.output_dir)
     output_dir.mkdir(exist_ok=True, parents=True)
     
+    # Convert the results to columns once for all exporters
+    columns = _to_soa(results)
+    
     # Generate timestamp for filenames
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    timestamp = columns["generated_at"].strftime("%Y%m%d_%H%M%S")
     
     # Export results in the requested format(s)
-    if args.format == "json" or args.format == "all":
-        output_file = output_dir / f"search_results_{timestamp}.json"
-        export_to_json(results, output_file)
-        console.print(f"[bold]Exported to JSON:[/bold] {output_file}")
-    
-    if args.format == "csv" or args.format == "all":
-        output_file = output_dir / f"search_results_{timestamp}.csv"
-        export_to_csv(results, output_file)
-        console.print(f"[bold]Exported to CSV:[/bold] {output_file}")
-    
-    if args.format == "markdown" or args.format == "all":
-        output_file = output_dir / f"search_results_{timestamp}.md"
-        export_to_markdown(results, output_file)
-        console.print(f"[bold]Exported to Markdown:[/bold] {output_file}")
-    
-    if args.format == "html" or args.format == "all":
-        output_file = output_dir / f"search_results_{timestamp}.html"
-        export_to_html(results, output_file)
-        console.print(f"[bold]Exported to HTML:[/bold] {output_file}")
+    jobs = [
+        (name, exporter, output_dir / f"search_results_{timestamp}.{extension}")
+        for export_format, (name, exporter, extension) in EXPORTERS.items()
+        if args.format == "all" or args.format == export_format
+    ]
     
-    if args.format == "xml" or args.format == "all":
-        output_file = output_dir / f"search_results_{timestamp}.xml"
-        export_to_xml(results, output_file)
-        console.print(f"[bold]Exported to XML:[/bold] {output_file}")
+    if len(jobs) == 1:
+        name, exporter, output_file = jobs[0]
+        exporter(columns, output_file)
+        console.print(f"[bold]Exported to {name}:[/bold] {output_file}")
+    else:
+        # The exporters are independent CPU-bound serializers, so run each in its own process
+        with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as executor:
+            futures = {executor.submit(exporter, columns, output_file): (name, output_file) for name, exporter, output_file in jobs}
+            
+            for future in as_completed(futures):
+                name, output_file = futures[future]
+                try:
+                    future.result()
+                    console.print(f"[bold]Exported to {name}:[/bold] {output_file}")
+                except Exception as e:
+                    console.print(f"[bold red]Error exporting to {name}: {str(e)}[/bold red]")
     
     console.print("\nExample completed!")
 
@@ -13,48 +13,32 @@ from rich.table import Table
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Import project modules
-from src.api.github_client import GitHubClient
-from src.processor.content_processor import ContentProcessor
-from src.embeddings.embedding_manager import EmbeddingManager
-from src.search.search_engine import SearchEngine
-from src.storage.storage_manager import StorageManager
-from src.cli.utils import load_config
+from src.cli.utils import get_components
 
 def main():
     """Run the hybrid search example."""
     console = Console()
     console.print("[bold]GitHub Stars Search - Hybrid Search Example[/bold]")
     
-    # Load configuration
-    config = load_config()
-    
     # Initialize components
-    storage_manager = StorageManager(config.get("storage", {}))
-    embedding_manager = EmbeddingManager(config.get("embeddings", {}), storage_manager)
+    components = get_components()
+    storage_manager = components["storage_manager"]
+    search_engine = components["search_engine"]
     
     # Check if we have data
     if not storage_manager.has_data():
         console.print("[bold red]No repository data found. Run 'python github_stars_search.py update' first.[/bold red]")
         return
     
-    # Create search engine instances with different configurations
-    neural_config = {**config.get("search", {}), "neural_weight": 1.0, "keyword_weight": 0.0, "hybrid_enabled": False}
-    keyword_config = {**config.get("search", {}), "neural_weight": 0.0, "keyword_weight": 1.0, "hybrid_enabled": True}
-    hybrid_config = {**config.get("search", {}), "neural_weight": 0.7, "keyword_weight": 0.3, "hybrid_enabled": True}
-    
-    neural_search = SearchEngine(neural_config, embedding_manager, storage_manager)
-    keyword_search = SearchEngine(keyword_config, embedding_manager, storage_manager)
-    hybrid_search = SearchEngine(hybrid_config, embedding_manager, storage_manager)
-    
     # Get search query
     query = "machine learning for time series"
     console.print(f"\nSearch query: [bold cyan]{query}[/bold cyan]")
     
     # Perform searches
     with console.status("[bold green]Searching repositories...[/bold green]"):
-        neural_results = neural_search.search(query, limit=5)
-        keyword_results = keyword_search.search(query, limit=5)
-        hybrid_results = hybrid_search.search(query, limit=5)
+        neural_results = search_engine.search(query, limit=5, neural_weight=1.0, keyword_weight=0.0, hybrid_enabled=False)
+        keyword_results = search_engine.search(query, limit=5, neural_weight=0.0, keyword_weight=1.0, hybrid_enabled=True)
+        hybrid_results = search_engine.search(query, limit=5, neural_weight=0.7, keyword_weight=0.3, hybrid_enabled=True)
     
     # Display neural search results
     console.print("\n[bold]Neural Search Results:[/bold]")
@@ -98,9 +82,10 @@ def _display_results(console, results):
     
     for result in results:
         repo = result["repository"]
+        description = repo.get("description") or "No description"
         table.add_row(
             repo["full_name"],
-            repo.get("description", "No description")[:50] + "..." if repo.get("description", "") and len(repo.get("description", "")) > 50 else repo.get("description", "No description"),
+            description[:50] + "..." if len(description) > 50 else description,
             repo.get("language", "Unknown"),
             str(repo.get("stargazers_count", 0)),
             f"{result['score']:.2f}"
@@ -11,26 +11,19 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Import project modules
-from src.api.github_client import GitHubClient
-from src.processor.content_processor import ContentProcessor
-from src.embeddings.embedding_manager import EmbeddingManager
-from src.search.search_engine import SearchEngine
-from src.storage.storage_manager import StorageManager
-from src.cli.utils import load_config
+from src.cli.utils import get_components
 
 def main():
     """Run the example."""
     print("GitHub Stars Search - Programmatic Usage Example")
     
-    # Load configuration
-    config = load_config()
-    
     # Initialize components
-    storage_manager = StorageManager(config.get("storage", {}))
-    github_client = GitHubClient(config.get("github", {}))
-    content_processor = ContentProcessor(config.get("content", {}))
-    embedding_manager = EmbeddingManager(config.get("embeddings", {}), storage_manager)
-    search_engine = SearchEngine(config.get("search", {}), embedding_manager, storage_manager)
+    components = get_components()
+    storage_manager = components["storage_manager"]
+    github_client = components["github_client"]
+    content_processor = components["content_processor"]
+    embedding_manager = components["embedding_manager"]
+    search_engine = components["search_engine"]
     
     # Check if we have data
     if not storage_manager.has_data():
@@ -40,10 +33,13 @@ def main():
         print("\nFetching repositories...")
         repositories = github_client.get_starred_repositories(limit=5)
         
+        # Fetch all READMEs concurrently
+        readmes = github_client.get_readmes([repo["full_name"] for repo in repositories])
+        
         print(f"\nProcessing {len(repositories)} repositories...")
+        repo_chunks = {}
         for repo in repositories:
-            # Extract README
-            readme_content = github_client.get_readme(repo["full_name"])
+            readme_content = readmes.get(repo["full_name"])
             
             if readme_content:
                 # Process content
@@ -51,13 +47,16 @@ def main():
                 
                 # Store repository data
                 storage_manager.store_repository(repo, readme_content, chunks)
-                
-                # Generate embeddings
-                embedding_manager.generate_embeddings(repo["id"], chunks)
+                repo_chunks[repo["id"]] = chunks
                 
                 print(f"  ✓ Processed {repo['full_name']}")
             else:
                 print(f"  ✗ No README found for {repo['full_name']}")
+        
+        # Generate embeddings for all repositories in large batches
+        if repo_chunks:
+            embedding_manager.generate_embeddings_batch(repo_chunks)
+            embedding_manager.flush()
     else:
         print("\nFound existing repository data. Regenerating embeddings...")
         
@@ -65,23 +64,25 @@ def main():
         repositories = storage_manager.get_all_repositories()
         print(f"Found {len(repositories)} repositories")
         
-        # Process each repository
-        for repo_id in repositories:
-            # Get repository data
-            repo = storage_manager.get_repository(repo_id)
-            if not repo:
-                print(f"  ✗ No repository data found for ID {repo_id}")
-                continue
-                
+        # Collect the chunks of each repository
+        repo_chunks = {}
+        for repo_id, repo in repositories.items():
             # Get chunks for this repository
             chunks = storage_manager.get_repository_chunks(repo_id)
             
             if chunks:
-                # Generate embeddings
-                embedding_manager.generate_embeddings(repo_id, chunks)
-                print(f"  ✓ Regenerated embeddings for {repo['full_name']}")
+                repo_chunks[repo_id] = chunks
             else:
                 print(f"  ✗ No chunks found for {repo['full_name']}")
+        
+        # Generate embeddings for all repositories in large batches
+        embedded = embedding_manager.generate_embeddings_batch(repo_chunks)
+        embedding_manager.flush()
+        for repo_id, success in embedded.items():
+            if success:
+                print(f"  ✓ Regenerated embeddings for {repositories[repo_id]['full_name']}")
+            else:
+                print(f"  ✗ Failed to embed {repositories[repo_id]['full_name']}")
     
     # Perform a search
     print("\nPerforming search...")
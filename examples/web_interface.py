@@ -5,38 +5,43 @@ Example web interface for GitHub Stars Search using Flask.
 
 import os
 import sys
+import argparse
+import threading
 from pathlib import Path
+from cachetools import TTLCache
 from flask import Flask, render_template, request, jsonify
 
+# Gunicorn serves requests from several worker processes, Flask's development server is used without it
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    BaseApplication = None
+
 # Add the parent directory to the path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Import project modules
-from src.api.github_client import GitHubClient
-from src.processor.content_processor import ContentProcessor
-from src.embeddings.embedding_manager import EmbeddingManager
-from src.search.search_engine import SearchEngine
-from src.storage.storage_manager import StorageManager
-from src.cli.utils import load_config
+from src.cli.utils import get_components
 
 # Initialize Flask app
 app = Flask(__name__)
 
-# Initialize components
-config = load_config()
-storage_manager = StorageManager(config.get("storage", {}))
-embedding_manager = EmbeddingManager(config.get("embeddings", {}), storage_manager)
-search_engine = SearchEngine(config.get("search", {}), embedding_manager, storage_manager)
+# Initialize components once at import, so gunicorn workers forked from a preloaded app share them
+components = get_components()
+storage_manager = components["storage_manager"]
+search_engine = components["search_engine"]
+
+# Recent search results by query, weights, filters and limit, shared by request threads
+results_cache = TTLCache(maxsize=512, ttl=300)
+results_cache_lock = threading.Lock()
+index_mtime = None
 
 # Create HTML template directory
 template_dir = Path(__file__).parent / "templates"
 template_dir.mkdir(exist_ok=True)
 
-# Create HTML template
-template_path = template_dir / "index.html"
-if not template_path.exists():
-    with open(template_path, "w") as f:
-        f.write("""<!DOCTYPE html>
+# HTML template
+INDEX_TEMPLATE = """<!DOCTYPE html>
 <html>
 <head>
     <title>GitHub Stars Search</title>
@@ -209,13 +214,190 @@ if not template_path.exists():
     </div>
     
     <script>
-        document.getElementById('search-form').addEventListener('submit', function() {
-            document.getElementById('loading').style.display = 'block';
-            document.getElementById('results').style.display = 'none';
+        const form = document.getElementById('search-form');
+        const loading = document.getElementById('loading');
+        const resultsContainer = document.getElementById('results');
+        let currentSearch = 0;
+        
+        function renderResults(results, query) {
+            resultsContainer.replaceChildren();
+            
+            if (!results.length) {
+                const empty = document.createElement('div');
+                empty.className = 'no-results';
+                empty.textContent = `No results found for "${query}".`;
+                resultsContainer.appendChild(empty);
+                return;
+            }
+            
+            for (const result of results) {
+                const repo = result.repository;
+                const item = document.createElement('div');
+                item.className = 'result';
+                
+                const title = document.createElement('h2');
+                const link = document.createElement('a');
+                link.href = repo.html_url;
+                link.target = '_blank';
+                link.textContent = repo.full_name;
+                title.appendChild(link);
+                
+                const meta = document.createElement('div');
+                meta.className = 'result-meta';
+                const fields = [
+                    ['', `Language: ${repo.language || 'Unknown'}`],
+                    ['', `Stars: ${repo.stargazers_count}`],
+                    ['', `Forks: ${repo.forks_count}`],
+                    ['result-score', `Score: ${result.score.toFixed(2)}`]
+                ];
+                for (const [className, text] of fields) {
+                    const span = document.createElement('span');
+                    span.className = className;
+                    span.textContent = text;
+                    meta.appendChild(span);
+                }
+                
+                const description = document.createElement('div');
+                description.className = 'result-description';
+                description.textContent = repo.description || 'No description available.';
+                
+                item.append(title, meta, description);
+                resultsContainer.appendChild(item);
+            }
+        }
+        
+        form.addEventListener('submit', async function(event) {
+            event.preventDefault();
+            const search = ++currentSearch;
+            const params = new URLSearchParams(new FormData(form));
+            const query = params.get('query');
+            history.replaceState(null, '', '/search?' + params);
+            loading.style.display = 'block';
+            
+            // Show keyword results right away, then replace them with the hybrid results
+            let hybridDone = false;
+            fetch('/api/search/fast?' + params)
+                .then(response => response.json())
+                .then(data => {
+                    if (search === currentSearch && !hybridDone) {
+                        renderResults(data.results, query);
+                    }
+                })
+                .catch(() => {});
+            
+            try {
+                const response = await fetch('/api/search?' + params);
+                const data = await response.json();
+                hybridDone = true;
+                if (search === currentSearch) {
+                    renderResults(data.results, query);
+                }
+            } finally {
+                if (search === currentSearch) {
+                    loading.style.display = 'none';
+                }
+            }
         });
     </script>
 </body>
-</html>""")
+</html>"""
+
+# Write the template, replacing templates written by earlier versions
+template_path = template_dir / "index.html"
+if not template_path.exists() or template_path.read_text() != INDEX_TEMPLATE:
+    with open(template_path, "w") as f:
+        f.write(INDEX_TEMPLATE)
+
+def build_filters(min_stars, language):
+    """
+    Build search filters from the request parameters.
+    
+    Args:
+        min_stars (str): Minimum number of stars
+        language (str): Repository language
+    
+    Returns:
+        dict: Search filters
+    """
+    filters = {}
+    if min_stars and min_stars.isdigit():
+        filters["stargazers_count"] = {"min": int(min_stars)}
+    if language:
+        filters["language"] = language
+    
+    return filters
+
+def serialize_results(results):
+    """
+    Convert search results to a JSON-serializable format.
+    
+    Args:
+        results (list): Search results
+    
+    Returns:
+        list: Results with the displayed repository fields
+    """
+    serialized_results = []
+    for result in results:
+        serialized_results.append({
+            "id": result["id"],
+            "score": result["score"],
+            "repository": {
+                "id": result["repository"]["id"],
+                "full_name": result["repository"]["full_name"],
+                "description": result["repository"].get("description"),
+                "html_url": result["repository"].get("html_url"),
+                "language": result["repository"].get("language"),
+                "stargazers_count": result["repository"].get("stargazers_count"),
+                "forks_count": result["repository"].get("forks_count"),
+                "watchers_count": result["repository"].get("watchers_count")
+            }
+        })
+    
+    return serialized_results
+
+def cached_search(query, neural_weight, keyword_weight, min_stars, language, limit):
+    """
+    Search repositories, reusing recent results for the same parameters.
+    
+    Args:
+        query (str): Search query
+        neural_weight (float): Weight for neural search
+        keyword_weight (float): Weight for keyword search
+        min_stars (str): Minimum number of stars
+        language (str): Repository language
+        limit (int): Maximum number of results
+    
+    Returns:
+        list: Search results
+    """
+    global index_mtime
+    
+    if not query:
+        return []
+    
+    # Drop cached results once an update has written a new repository index
+    index_file = storage_manager.index_path / "repositories.json"
+    mtime = index_file.stat().st_mtime if index_file.exists() else None
+    key = (" ".join(query.split()), neural_weight, keyword_weight, min_stars, language, limit)
+    
+    # TTLCache isn't thread safe, only the search itself runs outside the lock
+    with results_cache_lock:
+        if mtime != index_mtime:
+            results_cache.clear()
+            index_mtime = mtime
+        
+        results = results_cache.get(key)
+        if results is not None:
+            return results
+    
+    # Pass the weights per search, concurrent requests share the search engine
+    filters = build_filters(min_stars, language)
+    results = search_engine.search(query, filters=filters, limit=limit, neural_weight=neural_weight, keyword_weight=keyword_weight)
+    
+    with results_cache_lock:
+        results_cache[key] = results
+    return results
 
 @app.route('/')
 def index():
@@ -232,21 +414,8 @@ def search():
     language = request.args.get('language', '')
     limit = int(request.args.get('limit', 20))
     
-    # Update search engine configuration
-    search_engine.neural_weight = neural_weight
-    search_engine.keyword_weight = keyword_weight
-    
-    # Prepare filters
-    filters = {}
-    if min_stars and min_stars.isdigit():
-        filters["stargazers_count"] = {"min": int(min_stars)}
-    if language:
-        filters["language"] = language
-    
     # Perform search
-    results = []
-    if query:
-        results = search_engine.search(query, filters=filters, limit=limit)
+    results = cached_search(query, neural_weight, keyword_weight, min_stars, language, limit)
     
     return render_template('index.html', results=results, query=query)
 
@@ -260,52 +429,70 @@ def api_search():
     language = request.args.get('language', '')
     limit = int(request.args.get('limit', 20))
     
-    # Update search engine configuration
-    search_engine.neural_weight = neural_weight
-    search_engine.keyword_weight = keyword_weight
+    # Perform search
+    results = cached_search(query, neural_weight, keyword_weight, min_stars, language, limit)
     
-    # Prepare filters
-    filters = {}
-    if min_stars and min_stars.isdigit():
-        filters["stargazers_count"] = {"min": int(min_stars)}
-    if language:
-        filters["language"] = language
+    return jsonify({"results": serialize_results(results)})
+
+@app.route('/api/search/fast')
+def api_search_fast():
+    """API endpoint for keyword-only search, answered before the hybrid search finishes."""
+    query = request.args.get('query', '')
+    min_stars = request.args.get('min_stars', '')
+    language = request.args.get('language', '')
+    limit = int(request.args.get('limit', 20))
+    
+    if not query:
+        return jsonify({"results": []})
     
     # Perform search
-    results = []
-    if query:
-        results = search_engine.search(query, filters=filters, limit=limit)
+    results = search_engine.keyword_search(query, filters=build_filters(min_stars, language), limit=limit)
     
-    # Convert results to JSON-serializable format
-    serialized_results = []
-    for result in results:
-        serialized_results.append({
-            "id": result["id"],
-            "score": result["score"],
-            "repository": {
-                "id": result["repository"]["id"],
-                "full_name": result["repository"]["full_name"],
-                "description": result["repository"].get("description"),
-                "html_url": result["repository"].get("html_url"),
-                "language": result["repository"].get("language"),
-                "stargazers_count": result["repository"].get("stargazers_count"),
-                "forks_count": result["repository"].get("forks_count"),
-                "watchers_count": result["repository"].get("watchers_count")
-            }
-        })
+    return jsonify({"results": serialize_results(results)})
+
+def serve(workers, bind):
+    """
+    Serve the app from several gunicorn worker processes.
+    
+    Args:
+        workers (int): Number of worker processes
+        bind (str): Address to listen on
+    """
+    class WebApplication(BaseApplication):
+        """Gunicorn application serving the already loaded Flask app."""
+        
+        def load_config(self):
+            self.cfg.set("workers", workers)
+            self.cfg.set("bind", bind)
+            self.cfg.set("preload_app", True)
+        
+        def load(self):
+            return app
     
-    return jsonify({"results": serialized_results})
+    WebApplication().run()
 
 def main():
     """Run the Flask application."""
+    parser = argparse.ArgumentParser(description="GitHub Stars Search web interface")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    parser.add_argument("--bind", type=str, default="127.0.0.1:5000", help="Address to listen on")
+    parser.add_argument("--dev", action="store_true", help="Use the Flask development server with reloading")
+    args = parser.parse_args()
+    
     # Check if we have data
     if not storage_manager.has_data():
         print("No repository data found. Run 'python github_stars_search.py update' first.")
         return
     
-    # Run the Flask app
-    print("Starting web interface at http://127.0.0.1:5000")
-    app.run(debug=True)
+    print(f"Starting web interface at http://{args.bind}")
+    
+    if args.dev or BaseApplication is None:
+        # Run the Flask development server, which handles each request in its own thread
+        host, port = args.bind.rsplit(":", 1)
+        app.run(host=host, port=int(port), debug=args.dev)
+    else:
+        # Workers are forked after the index is loaded, sharing its memory copy-on-write
+        serve(args.workers, args.bind)
 
 if __name__ == "__main__":
     main()
@@ -87,14 +87,15 @@ def update(force, limit):
 
 @cli.command()
 @click.option("--embedding-model", help="Set the embedding model")
-@click.option("--device", help="Set the device for embeddings (cpu/cuda)")
+@click.option("--device", help="Set the device for embeddings (auto/cpu/cuda)")
 @click.option("--neural-weight", type=float, help="Set weight for neural search")
 @click.option("--keyword-weight", type=float, help="Set weight for keyword search")
 @click.option("--chunk-strategy", help="Set the chunk strategy (hybrid/semantic)")
 @click.option("--chunk-size", type=int, help="Set the maximum chunk size")
 @click.option("--chunk-overlap", type=int, help="Set the chunk overlap")
+@click.option("--quantize-index/--no-quantize-index", default=None, help="Store new embeddings indexes as int8 vectors")
 @click.option("--show", is_flag=True, help="Show current configuration")
-def config(embedding_model, device, neural_weight, keyword_weight, chunk_strategy, chunk_size, chunk_overlap, show):
+def config(embedding_model, device, neural_weight, keyword_weight, chunk_strategy, chunk_size, chunk_overlap, quantize_index, show):
     """Configure search settings."""
     try:
         config_command(
@@ -105,6 +106,7 @@ def config(embedding_model, device, neural_weight, keyword_weight, chunk_strateg
             chunk_strategy=chunk_strategy,
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
+            quantize_index=quantize_index,
             show=show
         )
     except Exception as e:
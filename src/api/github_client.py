@@ -3,16 +3,181 @@ GitHub API client for fetching starred repositories and their content.
 """
 
 import os
+import re
 import time
-import base64
+import json
+import asyncio
 import logging
+import functools
+from datetime import datetime
+import aiohttp
 import requests
-from typing import List, Dict, Any, Optional
-from github import Github, GithubException
-from langdetect import detect, LangDetectException
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import List, Dict, Any, Callable, Optional, Tuple
+from langdetect import DetectorFactory, LangDetectException
+from langdetect.detector_factory import PROFILES_DIRECTORY
+
+# orjson parses API responses several times faster than the standard library
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
 
 logger = logging.getLogger(__name__)
 
+# GitHub REST API base URL
+API_URL = "https://api.github.com"
+
+# GitHub GraphQL API endpoint
+GRAPHQL_URL = f"{API_URL}/graphql"
+
+# Page of starred repositories with every field stored for a repository and the root README.md
+STARRED_REPOSITORIES_QUERY = """
+query($first: Int!, $after: String) {
+  viewer {
+    starredRepositories(first: $first, after: $after) {
+      totalCount
+      pageInfo { endCursor hasNextPage }
+      nodes {
+        databaseId
+        name
+        nameWithOwner
+        description
+        url
+        primaryLanguage { name }
+        stargazerCount
+        forkCount
+        issues(states: OPEN) { totalCount }
+        pullRequests(states: OPEN) { totalCount }
+        repositoryTopics(first: 20) { nodes { topic { name } } }
+        createdAt
+        updatedAt
+        pushedAt
+        diskUsage
+        defaultBranchRef { name }
+        licenseInfo { key }
+        owner {
+          login
+          avatarUrl
+          url
+          ... on User { databaseId }
+          ... on Organization { databaseId }
+        }
+        readme: object(expression: "HEAD:README.md") { ... on Blob { text } }
+      }
+    }
+  }
+}
+"""
+
+# English README filenames in the repository root, e.g. README.en.md, README_EN.md or README-english.md
+ENGLISH_README_PATTERN = re.compile(r"^README[._-](en|english)\.(md|rst|txt)$", re.IGNORECASE)
+
+# Root directories holding an English README.md
+ENGLISH_README_DIRS = ("en", "english")
+
+# Media type returning file contents as is, instead of base64 encoded in a JSON document
+RAW_MEDIA_TYPE = "application/vnd.github.raw+json"
+
+# Returned instead of README content when the README is unchanged since its stored ETag
+README_NOT_MODIFIED = object()
+
+# Longest wait in seconds for a rate limit, rate limited requests are given up and pauses before it runs out are capped
+MAX_RATE_LIMIT_WAIT = 60
+
+# Remaining requests below which requests wait for the rate limit to reset instead of running out
+RATE_LIMIT_THRESHOLD = 50
+
+# Languages READMEs are commonly written in, detection compares text against fewer profiles than all 55
+DETECT_LANGUAGES = ("en", "es", "fr", "de", "it", "pt", "ru", "ja", "ko", "zh-cn", "zh-tw", "ar", "hi", "bn", "id")
+
+# Leading characters of a README used to detect its language
+DETECT_TEXT_LENGTH = 4096
+
+# Fenced code blocks, including one left open by the cut, skew detection towards English
+CODE_BLOCK_PATTERN = re.compile(r"```.*?(?:```|\Z)", re.DOTALL)
+
+# ASCII READMEs using common English words are English without running language detection
+ENGLISH_WORDS_PATTERN = re.compile(r"\b(the|and|is|of)\b", re.IGNORECASE)
+
+def language_sample(text: str) -> str:
+    """
+    Get the prose at the start of a README to detect its language from.
+    
+    Args:
+        text (str): README content
+    
+    Returns:
+        str: Up to DETECT_TEXT_LENGTH characters of the README without fenced code blocks
+    """
+    # Code blocks are removed from a longer prefix so enough prose is left
+    return CODE_BLOCK_PATTERN.sub(" ", text[:4 * DETECT_TEXT_LENGTH])[:DETECT_TEXT_LENGTH]
+
+def decode_content(content: bytes, max_size: int) -> str:
+    """
+    Decode raw file content from the GitHub API, keeping at most max_size bytes.
+    
+    Args:
+        content (bytes): Raw file content
+        max_size (int): Maximum number of bytes to decode
+    
+    Returns:
+        str: Decoded content, a character cut in half at the limit is replaced
+    """
+    return content[:max_size].decode("utf-8", errors="replace")
+
+@functools.lru_cache(maxsize=None)
+def _language_factory() -> DetectorFactory:
+    """
+    Load the language profiles of DETECT_LANGUAGES once.
+    
+    Returns:
+        DetectorFactory: langdetect factory seeded for deterministic results
+    """
+    profiles = []
+    for language in DETECT_LANGUAGES:
+        with open(os.path.join(PROFILES_DIRECTORY, language), "r", encoding="utf-8") as f:
+            profiles.append(f.read())
+    
+    factory = DetectorFactory()
+    factory.load_json_profile(profiles)
+    factory.seed = 0
+    return factory
+
+@functools.lru_cache(maxsize=1024)
+def detect_language(text: str) -> str:
+    """
+    Detect the language of text.
+    
+    Args:
+        text (str): Text to detect the language of
+    
+    Returns:
+        str: Language code, e.g. "en"
+    """
+    detector = _language_factory().create()
+    detector.append(text)
+    return detector.detect()
+
+class GitHubAPIError(Exception):
+    """
+    Error response from the GitHub API.
+    """
+    
+    def __init__(self, status: int, data: Dict[str, Any]):
+        """
+        Initialize the error.
+        
+        Args:
+            status (int): HTTP status code, 500 if the request failed without a response
+            data (dict): Response body
+        """
+        super().__init__(f"{status} {data}")
+        self.status = status
+        self.data = data
+
 class GitHubClient:
     """
     Client for interacting with the GitHub API.
@@ -29,21 +194,38 @@ class GitHubClient:
         self.per_page = config.get("per_page", 100)
         self.max_retries = config.get("max_retries", 3)
         self.timeout = config.get("timeout", 30)
+        self.concurrency = config.get("concurrency", 50)
+        self.max_readme_size = config.get("max_readme_size", 500000)
         
-        # Initialize GitHub client
-        self.github = Github(self.api_key, per_page=self.per_page, timeout=self.timeout)
-        
-        # Initialize session for REST API requests
-        self.session = requests.Session()
-        self.session.headers.update({
+        # Headers for REST API requests
+        self.headers = {
             "Authorization": f"token {self.api_key}",
             "Accept": "application/vnd.github.v3+json"
-        })
+        }
+        
+        # Initialize session for REST API requests, keeping connections alive across requests.
+        # Server errors and rate limits are retried with backoff, honoring Retry-After; GraphQL queries are
+        # POSTed but don't modify anything, so they're retried too.
+        retry = Retry(
+            total=self.max_retries, backoff_factor=1.0, status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET", "POST"], respect_retry_after_header=True, raise_on_status=False
+        )
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.hooks["response"].append(self._wait_for_rate_limit)
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency, max_retries=retry)
+        self.session.mount(API_URL, adapter)
+        
+        # READMEs returned with the starred repositories, used instead of fetching them again
+        self.readmes = {}
     
     def get_starred_repositories(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Get the user's starred repositories.
         
+        Repositories are fetched a page at a time from the GraphQL API along with their
+        root README.md, which get_readme and get_readmes then use without another request.
+        
         Args:
             limit (int, optional): Maximum number of repositories to fetch
         
@@ -53,65 +235,102 @@ class GitHubClient:
         logger.info("Fetching starred repositories")
         
         repositories = []
-        user = self.github.get_user()
+        cursor = None
         
         try:
-            # Get starred repositories
-            starred = user.get_starred()
-            
-            # Determine how many to fetch
-            total_count = starred.totalCount
-            if limit is not None:
-                total_count = min(total_count, limit)
-            
-            logger.info(f"Found {total_count} starred repositories")
-            
-            # Fetch repositories with pagination
-            for i, repo in enumerate(starred):
-                if limit is not None and i >= limit:
-                    break
+            while limit is None or len(repositories) < limit:
+                first = min(self.per_page, 100) if limit is None else min(self.per_page, 100, limit - len(repositories))
+                data = self._graphql(STARRED_REPOSITORIES_QUERY, {"first": first, "after": cursor})
+                starred = data["viewer"]["starredRepositories"]
                 
-                # Extract repository data
-                repo_data = {
-                    "id": repo.id,
-                    "name": repo.name,
-                    "full_name": repo.full_name,
-                    "description": repo.description,
-                    "html_url": repo.html_url,
-                    "clone_url": repo.clone_url,
-                    "language": repo.language,
-                    "stargazers_count": repo.stargazers_count,
-                    "watchers_count": repo.watchers_count,
-                    "forks_count": repo.forks_count,
-                    "open_issues_count": repo.open_issues_count,
-                    "topics": repo.topics,
-                    "created_at": repo.created_at.isoformat() if repo.created_at else None,
-                    "updated_at": repo.updated_at.isoformat() if repo.updated_at else None,
-                    "pushed_at": repo.pushed_at.isoformat() if repo.pushed_at else None,
-                    "size": repo.size,
-                    "default_branch": repo.default_branch,
-                    "license": repo.license.key if repo.license else None,
-                    "owner": {
-                        "login": repo.owner.login,
-                        "id": repo.owner.id,
-                        "avatar_url": repo.owner.avatar_url,
-                        "html_url": repo.owner.html_url
-                    }
-                }
+                if cursor is None:
+                    total_count = starred["totalCount"] if limit is None else min(starred["totalCount"], limit)
+                    logger.info(f"Found {total_count} starred repositories")
                 
-                repositories.append(repo_data)
+                for node in starred["nodes"]:
+                    repositories.append(self._repository_data(node))
+                    
+                    readme = (node.get("readme") or {}).get("text")
+                    if readme:
+                        self.readmes[node["nameWithOwner"]] = readme[:self.max_readme_size]
                 
-                # Avoid rate limiting
-                if (i + 1) % 100 == 0:
-                    logger.info(f"Fetched {i + 1} repositories")
-                    time.sleep(1)
+                logger.info(f"Fetched {len(repositories)} repositories")
+                
+                if not starred["pageInfo"]["hasNextPage"]:
+                    break
+                cursor = starred["pageInfo"]["endCursor"]
             
-            return repositories
+            return repositories[:limit] if limit is not None else repositories
         
-        except GithubException as e:
+        except GitHubAPIError as e:
             logger.error(f"GitHub API error: {str(e)}")
             raise
     
+    def _graphql(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a GitHub GraphQL query.
+        
+        Args:
+            query (str): GraphQL query
+            variables (dict): Query variables
+        
+        Returns:
+            dict: Query result data
+        """
+        try:
+            response = self.session.post(GRAPHQL_URL, json={"query": query, "variables": variables}, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise GitHubAPIError(500, {"message": str(e)})
+        
+        result = json_loads(response.content) if response.content else {}
+        if response.status_code != 200 or result.get("errors"):
+            raise GitHubAPIError(response.status_code, result)
+        
+        return result["data"]
+    
+    def _repository_data(self, node: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert a GraphQL repository node to a repository dictionary.
+        
+        Args:
+            node (dict): GraphQL repository node
+        
+        Returns:
+            dict: Repository dictionary with the fields and formats of the REST API
+        """
+        def timestamp(value):
+            # Match the isoformat timestamps stored for repositories fetched from the REST API
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).isoformat() if value else None
+        
+        owner = node.get("owner") or {}
+        
+        return {
+            "id": node["databaseId"],
+            "name": node["name"],
+            "full_name": node["nameWithOwner"],
+            "description": node.get("description"),
+            "html_url": node["url"],
+            "clone_url": f"{node['url']}.git",
+            "language": (node.get("primaryLanguage") or {}).get("name"),
+            "stargazers_count": node.get("stargazerCount", 0),
+            "watchers_count": node.get("stargazerCount", 0),
+            "forks_count": node.get("forkCount", 0),
+            "open_issues_count": (node.get("issues") or {}).get("totalCount", 0) + (node.get("pullRequests") or {}).get("totalCount", 0),
+            "topics": [topic["topic"]["name"] for topic in (node.get("repositoryTopics") or {}).get("nodes", [])],
+            "created_at": timestamp(node.get("createdAt")),
+            "updated_at": timestamp(node.get("updatedAt")),
+            "pushed_at": timestamp(node.get("pushedAt")),
+            "size": node.get("diskUsage"),
+            "default_branch": (node.get("defaultBranchRef") or {}).get("name"),
+            "license": (node.get("licenseInfo") or {}).get("key"),
+            "owner": {
+                "login": owner.get("login"),
+                "id": owner.get("databaseId"),
+                "avatar_url": owner.get("avatarUrl"),
+                "html_url": owner.get("url")
+            }
+        }
+    
     def get_readme(self, repo_full_name: str) -> Optional[str]:
         """
         Get the README content for a repository.
@@ -124,18 +343,10 @@ class GitHubClient:
         """
         logger.info(f"Fetching README for {repo_full_name}")
         
-        # Try to get the default README first
-        readme_content = self._get_readme_content(repo_full_name)
-        if readme_content:
-            # Try to detect language
-            try:
-                lang = detect(readme_content)
-                if lang == "en":
-                    return readme_content
-                logger.info(f"README for {repo_full_name} is not in English (detected: {lang})")
-            except LangDetectException:
-                # If language detection fails, assume it's usable
-                return readme_content
+        # Try to get the default README first, unless it came with the starred repositories
+        readme_content = self.readmes.pop(repo_full_name, None) or self._get_readme_content(repo_full_name)
+        if readme_content and self._is_english(readme_content, repo_full_name):
+            return readme_content
         
         # If no README or not in English, try to find an English README
         english_readme = self._find_english_readme(repo_full_name)
@@ -145,6 +356,31 @@ class GitHubClient:
         # If no English README found, return the default README
         return readme_content
     
+    def _is_english(self, readme_content: str, repo_full_name: str) -> bool:
+        """
+        Check whether README content is usable as an English README.
+        
+        Args:
+            readme_content (str): README content
+            repo_full_name (str): Full name of the repository (owner/repo)
+        
+        Returns:
+            bool: True if the README is in English or its language can't be detected
+        """
+        sample = language_sample(readme_content)
+        if readme_content.isascii() and ENGLISH_WORDS_PATTERN.search(sample):
+            return True
+        
+        try:
+            lang = detect_language(sample)
+            if lang == "en":
+                return True
+            logger.info(f"README for {repo_full_name} is not in English (detected: {lang})")
+            return False
+        except LangDetectException:
+            # If language detection fails, assume it's usable
+            return True
+    
     def _get_readme_content(self, repo_full_name: str) -> Optional[str]:
         """
         Get the content of the default README file.
@@ -155,24 +391,11 @@ class GitHubClient:
         Returns:
             str: README content or None if not found
         """
-        for attempt in range(self.max_retries):
-            try:
-                # Try to get the repository README
-                repo = self.github.get_repo(repo_full_name)
-                readme = repo.get_readme()
-                content = base64.b64decode(readme.content).decode("utf-8")
-                return content
-            
-            except GithubException as e:
-                if e.status == 404:
-                    logger.warning(f"No README found for {repo_full_name}")
-                    return None
-                elif attempt < self.max_retries - 1:
-                    logger.warning(f"GitHub API error, retrying: {str(e)}")
-                    time.sleep(2 ** attempt)  # Exponential backoff
-                else:
-                    logger.error(f"GitHub API error: {str(e)}")
-                    return None
+        content = self._get_raw(f"{API_URL}/repos/{repo_full_name}/readme")
+        if content is None:
+            logger.warning(f"No README found for {repo_full_name}")
+        
+        return content
     
     def _find_english_readme(self, repo_full_name: str) -> Optional[str]:
         """
@@ -184,44 +407,332 @@ class GitHubClient:
         Returns:
             str: README content or None if not found
         """
-        # List of possible English README filenames
-        english_readme_names = [
-            "README.en.md",
-            "README_EN.md",
-            "README-en.md",
-            "README-EN.md",
-            "README_ENGLISH.md",
-            "README-ENGLISH.md",
-            "README.english.md",
-            "README-english.md",
-            "en/README.md",
-            "english/README.md"
-        ]
-        
-        # Try each possible filename
-        for readme_name in english_readme_names:
-            url = f"https://api.github.com/repos/{repo_full_name}/contents/{readme_name}"
+        # List the root directory once instead of probing every possible filename
+        tree = self._get_json(f"{API_URL}/repos/{repo_full_name}/git/trees/HEAD")
+        url = self._english_readme_url(repo_full_name, tree)
+        if url is None:
+            return None
+        
+        content = self._get_raw(url)
+        if content:
+            logger.info(f"Found English README for {repo_full_name}")
+        
+        return content
+    
+    def _get_json(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a JSON document from the GitHub REST API.
+        
+        Args:
+            url (str): API URL
+        
+        Returns:
+            dict: Response data or None if not found
+        """
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            if response.status_code == 200:
+                return json_loads(response.content)
+        
+        except requests.RequestException as e:
+            logger.error(f"Error fetching {url}: {str(e)}")
+        
+        return None
+    
+    def _get_raw(self, url: str) -> Optional[str]:
+        """
+        Get a file from the GitHub REST API as raw content, skipping the base64 encoding.
+        
+        Args:
+            url (str): Contents, README or blobs API URL
+        
+        Returns:
+            str: File content or None if not found
+        """
+        try:
+            response = self.session.get(url, headers={"Accept": RAW_MEDIA_TYPE}, timeout=self.timeout)
+            if response.status_code == 200:
+                return decode_content(response.content, self.max_readme_size)
             
-            for attempt in range(self.max_retries):
-                try:
-                    response = self.session.get(url, timeout=self.timeout)
+            if response.status_code != 404:
+                logger.error(f"GitHub API error fetching {url}: {response.status_code}")
+        
+        except requests.RequestException as e:
+            logger.error(f"Error fetching {url}: {str(e)}")
+        
+        return None
+    
+    def _english_readme_url(self, repo_full_name: str, tree: Optional[Dict[str, Any]]) -> Optional[str]:
+        """
+        Find the English README in a repository's root tree listing.
+        
+        Args:
+            repo_full_name (str): Full name of the repository (owner/repo)
+            tree (dict): Git Trees API response for the root directory
+        
+        Returns:
+            str: API URL of the README or None if there is no English README
+        """
+        entries = tree.get("tree", []) if tree else []
+        
+        # Prefer README files in the root to READMEs in language directories
+        for entry in entries:
+            if entry.get("type") == "blob" and ENGLISH_README_PATTERN.match(entry.get("path", "")):
+                return f"{API_URL}/repos/{repo_full_name}/git/blobs/{entry['sha']}"
+        
+        for entry in entries:
+            if entry.get("type") == "tree" and entry.get("path", "").lower() in ENGLISH_README_DIRS:
+                return f"{API_URL}/repos/{repo_full_name}/contents/{entry['path']}/README.md"
+        
+        return None
+    
+    def get_readmes(self, repo_full_names: List[str], concurrency: Optional[int] = None, etags: Optional[Dict[str, str]] = None,
+                    callback: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """
+        Get the README content for many repositories concurrently.
+        
+        Args:
+            repo_full_names (list): Full names of the repositories (owner/repo)
+            concurrency (int, optional): Maximum number of requests in flight
+            etags (dict, optional): Repository full name to README ETag, updated in place with the fetched ETags
+            callback (callable, optional): Called with the repository full name and README as each README arrives
+        
+        Returns:
+            dict: Repository full name to README content, README_NOT_MODIFIED or None if not found
+        """
+        return asyncio.run(self.get_readmes_async(repo_full_names, concurrency, etags, callback))
+    
+    async def get_readmes_async(self, repo_full_names: List[str], concurrency: Optional[int] = None, etags: Optional[Dict[str, str]] = None,
+                                callback: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """
+        Get the README content for many repositories concurrently.
+        
+        Args:
+            repo_full_names (list): Full names of the repositories (owner/repo)
+            concurrency (int, optional): Maximum number of requests in flight
+            etags (dict, optional): Repository full name to README ETag, updated in place with the fetched ETags
+            callback (callable, optional): Called with the repository full name and README as each README arrives
+        
+        Returns:
+            dict: Repository full name to README content, README_NOT_MODIFIED or None if not found
+        """
+        concurrency = concurrency or self.concurrency
+        semaphore = asyncio.Semaphore(concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        
+        async with aiohttp.ClientSession(headers=self.headers, timeout=timeout, connector=connector) as session:
+            async def fetch(repo_full_name):
+                async with semaphore:
+                    try:
+                        readme_content = await self.get_readme_async(session, repo_full_name, etags)
+                    except Exception as e:
+                        logger.error(f"Error fetching README for {repo_full_name}: {str(e)}")
+                        readme_content = None
+                
+                # Hand the README on without waiting for the slowest repositories
+                if callback is not None:
+                    callback(repo_full_name, readme_content)
+                
+                return repo_full_name, readme_content
+            
+            results = await asyncio.gather(*(fetch(repo_full_name) for repo_full_name in repo_full_names))
+        
+        return dict(results)
+    
+    async def get_readme_async(self, session: aiohttp.ClientSession, repo_full_name: str, etags: Optional[Dict[str, str]] = None) -> Any:
+        """
+        Get the README content for a repository using an aiohttp session.
+        
+        Args:
+            session (aiohttp.ClientSession): Session to issue the requests with
+            repo_full_name (str): Full name of the repository (owner/repo)
+            etags (dict, optional): Repository full name to README ETag, updated in place with the fetched ETag
+        
+        Returns:
+            str: README content, README_NOT_MODIFIED if unchanged since the stored ETag or None if not found
+        """
+        logger.info(f"Fetching README for {repo_full_name}")
+        
+        # Try to get the default README first, conditional on the stored ETag
+        etag = etags.get(repo_full_name) if etags is not None else None
+        readme_content = self.readmes.pop(repo_full_name, None)
+        
+        # A conditional request is free when the README is unchanged, so it's preferred to a README fetched with the repository
+        if etag or readme_content is None:
+            readme_content, etag = await self._fetch_content_async(session, f"{API_URL}/repos/{repo_full_name}/readme", etag)
+            if readme_content is README_NOT_MODIFIED:
+                logger.info(f"README for {repo_full_name} is unchanged")
+                return README_NOT_MODIFIED
+            
+            if etags is not None and etag:
+                etags[repo_full_name] = etag
+        
+        if readme_content and self._is_english(readme_content, repo_full_name):
+            return readme_content
+        
+        # If no README or not in English, look for an English README in the root directory listing
+        tree, _ = await self._fetch_async(session, f"{API_URL}/repos/{repo_full_name}/git/trees/HEAD")
+        url = self._english_readme_url(repo_full_name, tree)
+        if url is not None:
+            english_readme = await self._get_content_async(session, url)
+            if english_readme:
+                logger.info(f"Found English README for {repo_full_name}")
+                return english_readme
+        
+        # If no English README found, return the default README
+        return readme_content
+    
+    async def _get_content_async(self, session: aiohttp.ClientSession, url: str) -> Optional[str]:
+        """
+        Get a file from the GitHub contents, README or blobs API as raw content.
+        
+        Args:
+            session (aiohttp.ClientSession): Session to issue the request with
+            url (str): Contents, README or blobs API URL
+        
+        Returns:
+            str: File content or None if not found
+        """
+        content, _ = await self._fetch_content_async(session, url)
+        return content
+    
+    def _rate_limit_delay(self, response) -> Optional[float]:
+        """
+        Get how long to wait before retrying a rate limited request.
+        
+        Args:
+            response: Response with a 403 or 429 status
+        
+        Returns:
+            float: Seconds to wait or None if the request wasn't rate limited or the headers are malformed
+        """
+        try:
+            # Secondary rate limits say how long to wait
+            retry_after = response.headers.get("Retry-After")
+            if retry_after is not None:
+                return float(retry_after)
+            
+            # Primary rate limits give the time the quota resets
+            if response.headers.get("X-RateLimit-Remaining") == "0":
+                reset = float(response.headers.get("X-RateLimit-Reset", 0))
+                return max(reset - time.time(), 0) + 1
+        
+        except ValueError as e:
+            logger.warning(f"Malformed GitHub rate limit headers: {str(e)}")
+        
+        return None
+    
+    def _rate_limit_pause(self, response) -> float:
+        """
+        Get how long to wait for the rate limit to reset before it runs out.
+        
+        Args:
+            response: Successful API response
+        
+        Returns:
+            float: Seconds to wait, at most MAX_RATE_LIMIT_WAIT, and 0 while more than RATE_LIMIT_THRESHOLD
+            requests remain or the headers are malformed
+        """
+        try:
+            remaining = response.headers.get("X-RateLimit-Remaining")
+            if remaining is None or int(remaining) >= RATE_LIMIT_THRESHOLD:
+                return 0.0
+            
+            reset = float(response.headers.get("X-RateLimit-Reset", 0))
+        
+        except ValueError as e:
+            logger.warning(f"Malformed GitHub rate limit headers: {str(e)}")
+            return 0.0
+        
+        # Spread the remaining requests rather than blocking until a reset up to an hour away
+        return min(max(reset - time.time(), 0) + 1, MAX_RATE_LIMIT_WAIT)
+    
+    def _wait_for_rate_limit(self, response: requests.Response, *args, **kwargs):
+        """
+        Session response hook sleeping until the rate limit resets when it's almost exhausted.
+        
+        Args:
+            response (requests.Response): API response
+        """
+        if response.status_code not in (200, 304):
+            return
+        
+        pause = self._rate_limit_pause(response)
+        if pause:
+            logger.warning(f"GitHub rate limit almost exhausted, waiting {pause:.0f}s for it to reset")
+            time.sleep(pause)
+    
+    async def _fetch_content_async(self, session: aiohttp.ClientSession, url: str, etag: Optional[str] = None) -> Tuple[Any, Optional[str]]:
+        """
+        Get a file from the GitHub contents, README or blobs API as raw content, optionally as a conditional request.
+        
+        Args:
+            session (aiohttp.ClientSession): Session to issue the request with
+            url (str): Contents, README or blobs API URL
+            etag (str, optional): ETag of the previously fetched file
+        
+        Returns:
+            tuple: (file content, README_NOT_MODIFIED if unchanged or None if not found, response ETag)
+        """
+        return await self._fetch_async(session, url, etag, raw=True)
+    
+    async def _fetch_async(self, session: aiohttp.ClientSession, url: str, etag: Optional[str] = None, raw: bool = False) -> Tuple[Any, Optional[str]]:
+        """
+        Get a document from the GitHub REST API, optionally as a conditional request.
+        
+        Args:
+            session (aiohttp.ClientSession): Session to issue the request with
+            url (str): API URL
+            etag (str, optional): ETag of the previously fetched document
+            raw (bool, optional): Whether to get file contents as is rather than a JSON document
+        
+        Returns:
+            tuple: (response data, README_NOT_MODIFIED if unchanged or None if not found, response ETag)
+        """
+        headers = {"Accept": RAW_MEDIA_TYPE} if raw else {}
+        if etag:
+            headers["If-None-Match"] = etag
+        
+        for attempt in range(self.max_retries):
+            try:
+                async with session.get(url, headers=headers) as response:
+                    if response.status == 304:
+                        return README_NOT_MODIFIED, etag
                     
-                    if response.status_code == 200:
-                        content_data = response.json()
-                        if content_data.get("encoding") == "base64" and content_data.get("content"):
-                            content = base64.b64decode(content_data["content"]).decode("utf-8")
-                            logger.info(f"Found English README ({readme_name}) for {repo_full_name}")
-                            return content
+                    # Wait for rate limits to reset instead of treating the README as missing
+                    delay = self._rate_limit_delay(response) if response.status in (403, 429) else None
+                    if delay is not None:
+                        if delay > MAX_RATE_LIMIT_WAIT or attempt == self.max_retries - 1:
+                            logger.error(f"Rate limited fetching {url}, giving up")
+                            return None, None
+                        
+                        logger.warning(f"Rate limited fetching {url}, retrying in {delay:.0f}s")
+                        await asyncio.sleep(delay)
+                        continue
                     
-                    # If not found, break the retry loop for this filename
-                    break
-                
-                except Exception as e:
-                    if attempt < self.max_retries - 1:
-                        logger.warning(f"Error fetching {readme_name}, retrying: {str(e)}")
-                        time.sleep(2 ** attempt)  # Exponential backoff
+                    if response.status != 200:
+                        return None, None
+                    
+                    if raw:
+                        data = decode_content(await response.read(), self.max_readme_size)
                     else:
-                        logger.error(f"Error fetching {readme_name}: {str(e)}")
+                        data = await response.json(loads=json_loads)
+                    
+                    pause = self._rate_limit_pause(response)
+                
+                # Wait for the rate limit to reset before it runs out, with the connection released
+                if pause:
+                    logger.warning(f"GitHub rate limit almost exhausted, waiting {pause:.0f}s for it to reset")
+                    await asyncio.sleep(pause)
+                
+                return data, response.headers.get("ETag")
+            
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt < self.max_retries - 1:
+                    logger.warning(f"Error fetching {url}, retrying: {str(e)}")
+                    await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                else:
+                    logger.error(f"Error fetching {url}: {str(e)}")
         
-        # No English README found
-        return None
+        return None, None
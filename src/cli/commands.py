@@ -2,26 +2,42 @@
 CLI commands for GitHub Stars Search.
 """
 
+import os
 import json
 import yaml
+import queue
 import logging
 from pathlib import Path
 from tqdm import tqdm
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
 from rich.console import Console
 from rich.table import Table
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeElapsedColumn
 
 from src.cli.utils import load_config, save_config
-from src.api.github_client import GitHubClient
+from src.api.github_client import GitHubClient, README_NOT_MODIFIED
 from src.processor.content_processor import ContentProcessor
 from src.embeddings.embedding_manager import EmbeddingManager
 from src.search.search_engine import SearchEngine
 from src.storage.storage_manager import StorageManager
 
+# orjson serializes results several times faster than the standard library
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Initialize console for rich output
 console = Console()
 logger = logging.getLogger(__name__)
 
+# Threads handing READMEs to the content processor's worker processes while others are fetched and embedded
+PROCESS_WORKERS = os.cpu_count() or 4
+
+# Minimum number of repositories embedded together
+EMBED_BATCH_REPOSITORIES = 16
+
 def search_command(search_engine, query, neural_weight=None, keyword_weight=None, min_stars=None, language=None, limit=None, json_output=False):
     """
     Search for repositories matching the query.
@@ -39,12 +55,6 @@ def search_command(search_engine, query, neural_weight=None, keyword_weight=None
     Returns:
         bool: True if successful
     """
-    # Update search engine weights if provided
-    if neural_weight is not None:
-        search_engine.neural_weight = neural_weight
-    if keyword_weight is not None:
-        search_engine.keyword_weight = keyword_weight
-    
     # Prepare filters
     filters = {}
     if min_stars is not None:
@@ -54,11 +64,12 @@ def search_command(search_engine, query, neural_weight=None, keyword_weight=None
     
     # Execute search
     with console.status("[bold green]Searching repositories...[/bold green]"):
-        results = search_engine.search(query, filters=filters, limit=limit)
+        # Weights are passed per search, so the shared search engine isn't modified
+        results = search_engine.search(query, filters=filters, limit=limit, neural_weight=neural_weight, keyword_weight=keyword_weight)
     
     # Output results
     if json_output:
-        console.print(json.dumps(results, indent=2))
+        console.print(_dumps(results))
     else:
         _display_search_results(results)
     
@@ -96,53 +107,159 @@ def update_command(github_client, content_processor, storage_manager, embedding_
         # Update progress with total count
         total_repos = len(repositories)
         progress.update(task, total=total_repos, completed=0)
-        progress.update(task, description=f"Processing {total_repos} repositories...")
         
-        # Process repositories
-        for i, repo in enumerate(repositories):
-            repo_id = repo["id"]
+        # Only a push can change a README, so other repositories are skipped unless forced
+        pushed_at = {} if force else storage_manager.get_pushed_at_map()
+        to_update = [
+            repo for repo in repositories
+            if force or not storage_manager.has_repository(repo["id"]) or pushed_at.get(repo["id"]) != repo.get("pushed_at")
+        ]
+        
+        # Refresh metadata such as stars of changed repositories without a push
+        update_ids = {repo["id"] for repo in to_update}
+        for repo in repositories:
+            if repo["id"] not in update_ids and storage_manager.is_repository_outdated(repo):
+                storage_manager.update_repository_metadata(repo)
+        progress.update(task, advance=total_repos - len(to_update))
+        
+        # Fetch all READMEs concurrently, sending the stored ETags so unchanged READMEs come back as 304 Not Modified
+        stored_etags = {} if force else storage_manager.get_readme_etags()
+        etags = {
+            repo["full_name"]: stored_etags[repo["full_name"]] for repo in to_update
+            if repo["full_name"] in stored_etags and storage_manager.has_repository(repo["id"])
+        }
+        progress.update(task, description=f"Processing {len(to_update)} repositories...")
+        
+        # READMEs are processed while the rest are fetched and embedded while later ones are processed
+        embedded_count = 0
+        batches = _process_readmes(
+            github_client, content_processor, storage_manager, to_update, etags,
+            batch_size=embedding_manager.batch_size, on_progress=lambda: progress.update(task, advance=1)
+        )
+        try:
+            for batch in batches:
+                progress.update(task, description=f"Generating embeddings for {len(batch)} repositories...")
+                embedded = embedding_manager.generate_embeddings_batch({repo_id: chunks for repo_id, (_, chunks) in batch.items()})
+                embedded_count += len(batch)
+                
+                # Only remember the ETags of READMEs that made it into the index
+                indexed = [batch[repo_id][0] for repo_id, success in embedded.items() if success]
+                storage_manager.update_readme_etags({name: etags[name] for name in indexed if name in etags})
+                progress.update(task, description=f"Processing {len(to_update)} repositories ({embedded_count} embedded)...")
+        finally:
+            # Save the index once for every batch, including those embedded before an interruption
+            saved = embedding_manager.flush()
+    
+    if not saved:
+        console.print("[bold red]Error saving the embeddings index, run update with --force to embed the repositories again.[/bold red]")
+        return False
+    
+    console.print(f"[bold green]Successfully processed {total_repos} repositories.[/bold green]")
+    return True
+
+def _process_readmes(github_client, content_processor, storage_manager, repositories, etags, batch_size=0, on_progress=None):
+    """
+    Fetch, process and store the READMEs of repositories in a pipeline.
+    
+    READMEs are processed in the content processor's worker processes as they arrive, and stored repositories are yielded in
+    batches for embedding, so fetching, processing and embedding overlap. Batches hold at least
+    EMBED_BATCH_REPOSITORIES repositories and batch_size chunks, so every encoder batch is full,
+    or all that are left, plus any already processed.
+    
+    Args:
+        github_client: The GitHub client instance
+        content_processor: The content processor instance
+        storage_manager: The storage manager instance
+        repositories (list): Repositories to update
+        etags (dict): Repository full name to README ETag, updated in place with the fetched ETags
+        batch_size (int, optional): Minimum number of chunks per batch, the embedding model batch size
+        on_progress (callable, optional): Called after each repository is processed
+        
+    Yields:
+        dict: Repository ID to (repository full name, chunks) of stored repositories
+    """
+    repositories_by_name = {repo["full_name"]: repo for repo in repositories}
+    processed = queue.Queue()
+    
+    def process(repo, readme_content):
+        try:
+            if readme_content is README_NOT_MODIFIED:
+                # Only the metadata changed, reprocess the stored README
+                readme_content = storage_manager.get_repository_readme(repo["id"])
             
-            # Skip if not forced and already processed
-            if not force and storage_manager.has_repository(repo_id) and not storage_manager.is_repository_outdated(repo):
-                progress.update(task, advance=1)
-                continue
+            if readme_content:
+                return repo, readme_content, content_processor.submit(readme_content, repo).result()
             
-            # Process repository content
+            logger.warning(f"No README found for {repo['full_name']}")
+        except Exception as e:
+            logger.error(f"Error processing repository {repo['full_name']}: {str(e)}")
+        
+        return repo, None, None
+    
+    # One more thread runs the fetch event loop
+    with ThreadPoolExecutor(max_workers=PROCESS_WORKERS + 1) as executor:
+        futures = []
+        
+        def on_readme(repo_full_name, readme_content):
+            future = executor.submit(process, repositories_by_name[repo_full_name], readme_content)
+            future.add_done_callback(processed.put)
+            futures.append(future)
+        
+        def fetch():
+            try:
+                github_client.get_readmes(list(repositories_by_name), etags=etags, callback=on_readme)
+            finally:
+                # Signal the end once every README handed on has been processed
+                wait(futures)
+                processed.put(None)
+        
+        fetcher = executor.submit(fetch)
+        batch = {}
+        batch_chunks = 0
+        
+        while True:
+            # Embed once a batch is full and nothing else is ready, so slow embedding grows the batches
+            if len(batch) >= EMBED_BATCH_REPOSITORIES and batch_chunks >= batch_size and processed.empty():
+                yield batch
+                batch = {}
+                batch_chunks = 0
+            
+            future = processed.get()
+            if future is None:
+                break
+            
+            repo, readme_content, chunks = future.result()
+            
+            # Storage isn't thread-safe, so repositories are stored here rather than in the pool
             try:
-                # Extract README and other content
-                readme_content = github_client.get_readme(repo["full_name"])
-                if readme_content:
-                    # Process content
-                    chunks = content_processor.process_readme(readme_content, repo)
-                    
-                    # Store repository data
-                    storage_manager.store_repository(repo, readme_content, chunks)
-                    
-                    # Generate embeddings
-                    embedding_manager.generate_embeddings(repo_id, chunks)
-                else:
-                    logger.warning(f"No README found for {repo['full_name']}")
+                if chunks is not None and storage_manager.store_repository(repo, readme_content, chunks):
+                    batch[repo["id"]] = (repo["full_name"], chunks)
+                    batch_chunks += len(chunks)
             except Exception as e:
-                logger.error(f"Error processing repository {repo['full_name']}: {str(e)}")
+                logger.error(f"Error storing repository {repo['full_name']}: {str(e)}")
             
-            # Update progress
-            progress.update(task, advance=1)
-    
-    console.print(f"[bold green]Successfully processed {total_repos} repositories.[/bold green]")
-    return True
+            if on_progress is not None:
+                on_progress()
+        
+        if batch:
+            yield batch
+        
+        # Raise any error fetching the READMEs
+        fetcher.result()
 
-def config_command(embedding_model=None, device=None, neural_weight=None, keyword_weight=None, chunk_strategy=None, chunk_size=None, chunk_overlap=None, show=False):
+def config_command(embedding_model=None, device=None, neural_weight=None, keyword_weight=None, chunk_strategy=None, chunk_size=None, chunk_overlap=None, quantize_index=None, show=False):
     """
     Configure search settings.
     
     Args:
         embedding_model (str, optional): Set the embedding model
-        device (str, optional): Set the device for embeddings (cpu/cuda)
+        device (str, optional): Set the device for embeddings (auto/cpu/cuda)
         neural_weight (float, optional): Set weight for neural search
         keyword_weight (float, optional): Set weight for keyword search
         chunk_strategy (str, optional): Set the chunk strategy (hybrid/semantic)
         chunk_size (int, optional): Set the maximum chunk size
         chunk_overlap (int, optional): Set the chunk overlap
+        quantize_index (bool, optional): Store new embeddings indexes as int8 vectors
         show (bool, optional): Show current configuration
         
     Returns:
@@ -166,6 +283,11 @@ def config_command(embedding_model=None, device=None, neural_weight=None, keywor
             config["embeddings"] = {}
         config["embeddings"]["device"] = device
     
+    if quantize_index is not None:
+        if "embeddings" not in config:
+            config["embeddings"] = {}
+        config["embeddings"]["index_quantize"] = quantize_index
+    
     if neural_weight is not None:
         if "search" not in config:
             config["search"] = {}
@@ -231,15 +353,11 @@ def info_command(storage_manager, embedding_manager):
         table.add_row("Repositories", str(repo_count))
         table.add_row("Embedded Chunks", str(embedding_count))
         
-        # Display language distribution
-        languages = {}
-        for repo in repositories.values():
-            lang = repo.get("language")
-            if lang:
-                languages[lang] = languages.get(lang, 0) + 1
+        # Display the most common languages
+        languages = Counter(repo.get("language") for repo in repositories.values() if repo.get("language"))
         
         if languages:
-            table.add_row("Languages", ", ".join(f"{lang} ({count})" for lang, count in sorted(languages.items(), key=lambda x: x[1], reverse=True)[:5]))
+            table.add_row("Languages", ", ".join(f"{lang} ({count})" for lang, count in languages.most_common(5)))
     else:
         table.add_row("Repositories", "[yellow]No repositories found.[/yellow]")
     
@@ -253,6 +371,21 @@ def info_command(storage_manager, embedding_manager):
     
     return True
 
+def _dumps(data) -> str:
+    """
+    Serialize data as indented JSON.
+    
+    Args:
+        data: Data to serialize
+        
+    Returns:
+        str: JSON text
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    
+    return json.dumps(data, indent=2)
+
 def _display_search_results(results):
     """
     Display search results in a table.
@@ -299,7 +432,8 @@ def _display_configuration(config):
     # Embedding settings
     embedding_config = config.get("embeddings", {})
     table.add_row("Embedding Model", embedding_config.get("model", "Default"))
-    table.add_row("Device", embedding_config.get("device", "cpu"))
+    table.add_row("Device", embedding_config.get("device", "auto"))
+    table.add_row("Quantized Index", "Enabled" if embedding_config.get("index_quantize", False) else "Disabled")
     
     # Search settings
     search_config = config.get("search", {})
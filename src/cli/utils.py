@@ -4,19 +4,38 @@ CLI utilities for GitHub Stars Search.
 
 import os
 import sys
+import copy
 import yaml
+import functools
 import logging
 from pathlib import Path
+from typing import Dict, Any, Iterator
+from collections.abc import Mapping
 from rich.console import Console
 from dotenv import load_dotenv
 
 # Initialize console for rich output
 console = Console()
 
+# The libyaml-backed loader parses several times faster when PyYAML is built with it
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 def load_config():
     """
     Load configuration from config.yaml.
     
+    The file is parsed once per process, save_config invalidates the cached configuration.
+    
+    Returns:
+        dict: Configuration dictionary, a copy that callers may modify
+    """
+    return copy.deepcopy(_load_config())
+
+@functools.lru_cache(maxsize=1)
+def _load_config():
+    """
+    Read and parse config.yaml.
+    
     Returns:
         dict: Configuration dictionary
     """
@@ -25,26 +44,43 @@ def load_config():
         "github": {
             "per_page": 100,
             "max_retries": 3,
-            "timeout": 30
+            "timeout": 30,
+            "concurrency": 50,
+            "max_readme_size": 500000
         },
         "content": {
             "max_readme_size": 500000,
             "chunk_strategy": "hybrid",
             "max_chunk_size": 512,
-            "chunk_overlap": 50
+            "chunk_overlap": 50,
+            "workers": None,
+            "cache_size": 256
         },
         "embeddings": {
             "model": "BAAI/bge-small-en-v1.5",
-            "device": "cpu",
+            "device": "auto",
             "batch_size": 32,
-            "cache_enabled": True
+            "gpu_batch_size": 256,
+            "cache_enabled": True,
+            "cache_fuzzy": True,
+            "cache_max_distance": 3,
+            "query_cache_size": 1024,
+            "backend": "torch",
+            "quantize": False,
+            "precision": "auto",
+            "index_backend": "numpy",
+            "index_quantize": False,
+            "index_subvectors": 2,
+            "intra_threads": None,
+            "inter_threads": 1
         },
         "search": {
             "hybrid_enabled": True,
             "neural_weight": 0.7,
             "keyword_weight": 0.3,
             "max_results": 20,
-            "min_score": 0.2
+            "min_score": 0.2,
+            "description_weight": 2
         },
         "storage": {
             "compress_data": True,
@@ -61,7 +97,7 @@ def load_config():
     
     try:
         with open(config_path, "r") as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=YAML_LOADER)
         
         if config is None:
             console.print("[bold yellow]Warning:[/bold yellow] Empty config file, using default configuration.")
@@ -87,6 +123,7 @@ def save_config(config):
     try:
         with open(config_path, "w") as f:
             yaml.dump(config, f, default_flow_style=False, sort_keys=False)
+        _load_config.cache_clear()
         console.print("[bold green]Configuration saved successfully.[/bold green]")
         return True
     except Exception as e:
@@ -130,10 +167,13 @@ def check_environment():
     for subdir in ["repositories", "embeddings", "index"]:
         (data_dir / subdir).mkdir(exist_ok=True)
 
+@functools.lru_cache(maxsize=1)
 def get_github_api_key():
     """
     Get the GitHub API key from environment variables or .env file.
     
+    The key is looked up once per process.
+    
     Returns:
         str: GitHub API key
     
@@ -165,35 +205,78 @@ def get_github_api_key():
     
     return api_key
 
+class LazyComponents(Mapping):
+    """
+    Components needed for the application, each created on first access.
+    
+    Commands only pay for the components they use, e.g. searching doesn't create a GitHub client.
+    """
+    
+    NAMES = ("github_client", "content_processor", "storage_manager", "embedding_manager", "search_engine")
+    
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Initialize the components.
+        
+        Args:
+            config (dict): Configuration dictionary
+        """
+        self.config = config
+        self.components = {}
+    
+    def __getitem__(self, name: str) -> Any:
+        if name not in self.NAMES:
+            raise KeyError(name)
+        
+        if name not in self.components:
+            self.components[name] = self._create(name)
+        
+        return self.components[name]
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.NAMES)
+    
+    def __len__(self) -> int:
+        return len(self.NAMES)
+    
+    def _create(self, name: str) -> Any:
+        """
+        Create a component, along with the components it depends on.
+        
+        Args:
+            name (str): Component name
+        
+        Returns:
+            Component instance
+        """
+        # Import components here to avoid circular imports
+        if name == "github_client":
+            from src.api.github_client import GitHubClient
+            return GitHubClient(self.config.get("github", {}))
+        
+        if name == "content_processor":
+            from src.processor.content_processor import ContentProcessor
+            return ContentProcessor(self.config.get("content", {}))
+        
+        if name == "storage_manager":
+            from src.storage.storage_manager import StorageManager
+            return StorageManager(self.config.get("storage", {}))
+        
+        if name == "embedding_manager":
+            from src.embeddings.embedding_manager import EmbeddingManager
+            return EmbeddingManager(self.config.get("embeddings", {}), self["storage_manager"])
+        
+        from src.search.search_engine import SearchEngine
+        return SearchEngine(self.config.get("search", {}), self["embedding_manager"], self["storage_manager"])
+
+@functools.lru_cache(maxsize=None)
 def get_components():
     """
-    Initialize and return all components needed for the application.
+    Get all components needed for the application.
+    
+    Components are created on first access and once per process, so later calls reuse the loaded model and indexes.
     
     Returns:
-        dict: Dictionary containing all initialized components
-    """
-    # Import components here to avoid circular imports
-    from src.api.github_client import GitHubClient
-    from src.processor.content_processor import ContentProcessor
-    from src.storage.storage_manager import StorageManager
-    from src.embeddings.embedding_manager import EmbeddingManager
-    from src.search.search_engine import SearchEngine
-    
-    # Load configuration
-    config = load_config()
-    
-    # Initialize components
-    storage_manager = StorageManager(config.get("storage", {}))
-    github_client = GitHubClient(config.get("github", {}))
-    content_processor = ContentProcessor(config.get("content", {}))
-    embedding_manager = EmbeddingManager(config.get("embeddings", {}), storage_manager)
-    search_engine = SearchEngine(config.get("search", {}), embedding_manager, storage_manager)
-    
-    # Return components as a dictionary
-    return {
-        "github_client": github_client,
-        "content_processor": content_processor,
-        "storage_manager": storage_manager,
-        "embedding_manager": embedding_manager,
-        "search_engine": search_engine
-    }
+        LazyComponents: Mapping of component name to component
+    """
+    return LazyComponents(load_config())
@@ -0,0 +1,354 @@
+"""
+Approximate nearest neighbor index backends for the txtai embeddings index.
+"""
+
+import os
+import numpy as np
+from typing import BinaryIO, List, Tuple
+from txtai.ann.dense.faiss import Faiss
+from txtai.ann.dense.numpy import NumPy
+
+# Faiss is installed with txtai, imported lazily there so keep it optional here too
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+# SimSIMD provides AVX-512/NEON dot product kernels, NumPy's BLAS product is used without it
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+def quantize_int8(vectors: np.ndarray, subvectors: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize vectors to int8 with a symmetric scale per vector.
+
+    With several subvectors, each row is split into that many consecutive slices and every
+    slice gets its own scale, so a few large components only coarsen the steps of their slice.
+
+    Args:
+        vectors (np.ndarray): Float vectors, one per row
+        subvectors (int): Number of slices per row with a separate scale
+
+    Returns:
+        tuple: int8 vectors and the float32 scale of each row, so that vectors ~= quantized * scale,
+        with one column of scales per subvector if subvectors > 1
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if subvectors > 1:
+        parts = [quantize_int8(part) for part in np.array_split(vectors, subvectors, axis=1)]
+        return np.hstack([quantized for quantized, _ in parts]), np.stack([scales for _, scales in parts], axis=1)
+
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1
+
+    quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+def read_array(handle: BinaryIO, mmap: bool) -> np.ndarray:
+    """
+    Read the next .npy array from an open file.
+
+    Args:
+        handle (file): File opened in binary mode, positioned at the array
+        mmap (bool): Whether to map the array data from the file instead of reading it
+
+    Returns:
+        np.ndarray: Array, a copy-on-write memory map if mmap is set
+    """
+    if not mmap:
+        return np.lib.format.read_array(handle, allow_pickle=False)
+
+    version = np.lib.format.read_magic(handle)
+    header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+    shape, fortran, dtype = header(handle)
+    offset = handle.tell()
+
+    # Empty arrays can't be mapped
+    if not np.prod(shape):
+        return np.empty(shape, dtype=dtype)
+
+    array = np.memmap(handle.name, dtype=dtype, mode="c", offset=offset, shape=shape, order="F" if fortran else "C")
+    handle.seek(offset + array.nbytes)
+    return array
+
+class TopKNumPy(NumPy):
+    """
+    Exact txtai NumPy index scoring every vector with a single matrix product.
+
+    The corpus is held as one contiguous float32 matrix of L2-normalized rows, so the
+    dot product is the cosine similarity, and only the top results are sorted. With the
+    "int8" setting, rows are stored as int8 with a float32 scale each, quartering memory
+    and the bandwidth needed to score them. The "subvectors" setting gives each slice of
+    a row its own scale, which keeps more precision for the same int8 storage.
+
+    Saved indexes are memory-mapped when loaded unless the "mmap" setting is off, so the
+    OS pages vectors in as they are scored and shares them between processes.
+    """
+
+    def __init__(self, config):
+        super().__init__(config)
+
+        # Per-row scales of int8 quantized vectors
+        self.int8 = bool(self.setting("int8"))
+        self.scales = None
+        self.subvectors = int(self.setting("subvectors", 1))
+        self.mmap = bool(self.setting("mmap", True))
+
+    def load(self, path):
+        """
+        Load the index from path.
+
+        Args:
+            path: Path to the index file
+        """
+        if self.setting("safetensors") or not (self.int8 or self.mmap):
+            super().load(path)
+            return
+
+        # Vectors are followed by their scales in int8 indexes
+        with open(path, "rb") as handle:
+            try:
+                self.backend = self.tensor(read_array(handle, self.mmap))
+            except ValueError:
+                # Not a .npy file, e.g. an index pickled by an older txtai version
+                super().load(path)
+                return
+
+            if self.int8:
+                self.scales = read_array(handle, False)
+
+    def index(self, embeddings):
+        """
+        Build the index from embeddings.
+
+        Args:
+            embeddings: Normalized embedding vectors
+        """
+        super().index(embeddings)
+
+        if self.int8:
+            self.backend, self.scales = quantize_int8(self.backend, self.subvectors)
+
+    def append(self, embeddings):
+        """
+        Append embeddings to the index.
+
+        Args:
+            embeddings: Normalized embedding vectors
+        """
+        if not self.int8:
+            super().append(embeddings)
+            return
+
+        vectors, scales = quantize_int8(embeddings, self.subvectors)
+        self.backend = np.concatenate((self.backend, vectors))
+        self.scales = np.concatenate((self.scales, scales))
+
+        # Update id offset and index metadata
+        self.config["offset"] += embeddings.shape[0]
+        self.metadata()
+
+    def save(self, path):
+        """
+        Save the index to path.
+
+        Args:
+            path: Path to the index file
+        """
+        # Write a new file and swap it in, the loaded index may still be mapped from path
+        temp = f"{path}.tmp"
+        if self.int8:
+            with open(temp, "wb") as handle:
+                np.save(handle, self.backend, allow_pickle=False)
+                np.save(handle, self.scales, allow_pickle=False)
+        else:
+            super().save(temp)
+
+        os.replace(temp, path)
+
+    def tensor(self, array):
+        """
+        Store float vectors as a contiguous float32 matrix.
+
+        Args:
+            array: Data array
+
+        Returns:
+            np.ndarray: Contiguous array
+        """
+        # Quantized indexes store packed uint8 or int8 vectors
+        if self.qbits or self.int8:
+            return array
+
+        return np.ascontiguousarray(array, dtype=np.float32)
+
+    def search(self, queries, limit: int) -> List[List[Tuple[int, float]]]:
+        """
+        Find the most similar vectors for each query.
+
+        Args:
+            queries: Normalized query vectors
+            limit (int): Maximum number of results per query
+
+        Returns:
+            list: (id, score) tuples per query, best first
+        """
+        if self.qbits:
+            return super().search(queries, limit)
+
+        if self.int8:
+            queries, scales = quantize_int8(queries)
+            scores = self.int8_similarity(queries) * scales[:, None]
+        else:
+            scores = self.similarity(self.tensor(queries))
+
+        limit = min(limit, scores.shape[1])
+        if limit <= 0:
+            return [[] for _ in scores]
+
+        # Select the top results in linear time and only sort those
+        ids = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+        top = np.take_along_axis(scores, ids, axis=1)
+        order = np.argsort(-top, axis=1)
+        ids = np.take_along_axis(ids, order, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+
+        return [list(zip(row_ids.tolist(), row_scores.tolist())) for row_ids, row_scores in zip(ids, top)]
+
+    def int8_similarity(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Compute the dot product of int8 queries with every stored vector, scaled by the stored scales.
+
+        Args:
+            queries (np.ndarray): int8 query vectors
+
+        Returns:
+            np.ndarray: Scores with one row per query and one column per stored vector
+        """
+        if self.scales.ndim == 1:
+            return self.similarity(queries) * self.scales
+
+        # Score each slice separately since every stored slice has its own scale
+        slices = np.array_split(np.arange(queries.shape[1]), self.scales.shape[1])
+        scores = 0
+        for column, columns in enumerate(slices):
+            start, end = columns[0], columns[-1] + 1
+            scores = scores + self.similarity(queries[:, start:end], self.backend[:, start:end]) * self.scales[:, column]
+
+        return scores
+
+    def similarity(self, queries: np.ndarray, vectors: np.ndarray = None) -> np.ndarray:
+        """
+        Compute the dot product of each query with every stored vector.
+
+        Args:
+            queries (np.ndarray): Normalized query vectors
+            vectors (np.ndarray): Vectors to score, defaults to the stored vectors
+
+        Returns:
+            np.ndarray: Scores with one row per query and one column per stored vector
+        """
+        vectors = self.backend if vectors is None else vectors
+        if simsimd is not None and len(vectors):
+            return np.asarray(simsimd.cdist(queries, vectors, metric="dot", threads=0), dtype=np.float32)
+
+        # float32 sums of int8 products are exact up to ~1000 dimensions and use BLAS unlike integer matmul
+        if self.int8:
+            return queries.astype(np.float32) @ vectors.T.astype(np.float32)
+
+        return queries @ vectors.T
+
+class HNSWFaiss(Faiss):
+    """
+    txtai Faiss index using an HNSW graph for sub-linear lookups in large indexes.
+
+    HNSW graphs can't remove vectors, so deleted ids are kept in the index configuration
+    and excluded at search time.
+    """
+
+    def __init__(self, config):
+        super().__init__(config)
+
+        # Graph degree, build and search beam widths
+        self.m = self.setting("m", 32)
+        self.efconstruction = self.setting("efconstruction", 200)
+        self.efsearch = self.setting("efsearch", 128)
+
+    def configure(self, count, train):
+        """
+        Get the index factory string for a new index.
+
+        Args:
+            count (int): Number of embeddings
+            train (int): Number of embeddings used for training
+
+        Returns:
+            str: Faiss index factory string
+        """
+        storage = "SQ8" if self.setting("quantize") else "Flat"
+        return f"IDMap,HNSW{self.m},{storage}"
+
+    def create(self, embeddings, params):
+        """
+        Create a new index with the configured construction beam width.
+
+        Args:
+            embeddings: Embeddings to index
+            params (str): Faiss index factory string
+
+        Returns:
+            faiss.Index: New index
+        """
+        index = super().create(embeddings, params)
+        faiss.downcast_index(index.index).hnsw.efConstruction = self.efconstruction
+        return index
+
+    def delete(self, ids):
+        """
+        Mark ids as deleted.
+
+        Args:
+            ids (list): Ids to delete
+        """
+        deleted = set(self.config.get("deleted", []))
+        deleted.update(int(x) for x in ids)
+        self.config["deleted"] = sorted(deleted)
+
+    def search(self, queries, limit: int) -> List[List[Tuple[int, float]]]:
+        """
+        Find the most similar vectors for each query.
+
+        Args:
+            queries: Normalized query vectors
+            limit (int): Maximum number of results per query
+
+        Returns:
+            list: (id, score) tuples per query, best first
+        """
+        params = faiss.SearchParametersHNSW(efSearch=max(self.efsearch, limit))
+
+        # Keep references to the selectors, faiss only holds pointers to them
+        deleted = self.config.get("deleted")
+        if deleted:
+            batch = faiss.IDSelectorBatch(np.array(deleted, dtype=np.int64))
+            selector = faiss.IDSelectorNot(batch)
+            params.sel = selector
+
+        scores, ids = self.backend.search(queries, limit, params=params)
+
+        # Fewer than limit results are padded with -1 ids
+        return [
+            [(int(x), float(score)) for x, score in zip(row_ids, row_scores) if x != -1]
+            for row_ids, row_scores in zip(ids, scores)
+        ]
+
+    def count(self) -> int:
+        """
+        Get the number of vectors that haven't been deleted.
+
+        Returns:
+            int: Number of vectors
+        """
+        return self.backend.ntotal - len(self.config.get("deleted", []))
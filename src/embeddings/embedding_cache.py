@@ -0,0 +1,288 @@
+"""
+Content-hash cache for document embeddings.
+"""
+
+import sqlite3
+import hashlib
+import logging
+import numpy as np
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+from src.processor.content_processor import canonicalize_text, content_hash
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of parameters per SQLite query
+QUERY_BATCH_SIZE = 500
+
+# SimHash fingerprints are split into bands so near duplicates can be found with indexed lookups.
+# Fingerprints within SIMHASH_BANDS - 1 bits of each other share at least one band exactly.
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+SIMHASH_BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """
+    Compute a 64-bit SimHash fingerprint of the word shingles of text.
+
+    Args:
+        text (str): Text to fingerprint
+        shingle_size (int): Number of words per shingle
+
+    Returns:
+        int: Unsigned 64-bit fingerprint
+    """
+    words = canonicalize_text(text, lowercase=True).split()
+    shingles = [" ".join(words[i:i + shingle_size]) for i in range(max(len(words) - shingle_size + 1, 1))]
+
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+def _simhash_bands(fingerprint: int) -> List[int]:
+    """
+    Split a SimHash fingerprint into bands.
+
+    Args:
+        fingerprint (int): SimHash fingerprint
+
+    Returns:
+        list: Band values
+    """
+    mask = (1 << SIMHASH_BAND_BITS) - 1
+    return [fingerprint >> (band * SIMHASH_BAND_BITS) & mask for band in range(SIMHASH_BANDS)]
+
+def _to_signed(fingerprint: int) -> int:
+    """
+    Convert an unsigned 64-bit fingerprint to the signed integer SQLite stores.
+    """
+    return fingerprint - (1 << 64) if fingerprint >= 1 << 63 else fingerprint
+
+class EmbeddingCache:
+    """
+    Cache of embedding vectors keyed by model name and SHA-256 of the canonical encoded text.
+
+    Texts without an exact match can optionally reuse the vector of a near duplicate,
+    found by SimHash Hamming distance.
+    """
+
+    def __init__(self, path: Path, fuzzy: bool = True, max_distance: int = 3):
+        """
+        Initialize the embedding cache.
+
+        Args:
+            path (Path): Path to the SQLite database file
+            fuzzy (bool): Whether to reuse vectors of near-duplicate texts
+            max_distance (int): Maximum SimHash Hamming distance for a fuzzy match
+        """
+        self.path = path
+        self.fuzzy = fuzzy
+        self.max_distance = min(max_distance, SIMHASH_BANDS - 1)
+        self.connection = None
+
+        # Cache statistics
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open the cache database, creating it if needed.
+
+        Returns:
+            sqlite3.Connection: Database connection
+        """
+        if self.connection is None:
+            self.path.parent.mkdir(exist_ok=True, parents=True)
+            self.connection = sqlite3.connect(str(self.path), check_same_thread=False)
+            bands = ", ".join(f"band{band} INTEGER" for band in range(SIMHASH_BANDS))
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                f"(model TEXT, hash TEXT, simhash INTEGER, {bands}, vector BLOB, PRIMARY KEY (model, hash))"
+            )
+            for band in range(SIMHASH_BANDS):
+                self.connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS embeddings_band{band} ON embeddings (model, band{band})"
+                )
+
+        return self.connection
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """
+        Hash text for use as a cache key.
+
+        Args:
+            text (str): Text to hash
+
+        Returns:
+            str: Hex digest of the canonical text
+        """
+        return content_hash(text)
+
+    def encode(self, model_name: str, texts: List[str], encoder: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Encode texts, loading cached vectors and only running the encoder on cache misses.
+
+        Args:
+            model_name (str): Name of the embedding model
+            texts (list): Texts to encode
+            encoder (callable): Function encoding a list of texts into a 2D array
+
+        Returns:
+            np.ndarray: Embedding vectors in the same order as texts
+        """
+        hashes = [self.hash_text(text) for text in texts]
+        vectors = self.get(model_name, hashes)
+
+        # Encode each missing text once, even if it appears several times
+        missing = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in vectors:
+                missing.setdefault(text_hash, text)
+
+        # Reuse vectors of near duplicates, e.g. chunks with a typo fixed upstream
+        fingerprints = {text_hash: simhash(text) for text_hash, text in missing.items()}
+        for text_hash, fingerprint in fingerprints.items():
+            vector = self.get_similar(model_name, fingerprint) if self.fuzzy else None
+            if vector is not None:
+                vectors[text_hash] = vector
+                self.fuzzy_hits += sum(1 for other in hashes if other == text_hash)
+                del missing[text_hash]
+
+        missed = sum(1 for text_hash in hashes if text_hash in missing)
+        self.misses += missed
+        self.hits += len(hashes) - missed
+
+        if missing:
+            encoded = encoder(list(missing.values()))
+            new_vectors = dict(zip(missing.keys(), np.asarray(encoded, dtype=np.float32)))
+            self.put(model_name, new_vectors, fingerprints)
+            vectors.update(new_vectors)
+
+        return np.stack([vectors[text_hash] for text_hash in hashes])
+
+    def get(self, model_name: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Get cached vectors.
+
+        Args:
+            model_name (str): Name of the embedding model
+            hashes (list): Text hashes to look up
+
+        Returns:
+            dict: Text hash to vector for every cache hit
+        """
+        vectors = {}
+
+        try:
+            connection = self._connect()
+            unique_hashes = list(set(hashes))
+
+            for i in range(0, len(unique_hashes), QUERY_BATCH_SIZE):
+                batch = unique_hashes[i:i + QUERY_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = connection.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model_name, *batch]
+                )
+                for text_hash, vector in rows:
+                    vectors[text_hash] = np.frombuffer(vector, dtype=np.float32).copy()
+
+        except sqlite3.Error as e:
+            logger.warning(f"Error reading embedding cache: {str(e)}")
+
+        return vectors
+
+    def get_similar(self, model_name: str, fingerprint: int) -> Optional[np.ndarray]:
+        """
+        Get the cached vector of the nearest text within max_distance SimHash bits.
+
+        Args:
+            model_name (str): Name of the embedding model
+            fingerprint (int): SimHash fingerprint of the text
+
+        Returns:
+            np.ndarray: Cached vector or None if there is no near duplicate
+        """
+        try:
+            connection = self._connect()
+            conditions = " OR ".join(f"band{band} = ?" for band in range(SIMHASH_BANDS))
+            rows = connection.execute(
+                f"SELECT simhash, vector FROM embeddings WHERE model = ? AND ({conditions})",
+                [model_name, *_simhash_bands(fingerprint)]
+            )
+
+            best: Optional[Tuple[int, bytes]] = None
+            for candidate, vector in rows:
+                distance = bin((candidate ^ fingerprint) & ((1 << 64) - 1)).count("1")
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, vector)
+
+            if best is not None:
+                return np.frombuffer(best[1], dtype=np.float32).copy()
+
+        except sqlite3.Error as e:
+            logger.warning(f"Error reading embedding cache: {str(e)}")
+
+        return None
+
+    def put(self, model_name: str, vectors: Dict[str, np.ndarray], fingerprints: Dict[str, int]):
+        """
+        Store vectors in the cache.
+
+        Args:
+            model_name (str): Name of the embedding model
+            vectors (dict): Text hash to vector
+            fingerprints (dict): Text hash to SimHash fingerprint
+        """
+        try:
+            connection = self._connect()
+            columns = ", ".join(f"band{band}" for band in range(SIMHASH_BANDS))
+            placeholders = ", ".join("?" * (SIMHASH_BANDS + 4))
+            connection.executemany(
+                f"INSERT OR REPLACE INTO embeddings (model, hash, simhash, {columns}, vector) VALUES ({placeholders})",
+                [
+                    (
+                        model_name,
+                        text_hash,
+                        _to_signed(fingerprints[text_hash]),
+                        *_simhash_bands(fingerprints[text_hash]),
+                        vector.astype(np.float32).tobytes()
+                    )
+                    for text_hash, vector in vectors.items()
+                ]
+            )
+            connection.commit()
+
+        except sqlite3.Error as e:
+            logger.warning(f"Error writing embedding cache: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache hit statistics.
+
+        Returns:
+            dict: Cache hits (including fuzzy hits), fuzzy hits, misses and hit rate
+        """
+        total = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+    def close(self):
+        """
+        Close the cache database.
+        """
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
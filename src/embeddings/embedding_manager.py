@@ -5,19 +5,71 @@ Embedding manager for GitHub Stars Search.
 import os
 import time
 import logging
+import functools
+import itertools
 import numpy as np
+import torch
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import sentence_transformers # needed to get rid of OMP error when dealing with txtai
 from txtai.embeddings import Embeddings
 
+# ONNX Runtime is only installed with the onnx backend extras
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+from src.embeddings.embedding_cache import EmbeddingCache
+from src.processor.content_processor import content_hash
+
 logger = logging.getLogger(__name__)
 
+# ONNX export with dynamic INT8 quantization for AVX-512 VNNI CPUs
+QUANTIZED_ONNX_FILE = "onnx/model_qint8_avx512_vnni.onnx"
+
+# txtai ANN backends for the vector index; other names (e.g. "faiss") are passed to txtai as is
+INDEX_BACKENDS = {"numpy": "src.embeddings.ann_index.TopKNumPy", "hnsw": "src.embeddings.ann_index.HNSWFaiss"}
+
+# Maximum number of repository ids per query for the indexed chunks of repositories
+REPOSITORY_QUERY_BATCH_SIZE = 500
+
+# Torch dtypes used to load the model for reduced precision inference
+PRECISION_DTYPES = {"fp16": "float16", "bf16": "bfloat16"}
+
+def has_mps() -> bool:
+    """
+    Check whether an Apple silicon GPU is available through Metal Performance Shaders.
+    
+    Returns:
+        bool: True if torch can run on the MPS device, unless disabled with PYTORCH_MPS_DISABLE=1 as in txtai
+    """
+    return os.environ.get("PYTORCH_MPS_DISABLE") != "1" and torch.backends.mps.is_available()
+
+def cpu_supports_bf16() -> bool:
+    """
+    Check whether the CPU has native BF16 matrix instructions (AVX512-BF16 or AMX).
+    
+    Returns:
+        bool: True if BF16 matmuls run natively instead of being emulated in FP32
+    """
+    try:
+        return torch.cpu._is_avx512_bf16_supported() or torch.cpu._is_amx_tile_supported()
+    except AttributeError:
+        # Private checks missing from this torch version
+        return False
+
 class EmbeddingManager:
     """
     Manager for generating and storing embeddings.
     """
     
+    # Loaded vector models shared by all instances, keyed by txtai on model path and arguments
+    _MODEL_CACHE: Dict[str, Any] = {}
+    
+    # ONNX Runtime session options by (intra, inter) thread counts, reused so model cache keys stay stable
+    _SESSION_OPTIONS: Dict[Tuple[int, int], Any] = {}
+    
     def __init__(self, config: Dict[str, Any], storage_manager):
         """
         Initialize the embedding manager.
@@ -27,13 +79,64 @@ class EmbeddingManager:
             storage_manager: Storage manager instance
         """
         self.model_name = config.get("model", "BAAI/bge-small-en-v1.5")
-        self.device = config.get("device", "cpu")
+        self.device = config.get("device", "auto")
         self.batch_size = config.get("batch_size", 32)
         self.cache_enabled = config.get("cache_enabled", True)
+        self.cache_fuzzy = config.get("cache_fuzzy", True)
+        self.cache_max_distance = config.get("cache_max_distance", 3)
+        self.query_cache_size = config.get("query_cache_size", 1024)
+        self.backend = config.get("backend", "torch")
+        self.quantize = config.get("quantize", False)
+        self.onnx_file = config.get("onnx_file")
+        self.precision = config.get("precision", "auto")
+        self.index_backend = config.get("index_backend", "numpy")
+        self.index_quantize = config.get("index_quantize", False)
+        self.index_subvectors = int(config.get("index_subvectors", 2))
+        self.intra_threads = int(config.get("intra_threads") or os.cpu_count() or 1)
+        self.inter_threads = int(config.get("inter_threads") or 1)
+        self.model_args = {}
+        
+        # Resolve the inference device and use larger batches on a GPU, where throughput keeps scaling
+        if self.device == "auto":
+            self.device = "cuda" if torch.cuda.is_available() else "mps" if has_mps() else "cpu"
+        if self.device != "cpu":
+            self.batch_size = config.get("gpu_batch_size") or self.batch_size
+        
+        # Half precision doubles tensor core throughput on a GPU at negligible accuracy cost for sentence embeddings
+        if self.precision == "auto":
+            if self.device != "cpu" and self.backend == "torch":
+                self.precision = "bf16" if torch.cuda.is_available() and torch.cuda.is_bf16_supported() else "fp16"
+            else:
+                self.precision = "fp32"
+        
+        # FP16 kernels are only fast on a GPU and dynamic int8 quantization only runs on a CPU
+        if self.precision == "fp16" and self.device == "cpu":
+            logger.warning("FP16 precision requires a GPU, using FP32 on the CPU")
+            self.precision = "fp32"
+        elif self.precision == "bf16" and self.device == "cpu" and not cpu_supports_bf16():
+            logger.warning("BF16 precision requires a CPU with AVX512-BF16 or AMX, using FP32")
+            self.precision = "fp32"
+        elif self.precision == "int8" and self.device != "cpu":
+            logger.warning("INT8 precision requires the CPU, using FP32 on the GPU")
+            self.precision = "fp32"
         
         self.storage_manager = storage_manager
         self.embeddings = None
         
+        # Whether the index has changes that haven't been saved, and the repositories they embed,
+        # written and marked embedded by flush
+        self._dirty = False
+        self._pending_embedded = []
+        
+        # Chunk-level vector cache, kept in a subdirectory so index recovery leaves it in place
+        self.embedding_cache = None
+        if self.cache_enabled:
+            self.embedding_cache = EmbeddingCache(
+                self.storage_manager.get_embeddings_path() / "cache" / "embeddings.db",
+                fuzzy=self.cache_fuzzy,
+                max_distance=self.cache_max_distance
+            )
+        
         # Initialize embeddings
         self._initialize_embeddings()
     
@@ -45,12 +148,7 @@ class EmbeddingManager:
         
         try:
             # Create embeddings instance
-            self.embeddings = Embeddings({
-                "path": self.model_name,
-                "method": "sentence-transformers",
-                "device": self.device,
-                "content": True
-            })
+            self.embeddings = self._create_embeddings()
             
             # Load existing index if available
             index_path = self.storage_manager.get_embeddings_path() / "index"
@@ -59,18 +157,18 @@ class EmbeddingManager:
             if index_path.exists() and embeddings_file.exists():
                 logger.info("Loading existing embeddings index")
                 try:
-                    self.embeddings.load(str(index_path))
+                    # Override the stored model arguments so backend changes take effect
+                    self.embeddings.load(str(index_path), config={"vectors": self.model_args})
+                    
+                    # Loading replaces the vectors model
+                    self._prepare_vectors(self.embeddings)
                 except Exception as e:
+                    # Start from an empty index, built by the first upsert
                     logger.warning(f"Failed to load existing index: {str(e)}. Creating a new one.")
-                    # Create an empty index
-                    self.embeddings.index([])
-                    self._save_embeddings()
+                    self.embeddings = self._create_embeddings()
             elif index_path.exists():
-                # Index directory exists but embeddings file doesn't
+                # Index directory exists but embeddings file doesn't, e.g. nothing was embedded yet
                 logger.warning("Index directory exists but embeddings file is missing. Creating a new index.")
-                # Create an empty index
-                self.embeddings.index([])
-                self._save_embeddings()
             
             logger.info("Embeddings initialized successfully")
         
@@ -78,6 +176,243 @@ class EmbeddingManager:
             logger.error(f"Error initializing embeddings: {str(e)}")
             raise
     
+    def _get_gpu(self) -> Any:
+        """
+        Translate the configured device into txtai's gpu setting, which selects the inference device.
+        
+        Returns:
+            bool or int: False for CPU, True for the default GPU or a GPU device id
+        """
+        if self.device == "cpu":
+            return False
+        
+        # Device with an explicit index, e.g. cuda:1
+        if ":" in self.device:
+            return int(self.device.split(":")[1])
+        
+        return True
+    
+    def _get_model_args(self) -> Dict[str, Any]:
+        """
+        Get the keyword arguments passed to SentenceTransformer for the configured backend.
+        
+        Returns:
+            dict: SentenceTransformer keyword arguments, empty for the default torch backend
+        """
+        if self.backend == "torch":
+            if self.precision in PRECISION_DTYPES:
+                return {"model_kwargs": {"torch_dtype": PRECISION_DTYPES[self.precision]}}
+            return {}
+        
+        model_args = {"backend": self.backend}
+        
+        file_name = self.onnx_file
+        if file_name is None and (self.quantize or self.precision == "int8") and self.backend == "onnx":
+            file_name = QUANTIZED_ONNX_FILE
+        
+        model_kwargs = {}
+        if file_name:
+            model_kwargs["file_name"] = file_name
+        
+        # Run ONNX matmuls on every core instead of ONNX Runtime's configured thread count
+        if self.backend == "onnx" and self.device == "cpu" and ort is not None:
+            model_kwargs["provider"] = "CPUExecutionProvider"
+            model_kwargs["session_options"] = self._get_session_options()
+        
+        if model_kwargs:
+            model_args["model_kwargs"] = model_kwargs
+        
+        return model_args
+    
+    def _get_session_options(self):
+        """
+        Get ONNX Runtime session options for the configured thread counts.
+        
+        Returns:
+            onnxruntime.SessionOptions: Session options
+        """
+        key = (self.intra_threads, self.inter_threads)
+        if key not in EmbeddingManager._SESSION_OPTIONS:
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = self.intra_threads
+            options.inter_op_num_threads = self.inter_threads
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            EmbeddingManager._SESSION_OPTIONS[key] = options
+        
+        return EmbeddingManager._SESSION_OPTIONS[key]
+    
+    def _create_embeddings(self) -> Embeddings:
+        """
+        Create the txtai embeddings instance for the configured model and backend.
+        
+        Returns:
+            Embeddings: Embeddings instance
+        """
+        config = {
+            "path": self.model_name,
+            "method": "sentence-transformers",
+            "device": self.device,
+            "gpu": self._get_gpu(),
+            "backend": INDEX_BACKENDS.get(self.index_backend, self.index_backend),
+            "content": True,
+            "encodebatch": self.batch_size
+        }
+        
+        # Store index vectors as 8-bit integers; the setting is saved with the index
+        if self.index_quantize:
+            if self.index_backend == "numpy":
+                config[config["backend"]] = {"int8": True, "subvectors": self.index_subvectors}
+            elif self.index_backend in ("faiss", "hnsw"):
+                # Backend setting for SQ8 storage; a root-level quantize would build a binary index
+                config[config["backend"]] = {"quantize": 8}
+            else:
+                logger.warning(f"Index quantization is not supported by the {self.index_backend} backend")
+        
+        model_args = self._get_model_args()
+        if model_args:
+            config["vectors"] = model_args
+        
+        # Quantization modifies the model in place, so keep quantized models out of the shared cache
+        models = {} if self._quantize_dynamic() else EmbeddingManager._MODEL_CACHE
+        
+        try:
+            embeddings = Embeddings(config, models=models)
+        except Exception as e:
+            file_name = model_args.get("model_kwargs", {}).get("file_name")
+            if not file_name:
+                raise
+            
+            logger.warning(f"Failed to load {file_name} for {self.model_name}: {str(e)}")
+            embeddings = None
+            
+            # Most model repositories don't ship a quantized model, quantize a local ONNX export instead
+            if file_name == QUANTIZED_ONNX_FILE:
+                path = self._export_quantized_onnx()
+                if path is not None:
+                    try:
+                        embeddings = Embeddings(dict(config, path=path), models=models)
+                    except Exception as e:
+                        logger.warning(f"Failed to load quantized export of {self.model_name}: {str(e)}")
+            
+            # Otherwise export the model on the fly via optimum
+            if embeddings is None:
+                logger.warning(f"Exporting {self.model_name} to ONNX without {file_name}")
+                model_kwargs = {key: value for key, value in model_args["model_kwargs"].items() if key != "file_name"}
+                model_args = {"backend": self.backend, "model_kwargs": model_kwargs} if model_kwargs else {"backend": self.backend}
+                config["vectors"] = model_args
+                embeddings = Embeddings(config, models=models)
+        
+        self.model_args = model_args
+        self._prepare_vectors(embeddings)
+        return embeddings
+    
+    def _export_quantized_onnx(self) -> Optional[str]:
+        """
+        Export the model to ONNX with weights dynamically quantized to INT8 for AVX-512 VNNI CPUs.
+        
+        The export is kept with the embeddings, so a model is only exported and quantized once.
+        
+        Returns:
+            str: Local model directory holding QUANTIZED_ONNX_FILE or None if the export failed
+        """
+        path = self.storage_manager.get_embeddings_path() / "models" / self.model_name.replace("/", "--")
+        if (path / QUANTIZED_ONNX_FILE).exists():
+            return str(path)
+        
+        logger.info(f"Exporting {self.model_name} to a quantized ONNX model")
+        
+        try:
+            from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+            
+            model = sentence_transformers.SentenceTransformer(self.model_name, backend="onnx", device="cpu")
+            model.save(str(path))
+            export_dynamic_quantized_onnx_model(model, "avx512_vnni", str(path))
+            return str(path)
+        
+        except Exception as e:
+            logger.warning(f"Failed to export quantized ONNX model for {self.model_name}: {str(e)}")
+            return None
+    
+    def _quantize_dynamic(self) -> bool:
+        """
+        Check whether the torch model is quantized to int8 after loading.
+        
+        Returns:
+            bool: True for int8 precision with the torch backend
+        """
+        return self.precision == "int8" and self.backend == "torch"
+    
+    def _prepare_vectors(self, embeddings: Embeddings):
+        """
+        Prepare a newly created or loaded vectors model for encoding.
+        
+        Args:
+            embeddings (Embeddings): Embeddings instance
+        """
+        model = getattr(embeddings, "model", None)
+        if model is not None and self._quantize_dynamic():
+            # Dynamic quantization stores Linear weights as int8 and quantizes activations on the fly
+            torch.ao.quantization.quantize_dynamic(model.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        
+        if model is not None and self.precision in PRECISION_DTYPES:
+            encode = model.encode
+            
+            # Half precision models return half precision vectors, cached and indexed as float32
+            def float32_encode(data, category=None):
+                return np.asarray(encode(data, category), dtype=np.float32)
+            
+            model.encode = float32_encode
+        
+        self._install_cache(embeddings)
+    
+    def _install_cache(self, embeddings: Embeddings):
+        """
+        Route encoding of the txtai vectors model through the query and embedding caches.
+        
+        Args:
+            embeddings (Embeddings): Embeddings instance
+        """
+        model = getattr(embeddings, "model", None)
+        if model is None or (self.embedding_cache is None and not self.query_cache_size):
+            return
+        
+        encode = model.encode
+        
+        # Backend, precision and ONNX file all change the vectors, so cached chunks are only reused by the same setup
+        onnx_file = self.model_args.get("model_kwargs", {}).get("file_name")
+        cache_key = f"{self.model_name}|{self.backend}|{self.precision}|{onnx_file}"
+        
+        @functools.lru_cache(maxsize=self.query_cache_size)
+        def encode_query(query):
+            vector = encode([query], "query")[0]
+            vector.setflags(write=False)
+            return vector
+        
+        def cached_encode(data, category=None):
+            # Popular queries repeat, so keep their vectors in memory rather than in the chunk cache
+            if category == "query" and self.query_cache_size and all(isinstance(query, str) for query in data):
+                return np.stack([encode_query(" ".join(query.split())) for query in data])
+            
+            if category != "data" or self.embedding_cache is None:
+                return encode(data, category)
+            
+            return self.embedding_cache.encode(cache_key, list(data), lambda texts: encode(texts, category))
+        
+        model.encode = cached_encode
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get chunk-level embedding cache statistics.
+        
+        Returns:
+            dict: Cache hits, fuzzy hits, misses and hit rate
+        """
+        if self.embedding_cache is None:
+            return {"hits": 0, "fuzzy_hits": 0, "misses": 0, "hit_rate": 0.0}
+        
+        return self.embedding_cache.get_stats()
+    
     def generate_embeddings(self, repo_id: int, chunks: List[Dict[str, Any]]) -> bool:
         """
         Generate embeddings for repository chunks.
@@ -89,59 +424,175 @@ class EmbeddingManager:
         Returns:
             bool: True if successful, False otherwise
         """
-        logger.info(f"Generating embeddings for repository {repo_id}")
+        # A single repository is a batch of one, upserted so other repositories stay in the index
+        result = self.generate_embeddings_batch({repo_id: chunks})[repo_id]
+        return self.flush() and result
+    
+    def generate_embeddings_batch(self, repo_chunks: Dict[int, List[Dict[str, Any]]]) -> Dict[int, bool]:
+        """
+        Generate embeddings for the chunks of several repositories in a single indexing pass.
         
-        try:
+        The index is saved and the repositories are marked embedded by flush.
+        
+        Args:
+            repo_chunks (dict): Repository ID to list of content chunks
+        
+        Returns:
+            dict: Repository ID to True if successful, False otherwise
+        """
+        logger.info(f"Generating embeddings for {len(repo_chunks)} repositories")
+        
+        results = {}
+        pending = []
+        pending_chunks = []
+        
+        for repo_id, chunks in repo_chunks.items():
             # Skip if no chunks
             if not chunks:
                 logger.warning(f"No chunks to embed for repository {repo_id}")
-                return False
+                results[repo_id] = False
+                continue
             
-            # Check if embeddings already exist and are up to date
+            # Skip if embeddings already exist and are up to date
             if self.cache_enabled and self.storage_manager.has_embeddings(repo_id):
                 logger.info(f"Embeddings already exist for repository {repo_id}")
-                return True
+                results[repo_id] = True
+                continue
             
-            # Prepare documents for embedding
-            documents = []
-            for chunk in chunks:
-                # Create document with metadata
-                document = {
-                    "id": chunk["id"],
-                    "text": chunk["content"],
-                    "repo_id": chunk["repo_id"],
-                    "repo_name": chunk["repo_name"],
-                    "chunk_type": chunk["chunk_type"]
-                }
-                
-                # Add additional metadata
-                if "section_index" in chunk:
-                    document["section_index"] = chunk["section_index"]
-                if "window_index" in chunk:
-                    document["window_index"] = chunk["window_index"]
-                
-                documents.append(document)
+            pending_chunks.extend(chunks)
+            pending.append(repo_id)
+        
+        if not pending_chunks:
+            return results
+        
+        try:
+            # Chunks no longer produced from the README, e.g. after a section was removed, stop matching searches
+            indexed = self._get_indexed_chunks(pending)
+            chunk_ids = {chunk["id"] for chunk in pending_chunks}
+            stale = [uid for uid in indexed if uid not in chunk_ids]
+            if stale:
+                self.embeddings.delete(stale)
+                self._dirty = True
             
-            # Generate embeddings
-            self.embeddings.index(documents, self.batch_size)
+            # Chunks indexed with the same text are left in place, e.g. all but the edited sections of a README
+            documents = (
+                document for document in self._prepare_documents(pending_chunks)
+                if indexed.get(document["id"]) != document["content_hash"]
+            )
             
-            # Save embeddings
-            self._save_embeddings(repo_id)
+            first = next(documents, None)
+            if first is not None:
+                # Stream documents so txtai holds one encoding batch at a time, and upsert so
+                # repositories embedded in earlier runs stay in the index
+                self.embeddings.upsert(itertools.chain([first], documents))
+                
+                # Saving rewrites the whole index, so it's left to flush once all batches are indexed
+                self._dirty = True
             
-            return True
+            # Repositories are only marked embedded once their vectors are saved
+            self._pending_embedded.extend(pending)
+            for repo_id in pending:
+                results[repo_id] = True
         
         except Exception as e:
-            logger.error(f"Error generating embeddings for repository {repo_id}: {str(e)}")
-            return False
+            logger.error(f"Error generating embeddings for {len(pending)} repositories: {str(e)}")
+            for repo_id in pending:
+                results[repo_id] = False
+        
+        return results
     
-    def _save_embeddings(self, repo_id: Optional[int] = None):
+    def _get_indexed_chunks(self, repo_ids: List[int]) -> Dict[str, Optional[str]]:
         """
-        Save embeddings to disk.
+        Get the chunks of repositories already in the index.
+        
+        Args:
+            repo_ids (list): Repository IDs to look up
+        
+        Returns:
+            dict: Chunk ID to content hash for every indexed chunk of the repositories,
+            None for chunks indexed without a hash
+        """
+        chunks = {}
+        
+        try:
+            count = self.embeddings.count()
+            if not count:
+                return chunks
+            
+            for i in range(0, len(repo_ids), REPOSITORY_QUERY_BATCH_SIZE):
+                batch = repo_ids[i:i + REPOSITORY_QUERY_BATCH_SIZE]
+                values = ", ".join(str(int(repo_id)) for repo_id in batch)
+                rows = self.embeddings.search(f"select id, content_hash from txtai where repo_id in ({values})", count)
+                for row in rows:
+                    chunks[row["id"]] = row.get("content_hash")
+        
+        except Exception as e:
+            logger.warning(f"Error reading indexed chunks: {str(e)}")
+        
+        return chunks
+    
+    def _prepare_documents(self, chunks: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Convert content chunks into documents for the embeddings index.
         
         Args:
-            repo_id (int, optional): Repository ID to save embeddings for
+            chunks (list): List of content chunks
+        
+        Yields:
+            dict: Document with metadata
+        """
+        for chunk in chunks:
+            # Create document with metadata
+            document = {
+                "id": chunk["id"],
+                "text": chunk["content"],
+                "repo_id": chunk["repo_id"],
+                "repo_name": chunk["repo_name"],
+                "chunk_type": chunk["chunk_type"],
+                "content_hash": chunk.get("content_hash") or content_hash(chunk["content"])
+            }
+            
+            # Add additional metadata
+            if "section_index" in chunk:
+                document["section_index"] = chunk["section_index"]
+            if "window_index" in chunk:
+                document["window_index"] = chunk["window_index"]
+            
+            yield document
+    
+    def flush(self) -> bool:
+        """
+        Save the embeddings index if it changed since it was last saved, then mark the
+        repositories embedded since the last flush.
+        
+        Returns:
+            bool: True if successful, False if the index couldn't be saved
+        """
+        if self._dirty:
+            if not self._save_embeddings():
+                # Left pending, so a later flush can still save them
+                return False
+            self._dirty = False
+        
+        if self._pending_embedded:
+            self.storage_manager.mark_repositories_embedded(self._pending_embedded)
+            self._pending_embedded = []
+        
+        return True
+    
+    def _save_embeddings(self) -> bool:
+        """
+        Save embeddings to disk.
+        
+        Returns:
+            bool: True if successful, False otherwise
         """
         try:
+            # An empty index has no vectors or database to save, it's rebuilt by the first upsert
+            if not self.embeddings.count():
+                logger.info("Embeddings index is empty, nothing to save")
+                return True
+            
             # Create embeddings directory if it doesn't exist
             embeddings_dir = self.storage_manager.get_embeddings_path()
             embeddings_dir.mkdir(exist_ok=True, parents=True)
@@ -151,37 +602,12 @@ class EmbeddingManager:
             index_path.mkdir(exist_ok=True, parents=True)
             
             # Save embeddings index
-            try:
-                self.embeddings.save(str(index_path))
-                logger.info(f"Embeddings saved to {index_path}")
-            except AttributeError as e:
-                if "'NoneType' object has no attribute 'commit'" in str(e):
-                    logger.warning("Database connection issue detected. Attempting to fix...")
-                    
-                    # Force initialize the database
-                    try:
-                        # Create a simple document to initialize the database
-                        self.embeddings.index([{
-                            "id": "init-doc",
-                            "text": "Initialization document",
-                            "repo_id": 0,
-                            "repo_name": "initialization",
-                            "chunk_type": "init"
-                        }])
-                        
-                        # Try saving again
-                        self.embeddings.save(str(index_path))
-                        logger.info("Successfully initialized and saved the index")
-                    except Exception as init_error:
-                        logger.error(f"Failed to initialize database: {str(init_error)}")
-                else:
-                    raise
-            
-            # If repo_id is provided, mark as embedded
-            if repo_id is not None:
-                self.storage_manager.mark_repository_embedded(repo_id)
+            self.embeddings.save(str(index_path))
+            logger.info(f"Embeddings saved to {index_path}")
+            return True
         except Exception as e:
             logger.error(f"Error saving embeddings: {str(e)}")
+            return False
     
     def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """
@@ -202,13 +628,9 @@ class EmbeddingManager:
                 logger.error("Embeddings not initialized")
                 return []
             
-            # Check if index exists
-            index_path = self.storage_manager.get_embeddings_path() / "index"
-            if not index_path.exists():
-                logger.warning("No embeddings index found. Creating empty index.")
-                # Create an empty index
-                self.embeddings.index([])
-                self._save_embeddings()
+            # Nothing has been embedded yet
+            if not self.embeddings.count():
+                logger.warning("No embeddings index found")
                 return []
             
             try:
@@ -218,88 +640,51 @@ class EmbeddingManager:
                 error_msg = str(search_error)
                 # Handle specific database errors
                 if "No indexes available" in error_msg:
-                    logger.warning("No indexes available for search. Attempting to fix...")
-                    
-                    # Force initialize the database
-                    try:
-                        # Create a simple document to initialize the database
-                        self.embeddings.index([{
-                            "id": "init-doc",
-                            "text": "Initialization document",
-                            "repo_id": 0,
-                            "repo_name": "initialization",
-                            "chunk_type": "init"
-                        }])
-                        
-                        # Try saving
-                        self._save_embeddings()
-                        
-                        # Try searching again
-                        try:
-                            results = self.embeddings.search(query, limit)
-                            logger.info("Successfully fixed the index and performed search")
-                            # Continue with normal processing
-                        except Exception as retry_error:
-                            logger.error(f"Failed to search after fixing index: {str(retry_error)}")
-                            return []
-                    except Exception as init_error:
-                        logger.error(f"Failed to initialize database: {str(init_error)}")
-                        return []
+                    # The index holds no vectors to search
+                    logger.warning("No indexes available for search")
+                    return []
                 elif "no such table: sections" in error_msg or "'NoneType' object has no attribute" in error_msg:
                     logger.warning(f"Database schema issue detected: {error_msg}. Recreating index.")
                     
-                    # Remove the corrupted index file and any related files
+                    # Move the corrupted index aside in a single rename, so either the old index or none is in place
                     embeddings_dir = self.storage_manager.get_embeddings_path()
                     index_path = embeddings_dir / "index"
                     
-                    # Clean up all files in the embeddings directory
                     try:
-                        for file in embeddings_dir.glob("*"):
-                            if file.is_file():
-                                # Create a backup directory if it doesn't exist
-                                backup_dir = embeddings_dir / "backup"
-                                backup_dir.mkdir(exist_ok=True)
-                                
-                                # Move the file to the backup directory
-                                backup_file = backup_dir / f"{file.name}.{int(time.time())}"
-                                file.rename(backup_file)
-                                logger.info(f"Moved {file} to {backup_file}")
+                        backup_dir = embeddings_dir / "backup"
+                        backup_dir.mkdir(exist_ok=True)
+                        backup_path = backup_dir / f"index.{int(time.time())}"
+                        os.replace(index_path, backup_path)
+                        logger.info(f"Moved {index_path} to {backup_path}")
                     except Exception as e:
-                        logger.warning(f"Error cleaning up embeddings directory: {str(e)}")
+                        logger.warning(f"Error backing up embeddings index: {str(e)}")
                     
-                    # Re-initialize the embeddings object
-                    self.embeddings = Embeddings({
-                        "path": self.model_name,
-                        "method": "sentence-transformers",
-                        "device": self.device,
-                        "content": True
-                    })
-                    
-                    # Create a new empty index
-                    self.embeddings.index([])
-                    self._save_embeddings()
+                    # Re-initialize the embeddings object, the first upsert builds the new index
+                    self.embeddings = self._create_embeddings()
                     return []
                 else:
                     # Re-raise other errors
                     raise
             
+            # Load each result repository once, several chunks often come from the same repository
+            results = [result for result in results if isinstance(result, dict) and "repo_id" in result]
+            repositories = self.storage_manager.get_repositories(result["repo_id"] for result in results)
+            
             # Format results
             formatted_results = []
             for result in results:
                 # Get repository data
                 # Handle both string and integer repo_id
-                if isinstance(result, dict) and "repo_id" in result:
-                    repo_id = result["repo_id"]
-                    repo_data = self.storage_manager.get_repository(int(repo_id))
-                    
-                    if repo_data:
-                        formatted_results.append({
-                            "id": result["id"],
-                            "score": result["score"],
-                            "text": result["text"],
-                            "repository": repo_data,
-                            "chunk_type": result["chunk_type"]
-                        })
+                repo_data = repositories.get(int(result["repo_id"]))
+                
+                if repo_data:
+                    formatted_results.append({
+                        "id": result["id"],
+                        "score": result["score"],
+                        "text": result["text"],
+                        "repository": repo_data,
+                        "chunk_type": result["chunk_type"]
+                    })
             
             return formatted_results
         
@@ -317,5 +702,13 @@ class EmbeddingManager:
         return {
             "model_name": self.model_name,
             "device": self.device,
-            "batch_size": self.batch_size
+            "batch_size": self.batch_size,
+            "backend": self.backend,
+            "quantize": self.quantize,
+            "precision": self.precision,
+            "index_backend": self.index_backend,
+            "index_quantize": self.index_quantize,
+            "index_subvectors": self.index_subvectors,
+            "intra_threads": self.intra_threads,
+            "inter_threads": self.inter_threads
         }
@@ -2,15 +2,188 @@
 Content processor for GitHub repository README files.
 """
 
+import os
 import re
+import hashlib
 import logging
+import functools
+import threading
+import unicodedata
+import multiprocessing
+import numpy as np
 import html2text
 import markdown
 from bs4 import BeautifulSoup
-from typing import List, Dict, Any, Optional
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+# Numba compiles the window arithmetic to machine code, the same NumPy code runs without it
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# cmark-gfm and Lexbor render and strip READMEs in C, the markdown and html2text packages are used without them
+try:
+    import cmarkgfm
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    cmarkgfm = None
+    HTMLParser = None
 
 logger = logging.getLogger(__name__)
 
+# Markdown punctuation ignored when comparing chunk text
+MARKDOWN_PUNCTUATION = re.compile(r"[#*_`~>|\[\]]+")
+
+# Header sections, each running up to the next header or the end of the text
+HEADER_SECTION = re.compile(r"(^|\n)#+\s+.+?(?=\n#+\s+|\Z)", re.DOTALL)
+
+# BM25 tokens are runs of word characters, special characters and whitespace separate them
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def collapse_whitespace(text: str) -> str:
+    """
+    Collapse runs of whitespace, including newlines, to a single space.
+    
+    Same result as re.sub(r"\s+", " ", text), but str.split scans the text in C without the regex engine.
+    
+    Args:
+        text (str): Text to collapse
+    
+    Returns:
+        str: Text with single spaces between words, and at either end if text started or ended with whitespace
+    """
+    collapsed = " ".join(text.split())
+    if not collapsed:
+        return " " if text else ""
+    
+    return (" " if text[0].isspace() else "") + collapsed + (" " if text[-1].isspace() else "")
+
+def canonicalize_text(text: str, lowercase: bool = False) -> str:
+    """
+    Canonicalize text so trivial edits (whitespace, markdown formatting) don't change it.
+    
+    Args:
+        text (str): Text to canonicalize
+        lowercase (bool): Whether to lowercase the text
+    
+    Returns:
+        str: Canonical text
+    """
+    text = unicodedata.normalize("NFC", text)
+    text = MARKDOWN_PUNCTUATION.sub(" ", text)
+    text = " ".join(text.split())
+    
+    return text.lower() if lowercase else text
+
+def tokenize_text(text: str) -> List[str]:
+    """
+    Tokenize text for BM25 indexing into lowercase runs of word characters.
+    
+    Args:
+        text (str): Text to tokenize
+    
+    Returns:
+        list: Tokens
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+def html_to_text(html: str) -> str:
+    """
+    Extract the text of rendered Markdown with Lexbor, keeping the Markdown markers html2text writes.
+    
+    Headers keep their # markers, which semantic chunking splits on, and links and images keep
+    their URLs, so chunks read the same whichever converter produced them.
+    
+    Args:
+        html (str): HTML rendered from Markdown
+    
+    Returns:
+        str: Text with Markdown markers
+    """
+    tree = HTMLParser(html)
+    
+    for node in tree.css("h1, h2, h3, h4, h5, h6"):
+        node.insert_before("#" * int(node.tag[1]) + " ")
+    for node in tree.css("li"):
+        node.insert_before("* ")
+    for node in tree.css("em, i"):
+        node.replace_with(f"_{node.text()}_")
+    for node in tree.css("strong, b"):
+        node.replace_with(f"**{node.text()}**")
+    for node in tree.css("a[href]"):
+        node.replace_with(f"[{node.text()}]({node.attributes['href']})")
+    for node in tree.css("img[src]"):
+        node.replace_with(f"![{node.attributes.get('alt') or ''}]({node.attributes['src']})")
+    
+    # Block elements are already separated by newline text nodes
+    return tree.text(separator="")
+
+# Content processor of a worker process, created once per process by the pool initializer
+_worker_processor = None
+
+def _init_worker(config: Dict[str, Any]):
+    """
+    Create the content processor of a worker process.
+    
+    Args:
+        config (dict): Configuration dictionary
+    """
+    global _worker_processor
+    _worker_processor = ContentProcessor(dict(config, workers=1))
+
+def _process_readme(content: str, repo: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Process README content in a worker process.
+    
+    Args:
+        content (str): README content
+        repo (dict): Repository metadata
+    
+    Returns:
+        list: List of content chunks with metadata
+    """
+    return _worker_processor.process_readme(content, repo)
+
+def window_ranges(n_words: int, chunk_size: int, overlap: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the word ranges of overlapping windows.
+    
+    Windows start every chunk_size - overlap words, and windows shorter than overlap words are dropped.
+    
+    Args:
+        n_words (int): Number of words
+        chunk_size (int): Maximum number of words per window
+        overlap (int): Number of words shared by consecutive windows
+    
+    Returns:
+        tuple: Start and end word indices of each window
+    """
+    starts = np.arange(0, n_words, chunk_size - overlap, dtype=np.int64)
+    ends = np.minimum(starts + chunk_size, n_words)
+    keep = ends - starts >= overlap
+    
+    return starts[keep], ends[keep]
+
+if njit is not None:
+    window_ranges = njit(cache=True)(window_ranges)
+    
+    # Compile on import rather than on the first README
+    window_ranges(1, 2, 1)
+
+def content_hash(text: str) -> str:
+    """
+    Hash the canonical form of text.
+    
+    Args:
+        text (str): Text to hash
+    
+    Returns:
+        str: SHA-256 hex digest of the canonical text
+    """
+    return hashlib.sha256(canonicalize_text(text).encode("utf-8")).hexdigest()
+
 class ContentProcessor:
     """
     Processor for repository content, including README files.
@@ -27,12 +200,36 @@ class ContentProcessor:
         self.chunk_strategy = config.get("chunk_strategy", "hybrid")
         self.max_chunk_size = config.get("max_chunk_size", 512)
         self.chunk_overlap = config.get("chunk_overlap", 50)
+        self.workers = int(config.get("workers") or os.cpu_count() or 1)
+        self.cache_size = config.get("cache_size", 256)
+        self.config = config
+        
+        # Processing is deterministic, so READMEs processed again reuse their chunks
+        self._process_cached = functools.lru_cache(maxsize=self.cache_size)(self._process)
+        
+        # Processing is CPU-bound Python, so READMEs are spread over worker processes, started on first use
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        
+        # HTML to text converters keep parser state, so each thread gets its own
+        self._local = threading.local()
+    
+    @property
+    def html_converter(self) -> html2text.HTML2Text:
+        """
+        Get the HTML to text converter of the current thread.
         
-        # Initialize HTML to text converter
-        self.html_converter = html2text.HTML2Text()
-        self.html_converter.ignore_links = False
-        self.html_converter.ignore_images = False
-        self.html_converter.ignore_emphasis = False
+        Returns:
+            html2text.HTML2Text: HTML to text converter
+        """
+        if not hasattr(self._local, "html_converter"):
+            converter = html2text.HTML2Text()
+            converter.ignore_links = False
+            converter.ignore_images = False
+            converter.ignore_emphasis = False
+            self._local.html_converter = converter
+        
+        return self._local.html_converter
     
     def process_readme(self, content: str, repo: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -45,6 +242,24 @@ class ContentProcessor:
         Returns:
             list: List of content chunks with metadata
         """
+        chunks = self._process_cached(content, repo["id"], repo["full_name"])
+        
+        # Copy the cached chunks so callers can modify them
+        return [dict(chunk) for chunk in chunks]
+    
+    def _process(self, content: str, repo_id: int, repo_full_name: str) -> List[Dict[str, Any]]:
+        """
+        Process README content into chunks, for the repository fields the chunks depend on.
+        
+        Args:
+            content (str): README content
+            repo_id (int): Repository ID
+            repo_full_name (str): Repository full name
+        
+        Returns:
+            list: List of content chunks with metadata
+        """
+        repo = {"id": repo_id, "full_name": repo_full_name}
         logger.info(f"Processing README for {repo['full_name']}")
         
         # Truncate if too large
@@ -63,8 +278,79 @@ class ContentProcessor:
         else:  # hybrid
             chunks = self._hybrid_chunking(clean_content, repo)
         
+        # Key chunks on their canonical text so reformatted READMEs reuse cached embeddings
+        for chunk in chunks:
+            chunk["content_hash"] = content_hash(chunk["content"])
+        
         return chunks
     
+    def submit(self, content: str, repo: Dict[str, Any]) -> Future:
+        """
+        Process README content into chunks in a worker process.
+        
+        Args:
+            content (str): README content
+            repo (dict): Repository metadata
+        
+        Returns:
+            Future: Future resolving to the list of content chunks
+        """
+        if self.workers <= 1:
+            # No pool for a single worker, process in this process
+            future = Future()
+            try:
+                future.set_result(self.process_readme(content, repo))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        
+        return self._get_executor().submit(_process_readme, content, repo)
+    
+    def process_readmes(self, items: List[Tuple[str, Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+        """
+        Process the READMEs of several repositories in parallel.
+        
+        Args:
+            items (list): (README content, repository metadata) tuples
+        
+        Returns:
+            list: List of content chunks for each item, in order
+        """
+        # Starting the worker processes costs more than processing a single README
+        if len(items) <= 1 or self.workers <= 1:
+            return [self.process_readme(content, repo) for content, repo in items]
+        
+        futures = [self.submit(content, repo) for content, repo in items]
+        return [future.result() for future in futures]
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """
+        Get the worker process pool, starting it if needed.
+        
+        Returns:
+            ProcessPoolExecutor: Worker process pool
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                # Spawn workers, forking a process running the fetch event loop and torch threads can deadlock
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.config,)
+                )
+        
+        return self._executor
+    
+    def close(self):
+        """
+        Stop the worker processes.
+        """
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+    
     def _clean_content(self, content: str) -> str:
         """
         Clean and normalize README content.
@@ -75,17 +361,19 @@ class ContentProcessor:
         Returns:
             str: Cleaned content
         """
-        # Convert Markdown to HTML
-        html = markdown.markdown(content)
-        
-        # Convert HTML to plain text
-        text = self.html_converter.handle(html)
-        
-        # Clean up text
-        text = re.sub(r'\n{3,}', '\n\n', text)  # Remove excessive newlines
-        text = re.sub(r'\s+', ' ', text)  # Normalize whitespace
+        if cmarkgfm is not None and HTMLParser is not None:
+            # Render GitHub flavored Markdown and extract the text in two C passes
+            html = cmarkgfm.github_flavored_markdown_to_html(content)
+            text = html_to_text(html)
+        else:
+            # Convert Markdown to HTML
+            html = markdown.markdown(content)
+            
+            # Convert HTML to plain text
+            text = self.html_converter.handle(html)
         
-        return text
+        # Normalize whitespace, which also removes excessive newlines
+        return collapse_whitespace(text)
     
     def _semantic_chunking(self, content: str, repo: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -100,18 +388,23 @@ class ContentProcessor:
         """
         chunks = []
         
+        # Headers start the text or a line, skip the regex scan when there are none
+        if not (content.startswith("#") or "\n#" in content):
+            return self._sliding_window_chunking(content, repo)
+        
         # Split by headers
-        header_pattern = r'(^|\n)#+\s+.+?(?=\n#+\s+|\Z)'
-        sections = re.findall(header_pattern, content, re.DOTALL)
+        sections = HEADER_SECTION.findall(content)
         
         # If no headers found, fall back to sliding window
         if not sections:
             return self._sliding_window_chunking(content, repo)
         
+        # Repository context added to each chunk
+        repo_prefix = f"Repository: {repo['full_name']}\n\n"
+        
         # Process each section
         for i, section in enumerate(sections):
-            # Add repository context to each chunk
-            chunk_text = f"Repository: {repo['full_name']}\n\n{section.strip()}"
+            chunk_text = repo_prefix + section.strip()
             
             # Create chunk with metadata
             chunk = {
@@ -140,39 +433,50 @@ class ContentProcessor:
         """
         chunks = []
         
-        # Split content into words
-        words = content.split()
-        
-        # Calculate chunk sizes in words (approximating tokens)
-        chunk_size = self.max_chunk_size
-        overlap = self.chunk_overlap
+        # Repository context added to each chunk
+        repo_prefix = f"Repository: {repo['full_name']}\n\n"
         
         # Create chunks with overlap
-        for i in range(0, len(words), chunk_size - overlap):
-            # Get chunk words
-            chunk_words = words[i:i + chunk_size]
-            
-            # Skip if too small
-            if len(chunk_words) < overlap:
-                continue
-            
-            # Add repository context to each chunk
-            chunk_text = f"Repository: {repo['full_name']}\n\n{' '.join(chunk_words)}"
+        for window_index, window_text in self._split_windows(content.split()):
+            chunk_text = repo_prefix + window_text
             
             # Create chunk with metadata
             chunk = {
-                "id": f"{repo['id']}-{i // (chunk_size - overlap)}",
+                "id": f"{repo['id']}-{window_index}",
                 "repo_id": repo["id"],
                 "repo_name": repo["full_name"],
                 "content": chunk_text,
                 "chunk_type": "readme_window",
-                "window_index": i // (chunk_size - overlap)
+                "window_index": window_index
             }
             
             chunks.append(chunk)
         
         return chunks
     
+    def _split_windows(self, words: List[str]) -> List[Tuple[int, str]]:
+        """
+        Split words into overlapping windows.
+        
+        Args:
+            words (list): Words of the content, whose counts approximate tokens
+        
+        Returns:
+            list: (window index, window text) tuples
+        """
+        step = self.max_chunk_size - self.chunk_overlap
+        starts, ends = window_ranges(len(words), self.max_chunk_size, self.chunk_overlap)
+        
+        # Join the words once and slice each window out of the text by word offsets
+        text = " ".join(words)
+        offsets = np.zeros(len(words) + 1, dtype=np.int64)
+        np.cumsum([len(word) + 1 for word in words], out=offsets[1:])
+        
+        return [
+            (start // step, text[offsets[start]:offsets[end] - 1])
+            for start, end in zip(starts.tolist(), ends.tolist())
+        ]
+    
     def _hybrid_chunking(self, content: str, repo: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Chunk content using a hybrid approach (semantic + sliding window).
@@ -199,43 +503,29 @@ class ContentProcessor:
         # Process each semantic chunk
         final_chunks = []
         has_hybrid_chunks = False  # Track if we've created any hybrid chunks
+        repo_prefix = f"Repository: {repo['full_name']}\n\n"
+        prefix_words = len(repo_prefix.split())
         
         for i, chunk in enumerate(semantic_chunks):
-            chunk_content = chunk["content"]
+            # Split the section content once, semantic chunks start with the repository context
+            section_words = chunk["content"][len(repo_prefix):].split()
             
             # If chunk is too large, apply sliding window
-            if len(chunk_content.split()) > self.max_chunk_size:
-                # Extract the repository context
-                repo_context = chunk_content.split("\n\n")[0]
-                
-                # Get the section content without the repository context
-                section_content = "\n\n".join(chunk_content.split("\n\n")[1:])
-                
+            if prefix_words + len(section_words) > self.max_chunk_size:
                 # Apply sliding window to section content
-                words = section_content.split()
-                chunk_size = self.max_chunk_size
-                overlap = self.chunk_overlap
-                
-                for j in range(0, len(words), chunk_size - overlap):
-                    # Get chunk words
-                    chunk_words = words[j:j + chunk_size]
-                    
-                    # Skip if too small
-                    if len(chunk_words) < overlap:
-                        continue
-                    
+                for window_index, window_text in self._split_windows(section_words):
                     # Combine repository context with chunk content
-                    sub_chunk_text = f"{repo_context}\n\n{' '.join(chunk_words)}"
+                    sub_chunk_text = repo_prefix + window_text
                     
                     # Create sub-chunk with metadata
                     sub_chunk = {
-                        "id": f"{repo['id']}-{i}-{j // (chunk_size - overlap)}",
+                        "id": f"{repo['id']}-{i}-{window_index}",
                         "repo_id": repo["id"],
                         "repo_name": repo["full_name"],
                         "content": sub_chunk_text,
                         "chunk_type": "readme_hybrid",
                         "section_index": i,
-                        "window_index": j // (chunk_size - overlap)
+                        "window_index": window_index
                     }
                     
                     final_chunks.append(sub_chunk)
@@ -2,16 +2,217 @@
 Search engine for GitHub Stars Search.
 """
 
-import re
+import os
+import json
+import pickle
+import tempfile
 import logging
+import functools
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import sentence_transformers # needed to get rid of OMP error when dealing with txtai
 from txtai.pipeline import Similarity
-from rank_bm25 import BM25Okapi
+import bm25s
+
+from src.processor.content_processor import tokenize_text
+
+# Numba compiles the score fusion to machine code, the same NumPy code runs without it
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 logger = logging.getLogger(__name__)
 
+# Largest candidate list searched when filters reject most results
+MAX_FILTER_CANDIDATES = 1000
+
+# Number of leading document tokens shown as the text of a keyword result
+BM25_SNIPPET_TOKENS = 50
+
+# Number of recent search queries whose BM25 tokens are kept
+QUERY_TOKEN_CACHE_SIZE = 256
+
+# Term frequency weight of the description relative to the README in the BM25 document of a repository
+DESCRIPTION_WEIGHT = 2
+
+# BM25 score mapped to a keyword score of 1.0 when fusing with neural scores
+MAX_KEYWORD_SCORE = 10.0
+
+def fuse_scores(neural_scores: np.ndarray, keyword_scores: np.ndarray, neural_weight: float, keyword_weight: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Combine neural and BM25 scores of each repository into a hybrid score.
+    
+    Args:
+        neural_scores (np.ndarray): Neural score of each repository
+        keyword_scores (np.ndarray): BM25 score of each repository
+        neural_weight (float): Weight of the neural score
+        keyword_weight (float): Weight of the normalized keyword score
+    
+    Returns:
+        tuple: Combined scores and keyword scores normalized to [0, 1]
+    """
+    # Normalize keyword score (BM25 scores can be > 1)
+    keyword_scores = np.minimum(keyword_scores, MAX_KEYWORD_SCORE) / MAX_KEYWORD_SCORE
+    
+    return neural_weight * neural_scores + keyword_weight * keyword_scores, keyword_scores
+
+def term_max_scores(data: np.ndarray, indptr: np.ndarray) -> np.ndarray:
+    """
+    Get the largest BM25 score of each term in any document.
+    
+    Args:
+        data (np.ndarray): BM25 score of each posting, grouped by term
+        indptr (np.ndarray): Offset of the first posting of each term, with the end offset last
+    
+    Returns:
+        np.ndarray: Maximum score of each term, 0 for terms without postings
+    """
+    max_scores = np.zeros(len(indptr) - 1, dtype=data.dtype)
+    
+    # Consecutive non-empty terms start where the previous one ends, so reduceat sums no other postings
+    nonempty = np.flatnonzero(np.diff(indptr) > 0)
+    if len(nonempty):
+        max_scores[nonempty] = np.maximum.reduceat(data, indptr[nonempty])
+    
+    return max_scores
+
+def maxscore_top_k(data: np.ndarray, indptr: np.ndarray, indices: np.ndarray, num_docs: int, terms: np.ndarray, remaining: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the k best BM25 documents with MaxScore pruning, scoring terms in the given order.
+    
+    Once the k-th best score so far is at least the most the remaining terms can add,
+    documents not scored yet can't reach the top k. The remaining terms are then only
+    looked up for the documents that still can, instead of scanning their postings.
+    
+    Args:
+        data (np.ndarray): BM25 score of each posting, grouped by term
+        indptr (np.ndarray): Offset of the first posting of each term, with the end offset last
+        indices (np.ndarray): Document of each posting, ascending within each term
+        num_docs (int): Number of documents in the index
+        terms (np.ndarray): Term IDs of the query, by decreasing maximum score
+        remaining (np.ndarray): Sum of the maximum scores of the terms from each position on
+        k (int): Number of documents to return, at most num_docs
+    
+    Returns:
+        tuple: Document indices and scores, best first
+    """
+    scores = np.zeros(num_docs, dtype=data.dtype)
+    
+    # Documents with a score, in the order they were first scored
+    scored = np.empty(num_docs, dtype=np.int64)
+    count = 0
+    candidates = scored[:0]
+    pruned = False
+    
+    for i in range(len(terms)):
+        start, end = indptr[terms[i]], indptr[terms[i] + 1]
+        
+        if pruned:
+            # Drop candidates the remaining terms can no longer lift to the k-th best score
+            values = scores[candidates]
+            threshold = np.partition(values, len(values) - k)[len(values) - k]
+            candidates = candidates[values + remaining[i] >= threshold]
+        elif i > 0 and count >= k:
+            values = scores[scored[:count]]
+            threshold = np.partition(values, count - k)[count - k]
+            if threshold >= remaining[i]:
+                candidates = scored[:count][values + remaining[i] >= threshold]
+                pruned = True
+        
+        if not pruned:
+            for posting in range(start, end):
+                doc = indices[posting]
+                if scores[doc] == 0:
+                    scored[count] = doc
+                    count += 1
+                scores[doc] += data[posting]
+        elif start < end:
+            # Look up the candidates in the term's sorted postings
+            postings = np.searchsorted(indices[start:end], candidates)
+            for j in range(len(candidates)):
+                if postings[j] < end - start and indices[start + postings[j]] == candidates[j]:
+                    scores[candidates[j]] += data[start + postings[j]]
+    
+    if not pruned:
+        candidates = scored[:count]
+    
+    # Fill up with unscored documents when fewer than k documents match
+    if len(candidates) < k:
+        unscored = np.flatnonzero(scores == 0)[:k - len(candidates)]
+        candidates = np.concatenate((candidates, unscored))
+    
+    # Sort the candidates at or above the k-th best score
+    values = scores[candidates]
+    threshold = np.partition(values, len(values) - k)[len(values) - k]
+    top = candidates[values >= threshold]
+    top = top[np.argsort(-scores[top], kind="mergesort")[:k]]
+    
+    return top, scores[top]
+
+def bm25_top_k(data: np.ndarray, indptr: np.ndarray, indices: np.ndarray, num_docs: int, query_tokens_ids: np.ndarray, max_scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the k best BM25 documents for a query with MaxScore pruning.
+    
+    Terms are scored from the highest maximum score down. Common terms have low maximum
+    scores and long postings, so they are the ones whose postings are skipped.
+    
+    Args:
+        data (np.ndarray): BM25 score of each posting, grouped by term
+        indptr (np.ndarray): Offset of the first posting of each term, with the end offset last
+        indices (np.ndarray): Document of each posting, ascending within each term
+        num_docs (int): Number of documents in the index
+        query_tokens_ids (np.ndarray): Term IDs of the query
+        max_scores (np.ndarray): Maximum score of each term
+        k (int): Number of documents to return, at most num_docs
+    
+    Returns:
+        tuple: Document indices and scores, best first
+    """
+    terms = query_tokens_ids[np.argsort(-max_scores[query_tokens_ids], kind="stable")]
+    
+    # Upper bound of the score the terms from each position on can add to a document
+    remaining = np.cumsum(max_scores[terms][::-1])[::-1]
+    
+    return maxscore_top_k(data, indptr, indices, num_docs, terms, np.ascontiguousarray(remaining), k)
+
+def preprocess_text(text: str) -> str:
+    """
+    Preprocess text for BM25 indexing.
+    
+    Args:
+        text (str): Text to preprocess
+    
+    Returns:
+        str: Preprocessed text, the lowercase tokens separated by single spaces
+    """
+    return " ".join(tokenize_text(text))
+
+@functools.lru_cache(maxsize=QUERY_TOKEN_CACHE_SIZE)
+def tokenize_query(query: str) -> Tuple[str, ...]:
+    """
+    Tokenize a search query for BM25, remembering recent queries.
+    
+    Args:
+        query (str): Search query
+    
+    Returns:
+        tuple: Query tokens
+    """
+    return tuple(tokenize_text(query))
+
+if njit is not None:
+    fuse_scores = njit(cache=True, fastmath=True)(fuse_scores)
+    
+    # Compile on import rather than on the first search
+    fuse_scores(np.zeros(1), np.zeros(1), 0.5, 0.5)
+    
+    maxscore_top_k = njit(cache=True)(maxscore_top_k)
+    maxscore_top_k(
+        np.ones(1, dtype=np.float32), np.array([0, 1]), np.zeros(1, dtype=np.int32), 1,
+        np.zeros(1, dtype=np.int32), np.ones(1, dtype=np.float32), 1
+    )
+
 class SearchEngine:
     """
     Search engine for GitHub repositories.
@@ -31,6 +232,7 @@ class SearchEngine:
         self.keyword_weight = config.get("keyword_weight", 0.3)
         self.max_results = config.get("max_results", 20)
         self.min_score = config.get("min_score", 0.2)
+        self.description_weight = int(config.get("description_weight", DESCRIPTION_WEIGHT))
         
         self.embedding_manager = embedding_manager
         self.storage_manager = storage_manager
@@ -39,6 +241,7 @@ class SearchEngine:
         self.bm25_index = None
         self.bm25_documents = []
         self.bm25_repo_map = {}
+        self.bm25_max_scores = None
         
         # Initialize BM25 index if hybrid search is enabled
         if self.hybrid_enabled:
@@ -51,93 +254,232 @@ class SearchEngine:
         logger.info("Initializing BM25 index")
         
         try:
-            # Get all repository IDs
-            repo_ids = self.storage_manager.get_all_repositories()
+            # Reuse the persisted index while no repository has been stored since it was built
+            version = self.storage_manager.get_index_version()
+            if self._load_bm25_index(version):
+                return
+            
+            # Get all repository IDs, metadata is only read for repositories without stored tokens
+            repo_ids = self.storage_manager.get_repository_ids()
             
             if not repo_ids:
                 logger.warning("No repositories found for BM25 indexing")
                 return
             
-            # Prepare documents for BM25
+            # Reuse the tokens of repositories not stored again since the last build
+            cached_tokens = self._load_bm25_tokens()
+            stored_at = self.storage_manager.get_stored_at_map()
+            repo_tokens = {
+                repo_id: cached_tokens[repo_id] for repo_id in repo_ids
+                if repo_id in cached_tokens and "fields" in cached_tokens[repo_id]
+                and stored_at.get(repo_id) is not None and cached_tokens[repo_id]["stored_at"] == stored_at[repo_id]
+            }
+            
+            # Read the tokens stored with the other repositories in threads
+            missing = []
+            for repo_id, fields in self.storage_manager.iter_repository_tokens([repo_id for repo_id in repo_ids if repo_id not in repo_tokens]):
+                if fields is None:
+                    missing.append(repo_id)
+                else:
+                    repo_tokens[repo_id] = {"stored_at": stored_at.get(repo_id), "fields": fields}
+            
+            # Repositories stored without tokens by earlier versions are tokenized from their README
+            for repo_id, repo_data, readme in self.storage_manager.iter_repositories_with_readme(missing):
+                fields = self._tokenize_repository(repo_id, repo_data, readme)
+                if fields is not None:
+                    repo_tokens[repo_id] = {"stored_at": stored_at.get(repo_id), "fields": fields}
+            
+            # Prepare one BM25 document per repository
             documents = []
+            snippets = []
             repo_map = {}
             
-            # Check if repo_ids is a dictionary or a list
-            if isinstance(repo_ids, dict):
-                # It's a dictionary of repo_id -> repo_data
-                repositories = repo_ids
-                for repo_id, repo_data in repositories.items():
-                    # Get README content
-                    readme = self.storage_manager.get_repository_readme(repo_id)
-                    
-                    if readme:
-                        # Clean and tokenize text
-                        text = self._preprocess_text(readme)
-                        tokens = text.split()
-                        
-                        # Add to documents
-                        doc_id = len(documents)
-                        documents.append(tokens)
-                        repo_map[doc_id] = repo_id
-                    
-                    # Add description if available
-                    description = repo_data.get("description")
-                    if description:
-                        # Clean and tokenize text
-                        text = self._preprocess_text(description)
-                        tokens = text.split()
-                        
-                        # Add to documents
-                        doc_id = len(documents)
-                        documents.append(tokens)
-                        repo_map[doc_id] = repo_id
-            else:
-                # It's a list of repo_ids
-                for repo_id in repo_ids:
-                    # Get repository data
-                    repo_data = self.storage_manager.get_repository(repo_id)
-                    if not repo_data:
-                        logger.warning(f"Repository data not found for ID {repo_id}")
-                        continue
-                    
-                    # Get README content
-                    readme = self.storage_manager.get_repository_readme(repo_id)
-                    
-                    if readme:
-                        # Clean and tokenize text
-                        text = self._preprocess_text(readme)
-                        tokens = text.split()
-                        
-                        # Add to documents
-                        doc_id = len(documents)
-                        documents.append(tokens)
-                        repo_map[doc_id] = repo_id
-                    
-                    # Add description if available
-                    description = repo_data.get("description")
-                    if description:
-                        # Clean and tokenize text
-                        text = self._preprocess_text(description)
-                        tokens = text.split()
-                        
-                        # Add to documents
-                        doc_id = len(documents)
-                        documents.append(tokens)
-                        repo_map[doc_id] = repo_id
+            for repo_id in repo_ids:
+                if repo_id not in repo_tokens:
+                    continue
+                
+                # Weight the fields BM25F style, repeating the description scales its term frequencies and length
+                readme_tokens, description_tokens = repo_tokens[repo_id]["fields"]
+                if not readme_tokens and not description_tokens:
+                    continue
+                
+                repo_map[len(documents)] = repo_id
+                documents.append(readme_tokens + description_tokens * self.description_weight)
+                snippets.append((readme_tokens + description_tokens)[:BM25_SNIPPET_TOKENS])
             
-            # Create BM25 index
+            # Create BM25 index, precomputing the score of every term in every document
             if documents:
-                self.bm25_index = BM25Okapi(documents)
-                self.bm25_documents = documents
+                self.bm25_index = bm25s.BM25()
+                self.bm25_index.index(documents, show_progress=False)
+                self._prepare_bm25_index()
+                self.bm25_documents = snippets
                 self.bm25_repo_map = repo_map
                 
                 logger.info(f"BM25 index initialized with {len(documents)} documents")
+                self._save_bm25_index(version)
+                self._save_bm25_tokens(repo_tokens)
             else:
                 logger.warning("No documents found for BM25 indexing")
         
         except Exception as e:
             logger.error(f"Error initializing BM25 index: {str(e)}")
     
+    def _tokenize_repository(self, repo_id: int, repo_data: Optional[Dict[str, Any]], readme: Optional[str]) -> Optional[Tuple[List[str], List[str]]]:
+        """
+        Tokenize the README and description of a repository for BM25.
+        
+        Args:
+            repo_id (int): Repository ID
+            repo_data (dict): Repository metadata, None if not found
+            readme (str): README content, None if not found
+        
+        Returns:
+            tuple: Tokens of the README and of the description, empty if missing,
+            or None if the repository data is not found
+        """
+        if not repo_data:
+            logger.warning(f"Repository data not found for ID {repo_id}")
+            return None
+        
+        readme_tokens = self._tokenize_text(readme) if readme else []
+        description = repo_data.get("description")
+        description_tokens = self._tokenize_text(description) if description else []
+        
+        return readme_tokens, description_tokens
+    
+    def _load_bm25_tokens(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Load the tokens of each repository from the last BM25 index build.
+        
+        Returns:
+            dict: Repository ID to the storage time and field tokens of the repository
+        """
+        tokens_file = self.storage_manager.get_bm25_path() / "tokens.pkl"
+        
+        if not tokens_file.exists():
+            return {}
+        
+        try:
+            with open(tokens_file, "rb") as f:
+                return pickle.load(f)
+        
+        except Exception as e:
+            logger.warning(f"Error loading BM25 tokens: {str(e)}")
+            return {}
+    
+    def _save_bm25_tokens(self, repo_tokens: Dict[int, Dict[str, Any]]):
+        """
+        Persist the tokens of each repository, so the next build only tokenizes repositories stored since.
+        
+        Args:
+            repo_tokens (dict): Repository ID to the storage time and field tokens of the repository
+        """
+        bm25_path = self.storage_manager.get_bm25_path()
+        
+        try:
+            bm25_path.mkdir(exist_ok=True, parents=True)
+            with open(bm25_path / "tokens.pkl", "wb") as f:
+                pickle.dump(repo_tokens, f, protocol=pickle.HIGHEST_PROTOCOL)
+        
+        except Exception as e:
+            logger.warning(f"Error saving BM25 tokens: {str(e)}")
+    
+    def _load_bm25_index(self, version: str) -> bool:
+        """
+        Load the persisted BM25 index if it was built from the current repositories.
+        
+        Args:
+            version (str): Current version of the stored repositories
+        
+        Returns:
+            bool: True if the index was loaded, False otherwise
+        """
+        bm25_path = self.storage_manager.get_bm25_path()
+        documents_file = bm25_path / "documents.json"
+        
+        if not documents_file.exists():
+            return False
+        
+        try:
+            with open(documents_file, "r") as f:
+                metadata = json.load(f)
+            
+            # Indexes built with another description weight, or one document per field, are rebuilt
+            if metadata.get("version") != version or metadata.get("description_weight") != self.description_weight:
+                return False
+            
+            # Map the score arrays, the OS only pages in the postings of queried terms and shares them between processes
+            self.bm25_index = bm25s.BM25.load(str(bm25_path), mmap=True, show_progress=False)
+            self._prepare_bm25_index()
+            
+            max_scores_file = bm25_path / "max_scores.npy"
+            if max_scores_file.exists():
+                self.bm25_max_scores = np.load(max_scores_file, mmap_mode="r")
+            
+            self.bm25_documents = metadata["documents"]
+            self.bm25_repo_map = dict(enumerate(metadata["repo_ids"]))
+            
+            logger.info(f"BM25 index loaded with {len(self.bm25_documents)} documents")
+            return True
+        
+        except Exception as e:
+            logger.warning(f"Error loading BM25 index: {str(e)}")
+            return False
+    
+    def _save_bm25_index(self, version: str):
+        """
+        Persist the BM25 index with the document snippets and repository map.
+        
+        Args:
+            version (str): Version of the stored repositories the index was built from
+        """
+        bm25_path = self.storage_manager.get_bm25_path()
+        
+        try:
+            bm25_path.mkdir(exist_ok=True, parents=True)
+            
+            # Write new files and swap them in, another process may still have the old ones mapped
+            with tempfile.TemporaryDirectory(dir=bm25_path) as temp_path:
+                self.bm25_index.save(temp_path)
+                
+                scores = self.bm25_index.scores
+                if self.bm25_max_scores is None:
+                    self.bm25_max_scores = term_max_scores(scores["data"], scores["indptr"])
+                np.save(os.path.join(temp_path, "max_scores.npy"), self.bm25_max_scores)
+                
+                for name in os.listdir(temp_path):
+                    os.replace(os.path.join(temp_path, name), bm25_path / name)
+            
+            with open(bm25_path / "documents.json", "w") as f:
+                json.dump({
+                    "version": version,
+                    "description_weight": self.description_weight,
+                    "documents": self.bm25_documents,
+                    "repo_ids": [self.bm25_repo_map[doc_id] for doc_id in range(len(self.bm25_documents))]
+                }, f)
+        
+        except Exception as e:
+            logger.warning(f"Error saving BM25 index: {str(e)}")
+    
+    def _prepare_bm25_index(self):
+        """
+        Reset the state derived from the previous BM25 index.
+        """
+        # Maximum term scores of the previous index no longer apply
+        self.bm25_max_scores = None
+    
+    def _tokenize_text(self, text: str) -> List[str]:
+        """
+        Tokenize text for BM25 indexing.
+        
+        Args:
+            text (str): Text to tokenize
+        
+        Returns:
+            list: Tokens
+        """
+        return tokenize_text(text)
+    
     def _preprocess_text(self, text: str) -> str:
         """
         Preprocess text for BM25 indexing.
@@ -148,25 +490,22 @@ class SearchEngine:
         Returns:
             str: Preprocessed text
         """
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove special characters
-        text = re.sub(r'[^\w\s]', ' ', text)
-        
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
+        return preprocess_text(text)
     
-    def search(self, query: str, filters: Optional[Dict[str, Any]] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    def search(self, query: str, filters: Optional[Dict[str, Any]] = None, limit: Optional[int] = None, neural_weight: Optional[float] = None, keyword_weight: Optional[float] = None, hybrid_enabled: Optional[bool] = None) -> List[Dict[str, Any]]:
         """
         Search for repositories matching the query.
         
+        Weights and hybrid search given here only apply to this search, so one engine
+        and its indexes can serve searches with different settings.
+        
         Args:
             query (str): Search query
             filters (dict, optional): Filters to apply to results
             limit (int, optional): Maximum number of results to return
+            neural_weight (float, optional): Weight for neural search results
+            keyword_weight (float, optional): Weight for keyword search results
+            hybrid_enabled (bool, optional): Whether to combine neural and keyword search
         
         Returns:
             list: List of search results
@@ -177,32 +516,76 @@ class SearchEngine:
         if limit is None:
             limit = self.max_results
         
-        # Initialize results
-        neural_results = []
-        keyword_results = []
+        # Use the configured settings unless given for this search
+        if hybrid_enabled is None:
+            hybrid_enabled = self.hybrid_enabled
         
-        # Perform neural search
-        neural_results = self.embedding_manager.search(query, limit=limit * 2)
+        # Filters are applied after ranking, so rank more candidates for them to choose from
+        candidates = limit * 4 if filters else limit * 2
         
-        # Perform keyword search if hybrid enabled
-        if self.hybrid_enabled and self.bm25_index is not None:
-            keyword_results = self._keyword_search(query, limit=limit * 2)
-        
-        # Merge results
-        if self.hybrid_enabled and keyword_results:
-            merged_results = self._merge_results(neural_results, keyword_results)
-        else:
-            merged_results = neural_results
-        
-        # Apply filters
-        if filters:
-            merged_results = self._apply_filters(merged_results, filters)
+        while True:
+            # Initialize results
+            neural_results = []
+            keyword_results = []
+            
+            # Perform neural search
+            neural_results = self.embedding_manager.search(query, limit=candidates)
+            
+            # Perform keyword search if hybrid enabled
+            if hybrid_enabled and self.bm25_index is not None:
+                keyword_results = self._keyword_search(query, limit=candidates)
+            
+            # Merge results
+            if hybrid_enabled and keyword_results:
+                # Filters are applied after merging, so only cut to the limit without them
+                merged_results = self._merge_results(neural_results, keyword_results, neural_weight, keyword_weight, None if filters else limit)
+            else:
+                merged_results = neural_results
+            
+            # Apply filters
+            if filters:
+                merged_results = self._apply_filters(merged_results, filters)
+            
+            # Selective filters can reject most candidates, widen the search while the index has more
+            if not filters or len(merged_results) >= limit or len(neural_results) < candidates or candidates >= MAX_FILTER_CANDIDATES:
+                break
+            candidates *= 4
         
         # Limit results
         merged_results = merged_results[:limit]
         
         return merged_results
     
+    def keyword_search(self, query: str, filters: Optional[Dict[str, Any]] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Search for repositories matching the query with BM25 only.
+        
+        Skips the neural search, so results can be shown while a full search runs.
+        
+        Args:
+            query (str): Search query
+            filters (dict, optional): Filters to apply to results
+            limit (int, optional): Maximum number of results to return
+        
+        Returns:
+            list: List of search results, one per repository
+        """
+        if limit is None:
+            limit = self.max_results
+        
+        if self.bm25_index is None:
+            return []
+        
+        # _merge_results only selects the top results and shapes them here, there are no neural matches to combine
+        keyword_results = self._keyword_search(query, limit=limit * 4 if filters else limit * 2)
+        results = self._merge_results([], keyword_results, 0.0, 1.0, None if filters else limit)
+        
+        # Apply filters
+        if filters:
+            results = self._apply_filters(results, filters)
+        
+        return results[:limit]
+    
     def _keyword_search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Perform keyword-based search using BM25.
@@ -217,35 +600,35 @@ class SearchEngine:
         logger.info(f"Performing keyword search for: {query}")
         
         try:
-            # Preprocess query
-            processed_query = self._preprocess_text(query)
-            query_tokens = processed_query.split()
+            # Preprocess query, repeated queries reuse their tokens
+            query_tokens = list(tokenize_query(query))
             
-            # Get BM25 scores
-            scores = self.bm25_index.get_scores(query_tokens)
+            # Get the top BM25 results, the documents are selected without sorting every score
+            limit = min(limit, self.bm25_index.scores["num_docs"])
+            if limit <= 0:
+                return []
             
-            # Get top results
-            top_indices = np.argsort(scores)[::-1][:limit]
+            top_indices, top_scores = self._retrieve_bm25(query_tokens, limit)
+            
+            # Load the repositories of the results above the minimum score in one lookup
+            hits = [(idx, score) for idx, score in zip(top_indices.tolist(), top_scores.tolist()) if score >= self.min_score]
+            repositories = self.storage_manager.get_repositories(
+                self.bm25_repo_map[idx] for idx, _ in hits if self.bm25_repo_map.get(idx)
+            )
             
             # Format results
             results = []
-            for idx in top_indices:
-                score = scores[idx]
-                
-                # Skip low scores
-                if score < self.min_score:
-                    continue
-                
+            for idx, score in hits:
                 # Get repository data
                 repo_id = self.bm25_repo_map.get(idx)
                 if repo_id:
-                    repo_data = self.storage_manager.get_repository(repo_id)
+                    repo_data = repositories.get(int(repo_id))
                     
                     if repo_data:
                         results.append({
                             "id": f"bm25-{repo_id}-{idx}",
                             "score": float(score),
-                            "text": " ".join(self.bm25_documents[idx][:50]) + "...",
+                            "text": " ".join(self.bm25_documents[idx][:BM25_SNIPPET_TOKENS]) + "...",
                             "repository": repo_data,
                             "chunk_type": "bm25"
                         })
@@ -256,93 +639,128 @@ class SearchEngine:
             logger.error(f"Error performing keyword search: {str(e)}")
             return []
     
-    def _merge_results(self, neural_results: List[Dict[str, Any]], keyword_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _retrieve_bm25(self, query_tokens: List[str], limit: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the top BM25 documents for query tokens.
+        
+        Args:
+            query_tokens (list): Query tokens
+            limit (int): Number of documents to return, at most the number of documents
+        
+        Returns:
+            tuple: Document indices and scores, best first
+        """
+        # The pruning kernel is a Python loop without Numba, bm25s scores every document faster then
+        if njit is None:
+            top_indices, top_scores = self.bm25_index.retrieve([query_tokens], k=limit, show_progress=False)
+            return top_indices[0], top_scores[0]
+        
+        scores = self.bm25_index.scores
+        if self.bm25_max_scores is None:
+            self.bm25_max_scores = term_max_scores(scores["data"], scores["indptr"])
+        
+        query_tokens_ids = np.array(self.bm25_index.get_tokens_ids(query_tokens), dtype=np.int32)
+        
+        return bm25_top_k(
+            scores["data"], scores["indptr"], scores["indices"], scores["num_docs"],
+            query_tokens_ids, self.bm25_max_scores, limit
+        )
+    
+    def _merge_results(self, neural_results: List[Dict[str, Any]], keyword_results: List[Dict[str, Any]], neural_weight: Optional[float] = None, keyword_weight: Optional[float] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Merge neural and keyword search results.
         
         Args:
             neural_results (list): Neural search results
             keyword_results (list): Keyword search results
+            neural_weight (float, optional): Weight for neural search results, the configured weight if None
+            keyword_weight (float, optional): Weight for keyword search results, the configured weight if None
+            limit (int, optional): Maximum number of results to return, all results if None
         
         Returns:
             list: Merged search results
         """
         logger.info("Merging neural and keyword search results")
         
-        # Create a map of repository IDs to results
-        repo_results = {}
+        if neural_weight is None:
+            neural_weight = self.neural_weight
+        if keyword_weight is None:
+            keyword_weight = self.keyword_weight
+        
+        # Row of each repository in parallel score lists, with the result whose text is shown
+        rows = {}
+        neural_scores = []
+        keyword_scores = []
+        shown = []
         
         # Process neural results
         for result in neural_results:
             repo_id = result["repository"]["id"]
+            row = rows.get(repo_id)
             
-            if repo_id not in repo_results:
-                repo_results[repo_id] = {
-                    "repository": result["repository"],
-                    "neural_score": result["score"],
-                    "keyword_score": 0.0,
-                    "text": result["text"],
-                    "chunk_type": result["chunk_type"]
-                }
-            else:
+            if row is None:
+                rows[repo_id] = len(shown)
+                neural_scores.append(result["score"])
+                keyword_scores.append(0.0)
+                shown.append(result)
+            elif result["score"] > neural_scores[row]:
                 # Update if better score
-                if result["score"] > repo_results[repo_id]["neural_score"]:
-                    repo_results[repo_id]["neural_score"] = result["score"]
-                    repo_results[repo_id]["text"] = result["text"]
-                    repo_results[repo_id]["chunk_type"] = result["chunk_type"]
+                neural_scores[row] = result["score"]
+                shown[row] = result
         
         # Process keyword results
         for result in keyword_results:
             repo_id = result["repository"]["id"]
+            row = rows.get(repo_id)
             
-            if repo_id not in repo_results:
-                repo_results[repo_id] = {
-                    "repository": result["repository"],
-                    "neural_score": 0.0,
-                    "keyword_score": result["score"],
-                    "text": result["text"],
-                    "chunk_type": result["chunk_type"]
-                }
-            else:
+            if row is None:
+                rows[repo_id] = len(shown)
+                neural_scores.append(0.0)
+                keyword_scores.append(result["score"])
+                shown.append(result)
+            elif result["score"] > keyword_scores[row]:
                 # Update if better score
-                if result["score"] > repo_results[repo_id]["keyword_score"]:
-                    repo_results[repo_id]["keyword_score"] = result["score"]
-                    
-                    # Only update text if neural score is low
-                    if repo_results[repo_id]["neural_score"] < 0.5:
-                        repo_results[repo_id]["text"] = result["text"]
-                        repo_results[repo_id]["chunk_type"] = result["chunk_type"]
+                keyword_scores[row] = result["score"]
+                
+                # Only update text if neural score is low
+                if neural_scores[row] < 0.5:
+                    shown[row] = result
+        
+        if not rows:
+            return []
         
-        # Calculate combined scores
+        # Calculate combined scores for every repository at once
+        combined_scores, normalized_scores = fuse_scores(
+            np.array(neural_scores, dtype=np.float64),
+            np.array(keyword_scores, dtype=np.float64),
+            float(neural_weight),
+            float(keyword_weight)
+        )
+        
+        # Skip low scores
+        indices = np.flatnonzero(combined_scores >= self.min_score)
+        
+        # Select the top results in linear time and only sort those
+        if limit is not None and limit < len(indices):
+            indices = indices[np.argpartition(-combined_scores[indices], limit - 1)[:limit]] if limit > 0 else indices[:0]
+            indices.sort()
+        indices = indices[np.argsort(-combined_scores[indices], kind="stable")]
+        
+        # Only build result dicts for the repositories returned
+        repo_ids = list(rows)
         merged_results = []
-        for repo_id, result in repo_results.items():
-            # Normalize keyword score (BM25 scores can be > 1)
-            keyword_score = min(result["keyword_score"], 10.0) / 10.0
-            
-            # Calculate combined score
-            combined_score = (
-                self.neural_weight * result["neural_score"] +
-                self.keyword_weight * keyword_score
-            )
-            
-            # Skip low scores
-            if combined_score < self.min_score:
-                continue
-            
-            # Add to results
+        for i in indices.tolist():
+            result = shown[i]
             merged_results.append({
-                "id": f"merged-{repo_id}",
-                "score": combined_score,
+                "id": f"merged-{repo_ids[i]}",
+                "score": float(combined_scores[i]),
                 "text": result["text"],
                 "repository": result["repository"],
                 "chunk_type": result["chunk_type"],
-                "neural_score": result["neural_score"],
-                "keyword_score": keyword_score
+                "neural_score": neural_scores[i],
+                "keyword_score": float(normalized_scores[i])
             })
         
-        # Sort by combined score
-        merged_results.sort(key=lambda x: x["score"], reverse=True)
-        
         return merged_results
     
     def _apply_filters(self, results: List[Dict[str, Any]], filters: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -356,33 +774,86 @@ class SearchEngine:
         Returns:
             list: Filtered search results
         """
+        if not results:
+            return []
+        
+        # Evaluate column filters for every repository at once
+        columns = self.storage_manager.get_repository_columns()
+        allowed, remaining = self._filter_mask(columns, filters)
+        
         filtered_results = []
         
         for result in results:
             repo = result["repository"]
-            include = True
+            row = columns["rows"].get(repo.get("id"))
             
-            # Apply filters
-            for field, filter_value in filters.items():
-                if field in repo:
-                    field_value = repo[field]
-                    
-                    # Handle different filter types
-                    if isinstance(filter_value, dict):
-                        # Range filter
-                        if "min" in filter_value and field_value < filter_value["min"]:
-                            include = False
-                            break
-                        if "max" in filter_value and field_value > filter_value["max"]:
-                            include = False
-                            break
-                    else:
-                        # Exact match filter
-                        if field_value != filter_value:
-                            include = False
-                            break
+            # Repositories stored after the columns were built are checked field by field
+            if row is None:
+                include = self._matches_filters(repo, filters)
+            else:
+                include = allowed[row] and self._matches_filters(repo, remaining)
             
             if include:
                 filtered_results.append(result)
         
         return filtered_results
+    
+    def _filter_mask(self, columns: Dict[str, Any], filters: Dict[str, Any]) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """
+        Build a mask of the repositories matching the filters on column fields.
+        
+        Args:
+            columns (dict): Repository columns from the storage manager
+            filters (dict): Filters to apply
+        
+        Returns:
+            tuple: Boolean mask with one row per repository and the filters without a column
+        """
+        allowed = np.ones(len(columns["rows"]), dtype=bool)
+        remaining = {}
+        
+        for field, filter_value in filters.items():
+            if field in columns["numeric"] and isinstance(filter_value, dict):
+                # Range filter
+                values = columns["numeric"][field]
+                if "min" in filter_value:
+                    allowed &= values >= filter_value["min"]
+                if "max" in filter_value:
+                    allowed &= values <= filter_value["max"]
+            elif field in columns["categorical"] and isinstance(filter_value, (str, int, float, type(None))):
+                # Exact match filter, values never stored match no code
+                codes, values = columns["categorical"][field]
+                allowed &= codes == values.get(filter_value, -1)
+            else:
+                remaining[field] = filter_value
+        
+        return allowed, remaining
+    
+    def _matches_filters(self, repo: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+        """
+        Check whether a repository matches the filters.
+        
+        Args:
+            repo (dict): Repository metadata
+            filters (dict): Filters to apply
+        
+        Returns:
+            bool: True if every filter matches, False otherwise
+        """
+        for field, filter_value in filters.items():
+            if field in repo:
+                field_value = repo[field]
+                
+                # Handle different filter types
+                if isinstance(filter_value, dict):
+                    # Range filter
+                    if "min" in filter_value and field_value < filter_value["min"]:
+                        return False
+                    if "max" in filter_value and field_value > filter_value["max"]:
+                        return False
+                else:
+                    # Exact match filter
+                    if field_value != filter_value:
+                        return False
+        
+        return True
@@ -5,13 +5,98 @@ Storage manager for GitHub Stars Search.
 import os
 import json
 import shutil
+import hashlib
 import logging
+import numpy as np
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Set
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Set, Tuple
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from src.processor.content_processor import tokenize_text
+
+# orjson reads and writes the JSON files several times faster than the standard library
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# Threads reading repository files at once, file reads release the GIL so they overlap
+READ_WORKERS = 16
+
+# Repository fields stored as columns so search filters can be applied with array masks
+NUMERIC_COLUMNS = ("stargazers_count", "forks_count")
+CATEGORICAL_COLUMNS = ("language",)
+
+def read_json(path: Path) -> Any:
+    """
+    Read a JSON file, with orjson if it's installed.
+    
+    Args:
+        path (Path): File path
+    
+    Returns:
+        Parsed JSON data
+    """
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    
+    with open(path, "r") as f:
+        return json.load(f)
+
+def write_json(path: Path, data: Any):
+    """
+    Write data to a JSON file, with orjson if it's installed.
+    
+    Args:
+        path (Path): File path
+        data: JSON serializable data
+    """
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(data))
+        return
+    
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+def build_repository_columns(repositories: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Build a column per filterable field of the repositories, one row per repository.
+    
+    Fields missing from or null in some repositories get no column, since a filter
+    on them needs the per-repository rules. Numeric columns are float64, which holds
+    integer counts exactly and float fields without truncating them.
+    
+    Args:
+        repositories (dict): Dictionary of repository ID to metadata
+    
+    Returns:
+        dict: Row of each repository ID, float64 numeric columns and int32 categorical
+            codes with the code of each value
+    """
+    repos = list(repositories.values())
+    columns = {
+        "rows": {repo_id: row for row, repo_id in enumerate(repositories)},
+        "numeric": {},
+        "categorical": {}
+    }
+    
+    for field in NUMERIC_COLUMNS:
+        if all(isinstance(repo.get(field), (int, float)) for repo in repos):
+            columns["numeric"][field] = np.array([repo[field] for repo in repos], dtype=np.float64)
+    
+    for field in CATEGORICAL_COLUMNS:
+        if all(field in repo for repo in repos):
+            codes = {}
+            values = [codes.setdefault(repo[field], len(codes)) for repo in repos]
+            columns["categorical"][field] = (np.array(values, dtype=np.int32), codes)
+    
+    return columns
+
 class StorageManager:
     """
     Manager for storing and retrieving repository data and embeddings.
@@ -42,6 +127,12 @@ class StorageManager:
         
         # Initialize repository index
         self.repository_index = self._load_repository_index()
+        
+        # Filter columns, built on first use
+        self.repository_columns = None
+        
+        # Parsed metadata of repositories loaded or stored by this instance
+        self._metadata_cache: Dict[int, Dict[str, Any]] = {}
     
     def _load_repository_index(self) -> Dict[int, Dict[str, Any]]:
         """
@@ -54,8 +145,7 @@ class StorageManager:
         
         if index_file.exists():
             try:
-                with open(index_file, "r") as f:
-                    return json.load(f)
+                return read_json(index_file)
             except Exception as e:
                 logger.error(f"Error loading repository index: {str(e)}")
                 return {}
@@ -69,8 +159,7 @@ class StorageManager:
         index_file = self.index_path / "repositories.json"
         
         try:
-            with open(index_file, "w") as f:
-                json.dump(self.repository_index, f)
+            write_json(index_file, self.repository_index)
         except Exception as e:
             logger.error(f"Error saving repository index: {str(e)}")
     
@@ -99,28 +188,35 @@ class StorageManager:
                 self._backup_repository(repo_id)
             
             # Store metadata
-            with open(repo_dir / "metadata.json", "w") as f:
-                json.dump(repo, f)
+            write_json(repo_dir / "metadata.json", repo)
+            self._metadata_cache[int(repo_id)] = dict(repo)
             
             # Store README
             with open(repo_dir / "readme.md", "w") as f:
                 f.write(readme)
             
             # Store chunks
-            with open(repo_dir / "chunks.json", "w") as f:
-                json.dump(chunks, f)
+            write_json(repo_dir / "chunks.json", chunks)
+            
+            # Store BM25 tokens, so the keyword index is built without tokenizing again
+            write_json(repo_dir / "tokens.json", {
+                "readme_tokens": tokenize_text(readme) if readme else [],
+                "description_tokens": tokenize_text(repo["description"]) if repo.get("description") else []
+            })
             
             # Update index
             self.repository_index[str(repo_id)] = {
                 "id": repo_id,
                 "full_name": repo["full_name"],
                 "updated_at": repo["updated_at"],
+                "pushed_at": repo.get("pushed_at"),
                 "embedded": False,
                 "stored_at": datetime.now().isoformat()
             }
             
             # Save index
             self._save_repository_index()
+            self.repository_columns = None
             
             return True
         
@@ -177,21 +273,47 @@ class StorageManager:
             repo_id (int): Repository ID
         
         Returns:
-            dict: Repository metadata or None if not found
+            dict: Copy of the repository metadata or None if not found
         """
+        # Like the repository index, metadata is assumed to only change through this instance, so it is parsed once.
+        # Callers get a copy, so adding fields to a result doesn't change the cached metadata.
+        repo = self._metadata_cache.get(int(repo_id))
+        if repo is not None:
+            return dict(repo)
+        
         repo_dir = self.repositories_path / str(repo_id)
         metadata_file = repo_dir / "metadata.json"
         
         if metadata_file.exists():
             try:
-                with open(metadata_file, "r") as f:
-                    return json.load(f)
+                repo = read_json(metadata_file)
+                self._metadata_cache[int(repo_id)] = repo
+                return dict(repo)
             except Exception as e:
                 logger.error(f"Error loading repository metadata for {repo_id}: {str(e)}")
                 return None
         else:
             return None
     
+    def get_repositories(self, repo_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Get the metadata of several repositories, loading each repository once.
+        
+        Args:
+            repo_ids (iterable): Repository IDs, possibly repeated
+        
+        Returns:
+            dict: Repository ID to metadata for every repository found
+        """
+        repositories = {}
+        
+        for repo_id in dict.fromkeys(int(repo_id) for repo_id in repo_ids):
+            repo_data = self.get_repository(repo_id)
+            if repo_data:
+                repositories[repo_id] = repo_data
+        
+        return repositories
+    
     def get_repository_readme(self, repo_id: int) -> Optional[str]:
         """
         Get repository README content.
@@ -215,6 +337,62 @@ class StorageManager:
         else:
             return None
     
+    def iter_repositories_with_readme(self, repo_ids: Iterable[int]) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+        """
+        Load the metadata and README of several repositories, reading the files in threads.
+        
+        Args:
+            repo_ids (iterable): Repository IDs
+        
+        Yields:
+            tuple: Repository ID, metadata and README content, in the order of repo_ids,
+            with None for metadata or a README that is not found
+        """
+        def read(repo_id):
+            return repo_id, self.get_repository(repo_id), self.get_repository_readme(repo_id)
+        
+        with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+            yield from executor.map(read, repo_ids)
+    
+    def get_repository_tokens(self, repo_id: int) -> Optional[Tuple[List[str], List[str]]]:
+        """
+        Get the BM25 tokens of a repository.
+        
+        Args:
+            repo_id (int): Repository ID
+        
+        Returns:
+            tuple: README and description tokens or None if not found
+        """
+        tokens_file = self.repositories_path / str(repo_id) / "tokens.json"
+        
+        if tokens_file.exists():
+            try:
+                tokens = read_json(tokens_file)
+                return tokens["readme_tokens"], tokens["description_tokens"]
+            except Exception as e:
+                logger.error(f"Error loading repository tokens for {repo_id}: {str(e)}")
+                return None
+        else:
+            return None
+    
+    def iter_repository_tokens(self, repo_ids: Iterable[int]) -> Iterator[Tuple[int, Optional[Tuple[List[str], List[str]]]]]:
+        """
+        Load the BM25 tokens of several repositories, reading the files in threads.
+        
+        Args:
+            repo_ids (iterable): Repository IDs
+        
+        Yields:
+            tuple: Repository ID and its README and description tokens, in the order of repo_ids,
+            with None for repositories stored without tokens
+        """
+        def read(repo_id):
+            return repo_id, self.get_repository_tokens(repo_id)
+        
+        with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+            yield from executor.map(read, repo_ids)
+    
     def get_repository_chunks(self, repo_id: int) -> Optional[List[Dict[str, Any]]]:
         """
         Get repository content chunks.
@@ -230,14 +408,105 @@ class StorageManager:
         
         if chunks_file.exists():
             try:
-                with open(chunks_file, "r") as f:
-                    return json.load(f)
+                return read_json(chunks_file)
             except Exception as e:
                 logger.error(f"Error loading repository chunks for {repo_id}: {str(e)}")
                 return None
         else:
             return None
     
+    def update_repository_metadata(self, repo: Dict[str, Any]) -> bool:
+        """
+        Update the metadata of a stored repository, keeping its README and chunks.
+        
+        Args:
+            repo (dict): Repository metadata
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        repo_id = repo["id"]
+        entry = self.repository_index.get(str(repo_id))
+        if entry is None:
+            return False
+        
+        try:
+            repo_dir = self.repositories_path / str(repo_id)
+            write_json(repo_dir / "metadata.json", repo)
+            self._metadata_cache[int(repo_id)] = dict(repo)
+            
+            # The description may have changed, the README tokens are kept
+            tokens_file = repo_dir / "tokens.json"
+            if tokens_file.exists():
+                tokens = read_json(tokens_file)
+                tokens["description_tokens"] = tokenize_text(repo["description"]) if repo.get("description") else []
+                write_json(tokens_file, tokens)
+            
+            entry["updated_at"] = repo["updated_at"]
+            entry["stored_at"] = datetime.now().isoformat()
+            
+            self._save_repository_index()
+            self.repository_columns = None
+            
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error updating repository metadata for {repo_id}: {str(e)}")
+            return False
+    
+    def get_pushed_at_map(self) -> Dict[int, Optional[str]]:
+        """
+        Get the last push time of every stored repository.
+        
+        Returns:
+            dict: Repository ID to pushed_at, None for repositories stored without it
+        """
+        return {int(repo_id): entry.get("pushed_at") for repo_id, entry in self.repository_index.items()}
+    
+    def get_stored_at_map(self) -> Dict[int, Optional[str]]:
+        """
+        Get the last storage time of every stored repository.
+        
+        Returns:
+            dict: Repository ID to stored_at, None for repositories stored without it
+        """
+        return {int(repo_id): entry.get("stored_at") for repo_id, entry in self.repository_index.items()}
+    
+    def get_readme_etags(self) -> Dict[str, str]:
+        """
+        Get the ETags of the last fetched READMEs.
+        
+        Returns:
+            dict: Repository full name to README ETag
+        """
+        etags_file = self.index_path / "readme_etags.json"
+        
+        if etags_file.exists():
+            try:
+                return read_json(etags_file)
+            except Exception as e:
+                logger.error(f"Error loading README ETags: {str(e)}")
+        
+        return {}
+    
+    def update_readme_etags(self, etags: Dict[str, str]):
+        """
+        Store the ETags of fetched READMEs.
+        
+        Args:
+            etags (dict): Repository full name to README ETag
+        """
+        if not etags:
+            return
+        
+        stored_etags = self.get_readme_etags()
+        stored_etags.update(etags)
+        
+        try:
+            write_json(self.index_path / "readme_etags.json", stored_etags)
+        except Exception as e:
+            logger.error(f"Error saving README ETags: {str(e)}")
+    
     def has_repository(self, repo_id: int) -> bool:
         """
         Check if repository exists.
@@ -282,6 +551,22 @@ class StorageManager:
             self.repository_index[str(repo_id)]["embedded"] = True
             self._save_repository_index()
     
+    def mark_repositories_embedded(self, repo_ids: Iterable[int]):
+        """
+        Mark several repositories as embedded, saving the repository index once.
+        
+        Args:
+            repo_ids (iterable): Repository IDs
+        """
+        marked = False
+        for repo_id in repo_ids:
+            if str(repo_id) in self.repository_index:
+                self.repository_index[str(repo_id)]["embedded"] = True
+                marked = True
+        
+        if marked:
+            self._save_repository_index()
+    
     def has_embeddings(self, repo_id: int) -> bool:
         """
         Check if repository has embeddings.
@@ -306,6 +591,34 @@ class StorageManager:
         """
         return self.embeddings_path
     
+    def get_bm25_path(self) -> Path:
+        """
+        Get the path to the persisted BM25 keyword index.
+        
+        Returns:
+            Path: BM25 index directory path
+        """
+        return self.index_path / "bm25"
+    
+    def get_index_version(self) -> str:
+        """
+        Get a version of the stored repositories that changes whenever one is stored.
+        
+        Returns:
+            str: Hex digest of the repository IDs and their storage times
+        """
+        entries = sorted((repo_id, entry.get("stored_at")) for repo_id, entry in self.repository_index.items())
+        return hashlib.sha256(json.dumps(entries).encode("utf-8")).hexdigest()
+    
+    def get_repository_ids(self) -> List[int]:
+        """
+        Get the IDs of all stored repositories without reading their metadata.
+        
+        Returns:
+            list: Repository IDs
+        """
+        return [int(repo_id) for repo_id in self.repository_index]
+    
     def get_all_repositories(self) -> Dict[int, Dict[str, Any]]:
         """
         Get all repositories.
@@ -322,6 +635,18 @@ class StorageManager:
         
         return repositories
     
+    def get_repository_columns(self) -> Dict[str, Any]:
+        """
+        Get the filterable fields of all repositories as columns.
+        
+        Returns:
+            dict: Repository columns, see build_repository_columns
+        """
+        if self.repository_columns is None:
+            self.repository_columns = build_repository_columns(self.get_all_repositories())
+        
+        return self.repository_columns
+    
     def get_repository_count(self) -> int:
         """
         Get the number of repositories.
@@ -26,7 +26,7 @@ def main():
     # Check required modules
     # beautifulsoup4 is bs4 and pyyaml is yaml and scikit-learn is sklearn
     required_modules = [
-        "requests", "github", "langdetect", "markdown", "bs4", 
+        "requests", "aiohttp", "langdetect", "markdown", "bs4", 
         "html2text", "sentence_transformers", "txtai", "torch", "numpy", # sentence transformers have to be before txtai otherwise we get OMP error
         "sklearn", "click", "yaml", "tqdm", "colorama", "rich", "joblib"
     ]
@@ -0,0 +1,189 @@
+"""
+Tests for the vector index backends.
+"""
+
+import pytest
+from contextlib import nullcontext
+import numpy as np
+from unittest.mock import patch
+
+# Import the module to test
+from src.embeddings.ann_index import TopKNumPy, HNSWFaiss, quantize_int8
+
+@pytest.fixture
+def index():
+    """Create an index of normalized random vectors."""
+    vectors = np.random.default_rng(0).normal(size=(50, 8))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    index = TopKNumPy({"backend": "topk"})
+    index.index(vectors)
+    return index
+
+@pytest.mark.unit
+class TestTopKNumPy:
+    """Tests for the TopKNumPy class."""
+
+    def test_index_float32(self, index):
+        """Test that vectors are stored as a contiguous float32 matrix."""
+        # Assertions
+        assert index.backend.dtype == np.float32
+        assert index.backend.flags["C_CONTIGUOUS"]
+
+    def test_search_matches_full_sort(self, index):
+        """Test that the partial sort returns the same results as a full sort."""
+        queries = index.backend[[3, 7]]
+
+        # Call the method
+        results = index.search(queries, 5)
+
+        # Assertions
+        scores = queries @ index.backend.T
+        for query_results, query_scores in zip(results, scores):
+            expected = np.argsort(-query_scores)[:5]
+            assert [result_id for result_id, _ in query_results] == expected.tolist()
+            np.testing.assert_allclose([score for _, score in query_results], query_scores[expected], rtol=1e-6)
+        assert results[0][0][0] == 3
+
+    def test_search_limit_exceeds_count(self, index):
+        """Test that a limit larger than the index returns every vector."""
+        # Call the method
+        results = index.search(index.backend[:1], 100)
+
+        # Assertions
+        assert len(results[0]) == 50
+
+    def test_load_memory_mapped(self, index, tmp_path):
+        """Test that a saved index is mapped from disk and can be saved over."""
+        path = str(tmp_path / "embeddings")
+        index.save(path)
+
+        # Call the method
+        loaded = TopKNumPy(dict(index.config))
+        loaded.load(path)
+        loaded.append(loaded.backend[:1])
+        loaded.save(path)
+
+        # Assertions
+        assert isinstance(np.load(path, mmap_mode="r"), np.memmap)
+        assert np.load(path).shape == (51, 8)
+
+        mapped = TopKNumPy({"backend": "topk"})
+        mapped.load(path)
+        assert isinstance(mapped.backend.base, np.memmap)
+        np.testing.assert_array_equal(mapped.backend[:50], index.backend)
+
+    def test_load_without_mmap(self, index, tmp_path):
+        """Test that the index is read into memory when mmap is off."""
+        path = str(tmp_path / "embeddings")
+        index.save(path)
+
+        # Call the method
+        loaded = TopKNumPy({"backend": "topk", "topk": {"mmap": False}})
+        loaded.load(path)
+
+        # Assertions
+        assert not isinstance(loaded.backend.base, np.memmap)
+        np.testing.assert_array_equal(loaded.backend, index.backend)
+
+    @patch("src.embeddings.ann_index.simsimd", None)
+    def test_search_numpy_fallback(self, index):
+        """Test that search falls back to NumPy when SimSIMD is not installed."""
+        # Call the method
+        results = index.search(index.backend[[3]], 3)
+
+        # Assertions
+        assert results[0][0][0] == 3
+        assert results[0][0][1] == pytest.approx(1.0, rel=1e-5)
+
+@pytest.mark.unit
+class TestInt8TopKNumPy:
+    """Tests for int8 quantized vectors in the TopKNumPy class."""
+
+    def test_quantize_int8(self):
+        """Test that quantized vectors scale back to the original vectors."""
+        vectors = np.array([[0.5, -0.25, 0.1], [0.0, 0.0, 0.0]], dtype=np.float32)
+
+        # Call the method
+        quantized, scales = quantize_int8(vectors)
+
+        # Assertions
+        assert quantized.dtype == np.int8
+        assert quantized[0].tolist() == [127, -64, 25]
+        np.testing.assert_allclose(quantized * scales[:, None], vectors, atol=0.5 / 127)
+
+    def test_quantize_int8_subvectors(self):
+        """Test that each subvector is scaled separately."""
+        vectors = np.array([[0.5, -0.25, 0.04, -0.01]], dtype=np.float32)
+
+        # Call the method
+        quantized, scales = quantize_int8(vectors, subvectors=2)
+
+        # Assertions
+        assert scales.shape == (1, 2)
+        assert quantized[0].tolist() == [127, -64, 127, -32]
+        np.testing.assert_allclose(quantized * np.repeat(scales, 2, axis=1), vectors, atol=0.5 / 127)
+
+    @pytest.mark.parametrize("simsimd_installed", [True, False])
+    def test_search_subvectors(self, simsimd_installed):
+        """Test that subvector scales rank like the float index."""
+        vectors = np.random.default_rng(0).normal(size=(50, 9))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        index = TopKNumPy({"backend": "topk", "topk": {"int8": True, "subvectors": 2}})
+        index.index(vectors)
+
+        # Call the method
+        with nullcontext() if simsimd_installed else patch("src.embeddings.ann_index.simsimd", None):
+            results = index.search(vectors[[3]], 3)
+
+        # Assertions
+        expected = np.argsort(-(vectors[3] @ vectors.T))[:3]
+        assert index.scales.shape == (50, 2)
+        assert [result_id for result_id, _ in results[0]] == expected.tolist()
+        assert results[0][0][1] == pytest.approx(1.0, abs=0.01)
+
+    def test_search_save_load(self, tmp_path):
+        """Test that an int8 index ranks like the float index after a save and load."""
+        vectors = np.random.default_rng(0).normal(size=(50, 8))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        config = {"backend": "topk", "topk": {"int8": True}}
+
+        index = TopKNumPy(dict(config))
+        index.index(vectors)
+        index.save(str(tmp_path / "embeddings"))
+
+        # Call the method
+        loaded = TopKNumPy(dict(config))
+        loaded.load(str(tmp_path / "embeddings"))
+        results = loaded.search(vectors[[3]], 3)
+
+        # Assertions
+        assert loaded.backend.dtype == np.int8
+        assert isinstance(loaded.backend, np.memmap)
+        assert results[0][0][0] == 3
+        assert results[0][0][1] == pytest.approx(1.0, abs=0.01)
+
+@pytest.mark.unit
+class TestHNSWFaiss:
+    """Tests for the HNSWFaiss class."""
+
+    def test_search_and_delete(self):
+        """Test that search finds the nearest vector and skips deleted ids."""
+        vectors = np.random.default_rng(0).normal(size=(200, 8)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        index = HNSWFaiss({"backend": "hnsw", "hnsw": {"efsearch": 64}})
+        index.index(vectors)
+
+        # Call the method
+        results = index.search(vectors[[3]], 2)
+        index.delete([3])
+        filtered = index.search(vectors[[3]], 2)
+
+        # Assertions
+        assert index.config["offset"] == 200
+        assert results[0][0][0] == 3
+        assert 3 not in [result_id for result_id, _ in filtered[0]]
+        assert filtered[0][0] == results[0][1]
+        assert index.count() == 199
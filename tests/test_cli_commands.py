@@ -2,13 +2,16 @@
 Tests for the CLI commands.
 """
 
+import json
 import pytest
-from unittest.mock import patch, MagicMock, call
+from concurrent.futures import Future
+from unittest.mock import patch, MagicMock, call, ANY
 
 # Import the module to test
 from src.cli.commands import (
-    update_command, search_command, config_command, info_command
+    update_command, search_command, config_command, info_command, EMBED_BATCH_REPOSITORIES
 )
+from src.api.github_client import README_NOT_MODIFIED
 
 # Sample test data
 SAMPLE_REPO = {
@@ -32,6 +35,16 @@ SAMPLE_SEARCH_RESULTS = [
     }
 ]
 
+def fetch_readmes(readme_content):
+    """Mock get_readmes returning the same README for every repository."""
+    def get_readmes(names, etags=None, callback=None):
+        for name in names:
+            if callback is not None:
+                callback(name, readme_content)
+        return {name: readme_content for name in names}
+    
+    return get_readmes
+
 @pytest.fixture
 def mock_github_client():
     """Create a mock GitHub client."""
@@ -40,8 +53,8 @@ def mock_github_client():
     # Mock the get_starred_repositories method
     client.get_starred_repositories.return_value = [SAMPLE_REPO]
     
-    # Mock the get_readme method
-    client.get_readme.return_value = "# Test Repository\n\nThis is a test repository for unit tests."
+    # Mock the get_readmes method
+    client.get_readmes.side_effect = fetch_readmes("# Test Repository\n\nThis is a test repository for unit tests.")
     
     return client
 
@@ -62,6 +75,14 @@ def mock_content_processor():
         }
     ]
     
+    # Process submitted READMEs in this process
+    def submit(content, repo):
+        future = Future()
+        future.set_result(processor.process_readme(content, repo))
+        return future
+    
+    processor.submit.side_effect = submit
+    
     # Mock the process_description method
     processor.process_description.return_value = {
         "id": "12345-description",
@@ -84,6 +105,9 @@ def mock_storage_manager():
     # Mock the is_repository_outdated method
     manager.is_repository_outdated.return_value = True
     
+    # Mock the get_pushed_at_map method
+    manager.get_pushed_at_map.return_value = {}
+    
     # Mock the store_repository method
     manager.store_repository.return_value = True
     
@@ -105,8 +129,9 @@ def mock_embedding_manager():
     """Create a mock embedding manager."""
     manager = MagicMock()
     
-    # Mock the generate_embeddings method
-    manager.generate_embeddings.return_value = True
+    # Mock the generate_embeddings_batch method
+    manager.generate_embeddings_batch.return_value = {SAMPLE_REPO["id"]: True}
+    manager.batch_size = 32
     
     # Mock the get_model_info method
     manager.get_model_info.return_value = {
@@ -151,12 +176,16 @@ class TestUpdateCommand:
         # Check that the GitHub client was called
         mock_github_client.get_starred_repositories.assert_called_once_with(limit=None)
         
+        # Check that the READMEs were fetched together
+        mock_github_client.get_readmes.assert_called_once_with([SAMPLE_REPO["full_name"]], etags={}, callback=ANY)
+        
         # Check that the storage manager was called
         mock_storage_manager.has_repository.assert_called_once_with(SAMPLE_REPO["id"])
         mock_storage_manager.store_repository.assert_called_once()
         
-        # Check that the embedding manager was called
-        mock_embedding_manager.generate_embeddings.assert_called_once()
+        # Check that the embedding manager was called once for all repositories
+        mock_embedding_manager.generate_embeddings_batch.assert_called_once()
+        assert list(mock_embedding_manager.generate_embeddings_batch.call_args[0][0]) == [SAMPLE_REPO["id"]]
     
     @patch("src.cli.commands.tqdm")
     def test_update_command_with_limit(self, mock_tqdm, mock_github_client, mock_content_processor, mock_storage_manager, mock_embedding_manager):
@@ -214,6 +243,9 @@ class TestUpdateCommand:
         # Mock the is_repository_outdated method to return False
         mock_storage_manager.is_repository_outdated.return_value = False
         
+        # Mock the get_pushed_at_map method to return the current push time
+        mock_storage_manager.get_pushed_at_map.return_value = {SAMPLE_REPO["id"]: SAMPLE_REPO.get("pushed_at")}
+        
         # Call the function
         result = update_command(
             mock_github_client,
@@ -231,14 +263,65 @@ class TestUpdateCommand:
         mock_storage_manager.store_repository.assert_not_called()
         
         # Check that the embedding manager was not called
-        mock_embedding_manager.generate_embeddings.assert_not_called()
+        mock_embedding_manager.generate_embeddings_batch.assert_not_called()
+    
+    @patch("src.cli.commands.tqdm")
+    def test_update_command_readme_not_modified(self, mock_tqdm, mock_github_client, mock_content_processor, mock_storage_manager, mock_embedding_manager):
+        """Test that an unchanged README is reprocessed from storage and its ETag kept."""
+        
+        # Mock a stored repository pushed to since, whose README is unchanged since its ETag
+        mock_storage_manager.has_repository.return_value = True
+        mock_storage_manager.get_pushed_at_map.return_value = {SAMPLE_REPO["id"]: "2021-12-01T00:00:00Z"}
+        mock_storage_manager.get_readme_etags.return_value = {SAMPLE_REPO["full_name"]: '"abc"'}
+        mock_storage_manager.get_repository_readme.return_value = "# Stored README"
+        mock_github_client.get_readmes.side_effect = fetch_readmes(README_NOT_MODIFIED)
+        
+        # Call the function
+        result = update_command(
+            mock_github_client,
+            mock_content_processor,
+            mock_storage_manager,
+            mock_embedding_manager,
+            limit=None,
+            force=False
+        )
+        
+        # Assertions
+        assert result is True
+        mock_github_client.get_readmes.assert_called_once_with([SAMPLE_REPO["full_name"]], etags={SAMPLE_REPO["full_name"]: '"abc"'}, callback=ANY)
+        mock_content_processor.process_readme.assert_called_once_with("# Stored README", SAMPLE_REPO)
+        mock_storage_manager.update_readme_etags.assert_called_once_with({SAMPLE_REPO["full_name"]: '"abc"'})
+    
+    @patch("src.cli.commands.tqdm")
+    def test_update_command_metadata_only(self, mock_tqdm, mock_github_client, mock_content_processor, mock_storage_manager, mock_embedding_manager):
+        """Test that a changed repository without a new push only gets its metadata updated."""
+        
+        # Mock a stored repository that changed without a push
+        mock_storage_manager.has_repository.return_value = True
+        mock_storage_manager.get_pushed_at_map.return_value = {SAMPLE_REPO["id"]: SAMPLE_REPO.get("pushed_at")}
+        
+        # Call the function
+        result = update_command(
+            mock_github_client,
+            mock_content_processor,
+            mock_storage_manager,
+            mock_embedding_manager,
+            limit=None,
+            force=False
+        )
+        
+        # Assertions
+        assert result is True
+        mock_github_client.get_readmes.assert_called_once_with([], etags={}, callback=ANY)
+        mock_storage_manager.update_repository_metadata.assert_called_once_with(SAMPLE_REPO)
+        mock_storage_manager.store_repository.assert_not_called()
     
     @patch("src.cli.commands.tqdm")
     def test_update_command_no_readme(self, mock_tqdm, mock_github_client, mock_content_processor, mock_storage_manager, mock_embedding_manager):
         """Test updating repositories with no README."""
         
-        # Mock the get_readme method to return None
-        mock_github_client.get_readme.return_value = None
+        # Mock the get_readmes method to return no README
+        mock_github_client.get_readmes.side_effect = fetch_readmes(None)
         
         # Call the function
         result = update_command(
@@ -260,7 +343,81 @@ class TestUpdateCommand:
         mock_storage_manager.store_repository.assert_not_called()
         
         # Check that the embedding manager was not called
-        mock_embedding_manager.generate_embeddings.assert_not_called()
+        mock_embedding_manager.generate_embeddings_batch.assert_not_called()
+    
+    @patch("src.cli.commands.tqdm")
+    def test_update_command_embeds_in_batches(self, mock_tqdm, mock_github_client, mock_content_processor, mock_storage_manager, mock_embedding_manager):
+        """Test that repositories are embedded in batches while the rest are processed."""
+        
+        # Mock many starred repositories
+        repositories = [dict(SAMPLE_REPO, id=i, full_name=f"test-user/repo-{i}") for i in range(40)]
+        mock_github_client.get_starred_repositories.return_value = repositories
+        mock_embedding_manager.generate_embeddings_batch.side_effect = lambda repo_chunks: {repo_id: True for repo_id in repo_chunks}
+        
+        # Call the function
+        result = update_command(
+            mock_github_client,
+            mock_content_processor,
+            mock_storage_manager,
+            mock_embedding_manager,
+            limit=None,
+            force=False
+        )
+        
+        # Assertions
+        assert result is True
+        batches = [list(args[0][0]) for args in mock_embedding_manager.generate_embeddings_batch.call_args_list]
+        assert sorted(repo_id for batch in batches for repo_id in batch) == list(range(40))
+        
+        # Check that the index was saved once after all batches
+        mock_embedding_manager.flush.assert_called_once()
+        assert all(len(batch) >= EMBED_BATCH_REPOSITORIES for batch in batches[:-1])
+        assert mock_storage_manager.store_repository.call_count == 40
+    
+    @patch("src.cli.commands.tqdm")
+    def test_update_command_save_error(self, mock_tqdm, mock_github_client, mock_content_processor, mock_storage_manager, mock_embedding_manager):
+        """Test that the update fails when the embeddings index can't be saved."""
+        mock_embedding_manager.flush.return_value = False
+        
+        # Call the function
+        result = update_command(
+            mock_github_client,
+            mock_content_processor,
+            mock_storage_manager,
+            mock_embedding_manager,
+            limit=None,
+            force=False
+        )
+        
+        # Assertions
+        assert result is False
+        mock_embedding_manager.flush.assert_called_once()
+    
+    @patch("src.cli.commands.tqdm")
+    def test_update_command_fills_model_batches(self, mock_tqdm, mock_github_client, mock_content_processor, mock_storage_manager, mock_embedding_manager):
+        """Test that batches hold at least a model batch of chunks across repositories."""
+        
+        # Mock many starred repositories with two chunks each and a large model batch size
+        repositories = [dict(SAMPLE_REPO, id=i, full_name=f"test-user/repo-{i}") for i in range(100)]
+        mock_github_client.get_starred_repositories.return_value = repositories
+        mock_embedding_manager.batch_size = 64
+        mock_embedding_manager.generate_embeddings_batch.side_effect = lambda repo_chunks: {repo_id: True for repo_id in repo_chunks}
+        
+        # Call the function
+        result = update_command(
+            mock_github_client,
+            mock_content_processor,
+            mock_storage_manager,
+            mock_embedding_manager,
+            limit=None,
+            force=False
+        )
+        
+        # Assertions
+        assert result is True
+        batches = [args[0][0] for args in mock_embedding_manager.generate_embeddings_batch.call_args_list]
+        assert sum(len(batch) for batch in batches) == 100
+        assert all(sum(len(chunks) for chunks in batch.values()) >= 64 for batch in batches[:-1])
 
 @pytest.mark.unit
 class TestSearchCommand:
@@ -336,9 +493,11 @@ class TestSearchCommand:
         # Assertions
         assert result is True
         
-        # Check that the search engine weights were updated
-        assert mock_search_engine.neural_weight == 0.8
-        assert mock_search_engine.keyword_weight == 0.2
+        # Check that the weights were passed to the search without changing the search engine
+        args, kwargs = mock_search_engine.search.call_args
+        assert kwargs["neural_weight"] == 0.8
+        assert kwargs["keyword_weight"] == 0.2
+        assert mock_search_engine.neural_weight != 0.8
     
     @patch("src.cli.commands.console")
     def test_search_command_no_results(self, mock_console, mock_search_engine):
@@ -363,6 +522,30 @@ class TestSearchCommand:
         
         # Check that the console was used to print a message
         mock_console.print.assert_any_call("[bold yellow]No results found.[/bold yellow]")
+    
+    @patch("src.cli.commands.console")
+    def test_search_command_json_output(self, mock_console, mock_search_engine):
+        """Test searching repositories with JSON output."""
+        
+        # Call the function
+        result = search_command(mock_search_engine, query="test query", json_output=True)
+        
+        # Assertions
+        assert result is True
+        output = mock_console.print.call_args[0][0]
+        assert json.loads(output) == SAMPLE_SEARCH_RESULTS
+        assert output.startswith("[\n  {")
+    
+    @patch("src.cli.commands.orjson", None)
+    @patch("src.cli.commands.console")
+    def test_search_command_json_output_without_orjson(self, mock_console, mock_search_engine):
+        """Test that JSON output falls back to the standard library without orjson."""
+        
+        # Call the function
+        search_command(mock_search_engine, query="test query", json_output=True)
+        
+        # Assertions
+        assert json.loads(mock_console.print.call_args[0][0]) == SAMPLE_SEARCH_RESULTS
 
 @pytest.mark.unit
 class TestConfigCommand:
@@ -469,6 +652,25 @@ class TestInfoCommand:
         # Check that the console was used to print information
         assert mock_console.print.call_count > 0
     
+    @patch("src.cli.commands.console")
+    def test_info_command_languages(self, mock_console, mock_storage_manager, mock_embedding_manager):
+        """Test showing the most common languages."""
+        
+        # Mock repositories in several languages
+        languages = ["Python"] * 3 + ["Rust"] * 2 + ["Go", "C", "Java", "Ruby", None]
+        mock_storage_manager.get_all_repositories.return_value = {
+            i: dict(SAMPLE_REPO, id=i, language=language) for i, language in enumerate(languages)
+        }
+        
+        # Call the function
+        result = info_command(mock_storage_manager, mock_embedding_manager)
+        
+        # Assertions
+        assert result is True
+        table = mock_console.print.call_args_list[0][0][0]
+        rows = dict(zip(table.columns[0]._cells, table.columns[1]._cells))
+        assert rows["Languages"] == "Python (3), Rust (2), Go (1), C (1), Java (1)"
+    
     @patch("src.cli.commands.console")
     def test_info_command_no_data(self, mock_console, mock_storage_manager, mock_embedding_manager):
         """Test showing information with no data."""
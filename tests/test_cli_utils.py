@@ -3,13 +3,14 @@ Tests for the CLI utilities.
 """
 
 import os
+import yaml
 import pytest
 from pathlib import Path
 from unittest.mock import patch, MagicMock, mock_open
 
 # Import the module to test
 from src.cli.utils import (
-    load_config, save_config, get_components, get_github_api_key
+    load_config, save_config, get_components, get_github_api_key, _load_config, YAML_LOADER
 )
 
 # Sample test data
@@ -45,12 +46,21 @@ SAMPLE_CONFIG = {
     }
 }
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Clear the cached configuration and API key around each test."""
+    _load_config.cache_clear()
+    get_github_api_key.cache_clear()
+    yield
+    _load_config.cache_clear()
+    get_github_api_key.cache_clear()
+
 @pytest.mark.unit
 class TestLoadConfig:
     """Test the load_config function."""
     
     @patch("builtins.open", new_callable=mock_open, read_data="github:\n  per_page: 100\n")
-    @patch("src.cli.utils.yaml.safe_load")
+    @patch("src.cli.utils.yaml.load")
     def test_load_config(self, mock_yaml_load, mock_file):
         """Test loading configuration from a file."""
         # Set up the mock
@@ -65,7 +75,7 @@ class TestLoadConfig:
         mock_yaml_load.assert_called_once()
     
     @patch("builtins.open", side_effect=FileNotFoundError)
-    @patch("src.cli.utils.yaml.safe_load")
+    @patch("src.cli.utils.yaml.load")
     def test_load_config_file_not_found(self, mock_yaml_load, mock_file):
         """Test loading configuration when the file doesn't exist."""
         # Call the function
@@ -83,7 +93,7 @@ class TestLoadConfig:
         mock_yaml_load.assert_not_called()
     
     @patch("builtins.open", new_callable=mock_open, read_data="invalid: yaml: content")
-    @patch("src.cli.utils.yaml.safe_load", side_effect=Exception("YAML error"))
+    @patch("src.cli.utils.yaml.load", side_effect=Exception("YAML error"))
     def test_load_config_invalid_yaml(self, mock_yaml_load, mock_file):
         """Test loading configuration with invalid YAML."""
         # Call the function
@@ -96,6 +106,32 @@ class TestLoadConfig:
         assert "embeddings" in config
         assert "search" in config
         assert "storage" in config
+    
+    @patch("builtins.open", new_callable=mock_open, read_data="github:\n  per_page: 100\n")
+    def test_load_config_cached(self, mock_file):
+        """Test that the configuration is parsed once and returned as independent copies."""
+        # Call the function
+        config = load_config()
+        config["github"]["per_page"] = 10
+        cached_config = load_config()
+        
+        # Assertions
+        assert cached_config == {"github": {"per_page": 100}}
+        mock_file.assert_called_once()
+    
+    @patch("builtins.open", new_callable=mock_open, read_data="github:\n  per_page: 100\n")
+    @patch("src.cli.utils.yaml.load")
+    def test_load_config_loader(self, mock_yaml_load, mock_file):
+        """Test that the configuration is parsed with the fastest safe loader."""
+        # Set up the mock
+        mock_yaml_load.return_value = {"github": {"per_page": 100}}
+        
+        # Call the function
+        load_config()
+        
+        # Assertions
+        assert mock_yaml_load.call_args[1]["Loader"] is YAML_LOADER
+        assert YAML_LOADER is getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 @pytest.mark.unit
 class TestSaveConfig:
@@ -113,6 +149,19 @@ class TestSaveConfig:
         mock_file.assert_called_once()
         mock_yaml_dump.assert_called_once_with(SAMPLE_CONFIG, mock_file(), default_flow_style=False, sort_keys=False)
     
+    @patch("builtins.open", new_callable=mock_open, read_data="github:\n  per_page: 100\n")
+    @patch("src.cli.utils.yaml.dump")
+    def test_save_config_clears_cache(self, mock_yaml_dump, mock_file):
+        """Test that saving the configuration makes the next load read the file again."""
+        load_config()
+        
+        # Call the function
+        save_config(SAMPLE_CONFIG)
+        load_config()
+        
+        # Assertions
+        assert mock_file.call_count == 3
+    
     @patch("builtins.open", side_effect=Exception("File error"))
     @patch("src.cli.utils.yaml.dump")
     def test_save_config_error(self, mock_yaml_dump, mock_file):
@@ -156,7 +205,10 @@ class TestGetComponents:
         mock_search_engine.return_value = mock_search_engine_instance
         
         # Call the function
+        get_components.cache_clear()
         components = get_components()
+        cached_components = get_components()
+        get_components.cache_clear()
         
         # Assertions
         assert components["github_client"] == mock_github_client_instance
@@ -164,6 +216,7 @@ class TestGetComponents:
         assert components["storage_manager"] == mock_storage_manager_instance
         assert components["embedding_manager"] == mock_embedding_manager_instance
         assert components["search_engine"] == mock_search_engine_instance
+        assert cached_components is components
         
         # Check that the constructors were called with the correct arguments
         mock_github_client.assert_called_once_with(SAMPLE_CONFIG["github"])
@@ -171,6 +224,35 @@ class TestGetComponents:
         mock_storage_manager.assert_called_once_with(SAMPLE_CONFIG["storage"])
         mock_embedding_manager.assert_called_once_with(SAMPLE_CONFIG["embeddings"], mock_storage_manager_instance)
         mock_search_engine.assert_called_once_with(SAMPLE_CONFIG["search"], mock_embedding_manager_instance, mock_storage_manager_instance)
+    
+    @patch("src.api.github_client.GitHubClient")
+    @patch("src.processor.content_processor.ContentProcessor")
+    @patch("src.storage.storage_manager.StorageManager")
+    @patch("src.embeddings.embedding_manager.EmbeddingManager")
+    @patch("src.search.search_engine.SearchEngine")
+    @patch("src.cli.utils.load_config")
+    def test_get_components_lazy(self, mock_load_config, mock_search_engine, mock_embedding_manager, mock_storage_manager, mock_content_processor, mock_github_client):
+        """Test that components are only created when accessed."""
+        # Set up the mocks
+        mock_load_config.return_value = SAMPLE_CONFIG
+        
+        # Call the function
+        get_components.cache_clear()
+        components = get_components()
+        created_before_access = mock_storage_manager.called
+        components["search_engine"]
+        get_components.cache_clear()
+        
+        # Assertions
+        assert not created_before_access
+        mock_search_engine.assert_called_once()
+        mock_embedding_manager.assert_called_once()
+        mock_storage_manager.assert_called_once()
+        mock_github_client.assert_not_called()
+        mock_content_processor.assert_not_called()
+        assert list(components) == ["github_client", "content_processor", "storage_manager", "embedding_manager", "search_engine"]
+        with pytest.raises(KeyError):
+            components["unknown"]
 
 @pytest.mark.unit
 class TestGetGitHubApiKey:
@@ -185,6 +267,16 @@ class TestGetGitHubApiKey:
         # Assertions
         assert api_key == "test_api_key"
     
+    def test_get_github_api_key_cached(self):
+        """Test that the GitHub API key is looked up once."""
+        # Call the function
+        with patch.dict(os.environ, {"GITHUB_STARS_KEY": "test_api_key"}):
+            api_key = get_github_api_key()
+        cached_api_key = get_github_api_key()
+        
+        # Assertions
+        assert cached_api_key == api_key == "test_api_key"
+    
     @patch.dict(os.environ, {}, clear=True)
     @patch("builtins.open", new_callable=mock_open, read_data="GITHUB_STARS_KEY=test_api_key")
     def test_get_github_api_key_from_dotenv(self, mock_file):
@@ -2,11 +2,12 @@
 Tests for the content processor.
 """
 
+import re
 import pytest
 from unittest.mock import patch, MagicMock
 
 # Import the module to test
-from src.processor.content_processor import ContentProcessor
+from src.processor.content_processor import ContentProcessor, canonicalize_text, collapse_whitespace, content_hash, window_ranges
 
 # Sample test data
 SAMPLE_REPO = {
@@ -134,6 +135,41 @@ class TestCleanContent:
         assert "HTML" in cleaned
         assert "Item 1" in cleaned
         assert "Item 2" in cleaned
+    
+    @patch("src.processor.content_processor.HTMLParser")
+    @patch("src.processor.content_processor.cmarkgfm")
+    def test_clean_content_cmarkgfm(self, mock_cmarkgfm, mock_html_parser, content_processor):
+        """Test that cmark-gfm and selectolax are used when installed."""
+        # Set up the mocks
+        mock_cmarkgfm.github_flavored_markdown_to_html.return_value = "<h1>Test Repository</h1>"
+        mock_html_parser.return_value.text.return_value = "Test Repository \n\n\n Body"
+        
+        # Call the method
+        cleaned = content_processor._clean_content("# Test Repository")
+        
+        # Assertions
+        mock_cmarkgfm.github_flavored_markdown_to_html.assert_called_once_with("# Test Repository")
+        mock_html_parser.assert_called_once_with("<h1>Test Repository</h1>")
+        mock_html_parser.return_value.text.assert_called_once_with(separator="")
+        assert cleaned == "Test Repository Body"
+    
+    def test_clean_content_converters_match(self, content_processor):
+        """Test that cmark-gfm with Lexbor keeps the headers and links html2text writes."""
+        pytest.importorskip("cmarkgfm")
+        pytest.importorskip("selectolax.lexbor")
+        content = SAMPLE_README_MARKDOWN + "\nSee [the docs](https://example.com/docs) and *more*.\n"
+        
+        # Call the method with and without the C libraries
+        cleaned = content_processor._clean_content(content)
+        with patch("src.processor.content_processor.cmarkgfm", None):
+            fallback = content_processor._clean_content(content)
+        
+        # Assertions
+        assert cleaned == fallback
+        assert "## Section 1" in cleaned
+        assert "[the docs](https://example.com/docs)" in cleaned
+        assert len(content_processor._semantic_chunking(cleaned, SAMPLE_REPO)) == \
+            len(content_processor._semantic_chunking(fallback, SAMPLE_REPO))
 
 @pytest.mark.unit
 class TestSemanticChunking:
@@ -167,6 +203,16 @@ class TestSemanticChunking:
         # Should fall back to sliding window
         assert len(chunks) > 0
         assert chunks[0]["chunk_type"] == "readme_window"
+    
+    @patch("src.processor.content_processor.HEADER_SECTION")
+    def test_semantic_chunking_skips_scan_without_headers(self, mock_header_section, content_processor):
+        """Test that content without headers falls back to windows without a regex scan."""
+        # Call the method
+        chunks = content_processor._semantic_chunking("No headers, only a # in the text " * 10, SAMPLE_REPO)
+        
+        # Assertions
+        mock_header_section.findall.assert_not_called()
+        assert chunks[0]["chunk_type"] == "readme_window"
 
 @pytest.mark.unit
 class TestSlidingWindowChunking:
@@ -220,6 +266,28 @@ class TestSlidingWindowChunking:
         # The first N words of the second chunk should be the last N words of the first chunk
         # where N is the overlap size
         assert words_in_second_chunk[:5] == words_in_first_chunk[-5:]
+    
+    def test_window_ranges(self):
+        """Test that windows shorter than the overlap are dropped."""
+        # Call the function
+        starts, ends = window_ranges(15, 10, 5)
+        
+        # Assertions
+        assert starts.tolist() == [0, 5, 10]
+        assert ends.tolist() == [10, 15, 15]
+        assert window_ranges(12, 10, 5)[0].tolist() == [0, 5]
+        assert window_ranges(0, 10, 5)[0].tolist() == []
+    
+    def test_sliding_window_chunking_whitespace(self):
+        """Test that windows are sliced from whitespace-normalized text."""
+        processor = ContentProcessor({"max_chunk_size": 3, "chunk_overlap": 1})
+        
+        # Call the method
+        chunks = processor._sliding_window_chunking(" one  two\tthree\nfour five ", SAMPLE_REPO)
+        
+        # Assertions
+        assert [chunk["content"].split("\n\n")[1] for chunk in chunks] == ["one two three", "three four five", "five"]
+        assert [chunk["window_index"] for chunk in chunks] == [0, 1, 2]
 
 @pytest.mark.unit
 class TestHybridChunking:
@@ -329,6 +397,78 @@ class TestProcessReadme:
         # Check that the content was truncated
         total_content = "".join(chunk["content"] for chunk in chunks)
         assert len(total_content) < len(SAMPLE_README_LARGE) + len(chunks) * len(f"Repository: {SAMPLE_REPO['full_name']}\n\n")
+    
+    def test_process_readme_cached(self, content_processor):
+        """Test that a README processed again reuses its chunks."""
+        with patch.object(content_processor, "_clean_content", wraps=content_processor._clean_content) as mock_clean:
+            # Call the method
+            chunks = content_processor.process_readme(SAMPLE_README_MARKDOWN, SAMPLE_REPO)
+            chunks[0]["content"] = "modified"
+            cached = content_processor.process_readme(SAMPLE_README_MARKDOWN, SAMPLE_REPO)
+            renamed = content_processor.process_readme(SAMPLE_README_MARKDOWN, dict(SAMPLE_REPO, full_name="test-user/renamed"))
+        
+        # Assertions
+        assert mock_clean.call_count == 2
+        assert cached[0]["content"] != "modified"
+        assert renamed[0]["repo_name"] == "test-user/renamed"
+    
+    def test_process_readme_cache_disabled(self):
+        """Test that READMEs are processed every time when the cache is disabled."""
+        processor = ContentProcessor({"cache_size": 0})
+        
+        with patch.object(processor, "_clean_content", wraps=processor._clean_content) as mock_clean:
+            # Call the method
+            processor.process_readme(SAMPLE_README_MARKDOWN, SAMPLE_REPO)
+            processor.process_readme(SAMPLE_README_MARKDOWN, SAMPLE_REPO)
+        
+        # Assertions
+        assert mock_clean.call_count == 2
+
+@pytest.mark.unit
+class TestProcessReadmes:
+    """Test processing READMEs in worker processes."""
+    
+    def test_process_readmes_workers(self):
+        """Test that worker processes return the same chunks as the current process."""
+        processor = ContentProcessor({"workers": 2})
+        other_repo = dict(SAMPLE_REPO, id=67890, full_name="test-user/other-repo")
+        
+        # Call the method
+        try:
+            results = processor.process_readmes([(SAMPLE_README_MARKDOWN, SAMPLE_REPO), (SAMPLE_README_MARKDOWN, other_repo)])
+        finally:
+            processor.close()
+        
+        # Assertions
+        assert results == [
+            processor.process_readme(SAMPLE_README_MARKDOWN, SAMPLE_REPO),
+            processor.process_readme(SAMPLE_README_MARKDOWN, other_repo)
+        ]
+        assert processor._executor is None
+    
+    @patch("src.processor.content_processor.ProcessPoolExecutor")
+    def test_process_readmes_single_item(self, mock_executor_class):
+        """Test that a single README is processed without starting workers."""
+        processor = ContentProcessor({"workers": 4})
+        
+        # Call the method
+        results = processor.process_readmes([(SAMPLE_README_MARKDOWN, SAMPLE_REPO)])
+        
+        # Assertions
+        mock_executor_class.assert_not_called()
+        assert results == [processor.process_readme(SAMPLE_README_MARKDOWN, SAMPLE_REPO)]
+    
+    @patch("src.processor.content_processor.ProcessPoolExecutor")
+    def test_submit_single_worker(self, mock_executor_class):
+        """Test that a single worker processes READMEs in the current process."""
+        processor = ContentProcessor({"workers": 1})
+        
+        # Call the method
+        future = processor.submit(SAMPLE_README_MARKDOWN, SAMPLE_REPO)
+        
+        # Assertions
+        mock_executor_class.assert_not_called()
+        assert future.result() == processor.process_readme(SAMPLE_README_MARKDOWN, SAMPLE_REPO)
 
 @pytest.mark.unit
 class TestProcessDescription:
@@ -361,3 +501,32 @@ class TestProcessDescription:
         
         # Assertions
         assert chunk is None
+
+@pytest.mark.unit
+class TestCanonicalization:
+    """Test canonicalization of chunk text for the embedding cache."""
+    
+    @pytest.mark.parametrize("text", ["", " ", "word", "  two\n\n words\t", "a\x1cb\u2003c\u0085", "\n# Title\n\nBody\n"])
+    def test_collapse_whitespace(self, text):
+        """Test that whitespace is collapsed exactly like the equivalent regex."""
+        # Assertions
+        assert collapse_whitespace(text) == re.sub(r"\s+", " ", text)
+    
+    def test_canonicalize_text(self):
+        """Test that whitespace and markdown punctuation are normalized."""
+        # Call the function
+        canonical = canonicalize_text("## Install\n\n  Run `pip install`  **now**")
+        
+        # Assertions
+        assert canonical == "Install Run pip install now"
+        assert canonicalize_text("Caf\u0065\u0301 Menu", lowercase=True) == "caf\u00e9 menu"
+    
+    def test_content_hash_ignores_formatting(self, content_processor):
+        """Test that chunks are keyed on their canonical text."""
+        # Call the method
+        chunks = content_processor.process_readme(SAMPLE_README_MARKDOWN, SAMPLE_REPO)
+        
+        # Assertions
+        assert all(chunk["content_hash"] == content_hash(chunk["content"]) for chunk in chunks)
+        assert content_hash("Some *text*") == content_hash("Some   text")
+        assert content_hash("Some text") != content_hash("Other text")
@@ -0,0 +1,146 @@
+"""
+Tests for the embedding cache.
+"""
+
+import pytest
+import numpy as np
+from unittest.mock import MagicMock
+
+# Import the module to test
+from src.embeddings.embedding_cache import EmbeddingCache, simhash
+
+SAMPLE_TEXT = (
+    "Repository: test-user/test-repo\n\nA fast library for parsing configuration files. "
+    "It supports YAML, TOML and JSON, validates values against a schema, reports helpful "
+    "errors with line numbers, and merges several files into a single configuration object "
+    "that can be overridden from environment variables or the command line."
+)
+
+@pytest.fixture
+def embedding_cache(tmp_path):
+    """Create an embedding cache in a temporary directory."""
+    cache = EmbeddingCache(tmp_path / "cache" / "embeddings.db", fuzzy=False)
+    yield cache
+    cache.close()
+
+def fake_encoder(texts):
+    """Encode each text as a vector of its length."""
+    return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+@pytest.mark.unit
+class TestEmbeddingCache:
+    """Tests for the EmbeddingCache class."""
+
+    def test_encode_only_misses(self, embedding_cache):
+        """Test that only uncached texts are passed to the encoder."""
+        encoder = MagicMock(side_effect=fake_encoder)
+
+        # Call the method
+        first = embedding_cache.encode("model", ["a", "bb"], encoder)
+        second = embedding_cache.encode("model", ["bb", "ccc", "a"], encoder)
+
+        # Assertions
+        assert encoder.call_count == 2
+        assert encoder.call_args_list[1][0][0] == ["ccc"]
+        np.testing.assert_array_equal(first, [[1, 1], [2, 1]])
+        np.testing.assert_array_equal(second, [[2, 1], [3, 1], [1, 1]])
+        assert embedding_cache.get_stats() == {"hits": 2, "fuzzy_hits": 0, "misses": 3, "hit_rate": 0.4}
+
+    def test_encode_keyed_by_model(self, embedding_cache):
+        """Test that vectors are not shared between models."""
+        encoder = MagicMock(side_effect=fake_encoder)
+
+        # Call the method
+        embedding_cache.encode("model-a", ["text"], encoder)
+        embedding_cache.encode("model-b", ["text"], encoder)
+
+        # Assertions
+        assert encoder.call_count == 2
+        assert embedding_cache.hits == 0
+
+    def test_encode_duplicate_texts(self, embedding_cache):
+        """Test that duplicate texts in a batch are encoded once."""
+        encoder = MagicMock(side_effect=fake_encoder)
+
+        # Call the method
+        vectors = embedding_cache.encode("model", ["same", "same"], encoder)
+
+        # Assertions
+        encoder.assert_called_once_with(["same"])
+        assert vectors.shape == (2, 2)
+
+    def test_cache_persists(self, tmp_path):
+        """Test that cached vectors survive reopening the database."""
+        path = tmp_path / "embeddings.db"
+        cache = EmbeddingCache(path)
+        cache.encode("model", ["persisted"], fake_encoder)
+        cache.close()
+
+        # Reopen the cache
+        reopened = EmbeddingCache(path)
+        encoder = MagicMock(side_effect=fake_encoder)
+        vectors = reopened.encode("model", ["persisted"], encoder)
+        reopened.close()
+
+        # Assertions
+        encoder.assert_not_called()
+        np.testing.assert_array_equal(vectors, [[9, 1]])
+
+    def test_encode_canonical_text(self, embedding_cache):
+        """Test that whitespace and markdown formatting changes hit the cache."""
+        encoder = MagicMock(side_effect=fake_encoder)
+
+        # Call the method
+        embedding_cache.encode("model", ["# Title\n\nSome  text"], encoder)
+        embedding_cache.encode("model", ["Title Some **text**"], encoder)
+
+        # Assertions
+        assert encoder.call_count == 1
+        assert embedding_cache.hits == 1
+
+@pytest.mark.unit
+class TestFuzzyEmbeddingCache:
+    """Tests for near-duplicate lookups in the EmbeddingCache class."""
+
+    def test_simhash_near_duplicates(self):
+        """Test that a small edit keeps the fingerprint close."""
+        edited = SAMPLE_TEXT.replace("helpful", "helpfull")
+
+        # Assertions
+        assert bin(simhash(SAMPLE_TEXT) ^ simhash(edited)).count("1") <= 16
+        assert simhash(SAMPLE_TEXT) == simhash(SAMPLE_TEXT.upper())
+
+    def test_encode_reuses_near_duplicate(self, tmp_path):
+        """Test that a near-duplicate text reuses the stored vector."""
+        cache = EmbeddingCache(tmp_path / "embeddings.db", max_distance=3)
+        encoder = MagicMock(side_effect=fake_encoder)
+        cache.encode("model", [SAMPLE_TEXT], encoder)
+
+        # Find a single word edit whose fingerprint is within the distance
+        fingerprint = simhash(SAMPLE_TEXT)
+        words = SAMPLE_TEXT.split(" ")
+        edits = [" ".join(words[:i] + [words[i] + "s"] + words[i + 1:]) for i in range(len(words))]
+        edited = next(edit for edit in edits if bin(simhash(edit) ^ fingerprint).count("1") <= 3)
+
+        # Call the method
+        vectors = cache.encode("model", [edited], encoder)
+        cache.close()
+
+        # Assertions
+        assert encoder.call_count == 1
+        np.testing.assert_array_equal(vectors, [[len(SAMPLE_TEXT), 1]])
+        assert cache.get_stats()["fuzzy_hits"] == 1
+
+    def test_encode_unrelated_text_misses(self, tmp_path):
+        """Test that unrelated texts are encoded."""
+        cache = EmbeddingCache(tmp_path / "embeddings.db")
+        encoder = MagicMock(side_effect=fake_encoder)
+
+        # Call the method
+        cache.encode("model", [SAMPLE_TEXT], encoder)
+        cache.encode("model", ["A command line tool for resizing images in bulk."], encoder)
+        cache.close()
+
+        # Assertions
+        assert encoder.call_count == 2
+        assert cache.fuzzy_hits == 0
@@ -9,7 +9,8 @@ from pathlib import Path
 from unittest.mock import patch, MagicMock, PropertyMock
 
 # Import the module to test
-from src.embeddings.embedding_manager import EmbeddingManager
+from src.embeddings.embedding_manager import EmbeddingManager, QUANTIZED_ONNX_FILE
+from src.processor.content_processor import content_hash
 
 # Sample test data
 SAMPLE_CHUNKS = [
@@ -50,6 +51,11 @@ def mock_storage_manager():
         "description": "A test repository"
     }
     
+    # Look up several repositories through get_repository
+    storage_manager.get_repositories.side_effect = lambda repo_ids: {
+        int(repo_id): storage_manager.get_repository(int(repo_id)) for repo_id in repo_ids if storage_manager.get_repository(int(repo_id))
+    }
+    
     return storage_manager
 
 @pytest.fixture
@@ -82,8 +88,9 @@ def mock_embeddings():
 class TestEmbeddingManagerInit:
     """Test the initialization of the embedding manager."""
     
+    @patch("src.embeddings.embedding_manager.torch.cuda.is_available", return_value=False)
     @patch("src.embeddings.embedding_manager.Embeddings")
-    def test_init_with_config(self, mock_embeddings_class, mock_storage_manager):
+    def test_init_with_config(self, mock_embeddings_class, mock_cuda_available, mock_storage_manager):
         """Test initialization with configuration."""
         # Set up the mock
         mock_embeddings_instance = MagicMock()
@@ -111,11 +118,16 @@ class TestEmbeddingManagerInit:
             "path": "test-model",
             "method": "sentence-transformers",
             "device": "cuda",
-            "content": True
-        })
+            "gpu": True,
+            "backend": "src.embeddings.ann_index.TopKNumPy",
+            "content": True,
+            "encodebatch": 64,
+            "vectors": {"model_kwargs": {"torch_dtype": "float16"}}
+        }, models=EmbeddingManager._MODEL_CACHE)
     
+    @patch("src.embeddings.embedding_manager.torch.cuda.is_available", return_value=False)
     @patch("src.embeddings.embedding_manager.Embeddings")
-    def test_init_with_empty_config(self, mock_embeddings_class, mock_storage_manager):
+    def test_init_with_empty_config(self, mock_embeddings_class, mock_cuda_available, mock_storage_manager):
         """Test initialization with empty configuration."""
         # Set up the mock
         mock_embeddings_instance = MagicMock()
@@ -137,8 +149,11 @@ class TestEmbeddingManagerInit:
             "path": "BAAI/bge-small-en-v1.5",
             "method": "sentence-transformers",
             "device": "cpu",
-            "content": True
-        })
+            "gpu": False,
+            "backend": "src.embeddings.ann_index.TopKNumPy",
+            "content": True,
+            "encodebatch": 32
+        }, models=EmbeddingManager._MODEL_CACHE)
     
     @patch("src.embeddings.embedding_manager.Embeddings")
     def test_init_loads_existing_index(self, mock_embeddings_class, mock_storage_manager):
@@ -155,6 +170,331 @@ class TestEmbeddingManagerInit:
             # Check that the load method was called
             mock_embeddings_instance.load.assert_called_once()
 
+@pytest.mark.unit
+class TestEmbeddingManagerBackend:
+    """Test the inference backend configuration of the embedding manager."""
+    
+    @patch("src.embeddings.embedding_manager.ort", None)
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_onnx_backend_with_quantization(self, mock_embeddings_class, mock_storage_manager):
+        """Test that the quantized ONNX model is requested from sentence-transformers."""
+        config = {
+            "model": "test-model",
+            "backend": "onnx",
+            "quantize": True
+        }
+        manager = EmbeddingManager(config, mock_storage_manager)
+        
+        # Assertions
+        assert manager.backend == "onnx"
+        assert manager.quantize is True
+        
+        args, kwargs = mock_embeddings_class.call_args
+        assert args[0]["vectors"] == {
+            "backend": "onnx",
+            "model_kwargs": {"file_name": "onnx/model_qint8_avx512_vnni.onnx"}
+        }
+    
+    @patch("src.embeddings.embedding_manager.ort", None)
+    @patch.object(EmbeddingManager, "_export_quantized_onnx", return_value="/tmp/embeddings/models/test-model")
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_onnx_backend_quantizes_export(self, mock_embeddings_class, mock_export, mock_storage_manager):
+        """Test that a model without a quantized ONNX file is exported and quantized locally."""
+        # Fail on the first call (missing file), succeed with the local export
+        mock_embeddings_instance = MagicMock()
+        mock_embeddings_class.side_effect = [OSError("file not found"), mock_embeddings_instance]
+        
+        config = {
+            "model": "test-model",
+            "backend": "onnx",
+            "quantize": True
+        }
+        manager = EmbeddingManager(config, mock_storage_manager)
+        
+        # Assertions
+        assert manager.embeddings == mock_embeddings_instance
+        mock_export.assert_called_once()
+        
+        args, kwargs = mock_embeddings_class.call_args
+        assert args[0]["path"] == "/tmp/embeddings/models/test-model"
+        assert args[0]["vectors"]["model_kwargs"]["file_name"] == QUANTIZED_ONNX_FILE
+    
+    @patch("src.embeddings.embedding_manager.ort", None)
+    @patch.object(EmbeddingManager, "_export_quantized_onnx", return_value=None)
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_onnx_backend_falls_back_to_export(self, mock_embeddings_class, mock_export, mock_storage_manager):
+        """Test that a missing ONNX file falls back to exporting the model."""
+        # Fail on the first call (missing file), succeed on the export
+        mock_embeddings_instance = MagicMock()
+        mock_embeddings_class.side_effect = [OSError("file not found"), mock_embeddings_instance]
+        
+        config = {
+            "model": "test-model",
+            "backend": "onnx",
+            "quantize": True
+        }
+        manager = EmbeddingManager(config, mock_storage_manager)
+        
+        # Assertions
+        assert manager.embeddings == mock_embeddings_instance
+        assert manager.model_args == {"backend": "onnx"}
+        
+        args, kwargs = mock_embeddings_class.call_args
+        assert args[0]["vectors"] == {"backend": "onnx"}
+    
+    @patch("sentence_transformers.backend.export_dynamic_quantized_onnx_model")
+    @patch("src.embeddings.embedding_manager.sentence_transformers.SentenceTransformer")
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_export_quantized_onnx(self, mock_embeddings_class, mock_sentence_transformer, mock_export, mock_storage_manager, tmp_path):
+        """Test that the model is exported and quantized once."""
+        mock_storage_manager.get_embeddings_path.return_value = tmp_path
+        manager = EmbeddingManager({"model": "test-user/test-model"}, mock_storage_manager)
+        path = tmp_path / "models" / "test-user--test-model"
+        
+        # Call the method
+        exported = manager._export_quantized_onnx()
+        (path / QUANTIZED_ONNX_FILE).parent.mkdir(parents=True)
+        (path / QUANTIZED_ONNX_FILE).touch()
+        reused = manager._export_quantized_onnx()
+        
+        # Assertions
+        assert exported == reused == str(path)
+        mock_sentence_transformer.assert_called_once_with("test-user/test-model", backend="onnx", device="cpu")
+        mock_export.assert_called_once_with(mock_sentence_transformer.return_value, "avx512_vnni", str(path))
+    
+    @patch("src.embeddings.embedding_manager.ort")
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_onnx_session_options(self, mock_embeddings_class, mock_ort, mock_storage_manager):
+        """Test that ONNX Runtime runs on the configured number of CPU threads."""
+        # Set up the mock
+        EmbeddingManager._SESSION_OPTIONS.clear()
+        
+        config = {
+            "model": "test-model",
+            "device": "cpu",
+            "backend": "onnx",
+            "intra_threads": 6
+        }
+        manager = EmbeddingManager(config, mock_storage_manager)
+        EmbeddingManager(config, mock_storage_manager)
+        
+        # Assertions
+        options = mock_ort.SessionOptions.return_value
+        mock_ort.SessionOptions.assert_called_once()
+        assert options.intra_op_num_threads == 6
+        assert options.inter_op_num_threads == 1
+        assert manager.model_args == {
+            "backend": "onnx",
+            "model_kwargs": {"provider": "CPUExecutionProvider", "session_options": options}
+        }
+        EmbeddingManager._SESSION_OPTIONS.clear()
+
+@pytest.mark.unit
+class TestEmbeddingManagerDevice:
+    """Test selecting the inference device."""
+    
+    @patch("src.embeddings.embedding_manager.torch.cuda.is_bf16_supported", return_value=False)
+    @patch("src.embeddings.embedding_manager.torch.cuda.is_available", return_value=True)
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_auto_device_uses_gpu(self, mock_embeddings_class, mock_cuda_available, mock_bf16_supported, mock_storage_manager):
+        """Test that the GPU and its batch size are used when available."""
+        # Create the embedding manager
+        manager = EmbeddingManager({"device": "auto", "batch_size": 32, "gpu_batch_size": 256}, mock_storage_manager)
+        
+        # Assertions
+        assert manager.device == "cuda"
+        assert manager.batch_size == 256
+        args, kwargs = mock_embeddings_class.call_args
+        assert args[0]["gpu"] is True
+        assert args[0]["encodebatch"] == 256
+    
+    @patch("src.embeddings.embedding_manager.torch.backends.mps.is_available", return_value=True)
+    @patch("src.embeddings.embedding_manager.torch.cuda.is_available", return_value=False)
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_auto_device_uses_mps(self, mock_embeddings_class, mock_cuda_available, mock_mps_available, mock_storage_manager):
+        """Test that an Apple silicon GPU is used in half precision when there is no CUDA device."""
+        # Create the embedding manager
+        manager = EmbeddingManager({"device": "auto", "batch_size": 32, "gpu_batch_size": 256}, mock_storage_manager)
+        
+        # Assertions
+        assert manager.device == "mps"
+        assert manager.precision == "fp16"
+        assert manager.batch_size == 256
+        args, kwargs = mock_embeddings_class.call_args
+        assert args[0]["gpu"] is True
+        assert args[0]["vectors"] == {"model_kwargs": {"torch_dtype": "float16"}}
+    
+    @patch.dict(os.environ, {"PYTORCH_MPS_DISABLE": "1"})
+    @patch("src.embeddings.embedding_manager.torch.backends.mps.is_available", return_value=True)
+    @patch("src.embeddings.embedding_manager.torch.cuda.is_available", return_value=False)
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_auto_device_mps_disabled(self, mock_embeddings_class, mock_cuda_available, mock_mps_available, mock_storage_manager):
+        """Test that the CPU is used when MPS is disabled."""
+        # Create the embedding manager
+        manager = EmbeddingManager({"device": "auto"}, mock_storage_manager)
+        
+        # Assertions
+        assert manager.device == "cpu"
+    
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_cpu_device_disables_gpu(self, mock_embeddings_class, mock_storage_manager):
+        """Test that an explicit CPU device keeps txtai off the GPU."""
+        # Create the embedding manager
+        manager = EmbeddingManager({"device": "cpu", "batch_size": 32, "gpu_batch_size": 256}, mock_storage_manager)
+        
+        # Assertions
+        assert manager.batch_size == 32
+        args, kwargs = mock_embeddings_class.call_args
+        assert args[0]["gpu"] is False
+    
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_device_index(self, mock_embeddings_class, mock_storage_manager):
+        """Test selecting a specific GPU."""
+        # Create the embedding manager
+        EmbeddingManager({"device": "cuda:1"}, mock_storage_manager)
+        
+        # Assertions
+        args, kwargs = mock_embeddings_class.call_args
+        assert args[0]["gpu"] == 1
+
+@pytest.mark.unit
+class TestEmbeddingManagerIndexQuantization:
+    """Test quantizing the vector index."""
+    
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_numpy_index_int8(self, mock_embeddings_class, mock_storage_manager):
+        """Test that the numpy index stores int8 vectors."""
+        # Create the embedding manager
+        EmbeddingManager({"device": "cpu", "index_quantize": True}, mock_storage_manager)
+        
+        # Assertions
+        args, kwargs = mock_embeddings_class.call_args
+        assert args[0]["src.embeddings.ann_index.TopKNumPy"] == {"int8": True, "subvectors": 2}
+        assert "quantize" not in args[0]
+    
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_faiss_index_sq8(self, mock_embeddings_class, mock_storage_manager):
+        """Test that the faiss index uses 8-bit scalar quantization."""
+        # Create the embedding manager
+        EmbeddingManager({"device": "cpu", "index_backend": "faiss", "index_quantize": True}, mock_storage_manager)
+        
+        # Assertions
+        args, kwargs = mock_embeddings_class.call_args
+        assert args[0]["backend"] == "faiss"
+        assert args[0]["faiss"] == {"quantize": 8}
+        assert "quantize" not in args[0]
+
+@pytest.mark.unit
+class TestEmbeddingManagerPrecision:
+    """Test reduced precision inference."""
+    
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_fp16_on_gpu(self, mock_embeddings_class, mock_storage_manager):
+        """Test that FP16 loads the model in half precision on a GPU."""
+        # Create the embedding manager
+        manager = EmbeddingManager({"device": "cuda", "precision": "fp16"}, mock_storage_manager)
+        
+        # Assertions
+        assert manager.precision == "fp16"
+        args, kwargs = mock_embeddings_class.call_args
+        assert args[0]["vectors"] == {"model_kwargs": {"torch_dtype": "float16"}}
+        assert kwargs["models"] is EmbeddingManager._MODEL_CACHE
+    
+    @patch("src.embeddings.embedding_manager.torch.cuda.is_bf16_supported", return_value=True)
+    @patch("src.embeddings.embedding_manager.torch.cuda.is_available", return_value=True)
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_auto_precision(self, mock_embeddings_class, mock_cuda_available, mock_bf16_supported, mock_storage_manager):
+        """Test that automatic precision uses BF16 on a capable GPU and FP32 on the CPU."""
+        # Create the embedding managers
+        gpu_manager = EmbeddingManager({"device": "cuda"}, mock_storage_manager)
+        cpu_manager = EmbeddingManager({"device": "cpu"}, mock_storage_manager)
+        
+        # Assertions
+        assert gpu_manager.precision == "bf16"
+        assert cpu_manager.precision == "fp32"
+        args, kwargs = mock_embeddings_class.call_args_list[0]
+        assert args[0]["vectors"] == {"model_kwargs": {"torch_dtype": "bfloat16"}}
+    
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_fp16_vectors_returned_as_float32(self, mock_embeddings_class, mock_storage_manager):
+        """Test that half precision vectors are converted to float32."""
+        # Set up the mock
+        mock_embeddings_instance = MagicMock()
+        mock_embeddings_instance.model.encode.return_value = np.ones((2, 4), dtype=np.float16)
+        mock_embeddings_class.return_value = mock_embeddings_instance
+        
+        # Create the embedding manager
+        EmbeddingManager({"device": "cuda", "precision": "fp16", "cache_enabled": False}, mock_storage_manager)
+        
+        # Call the method
+        vectors = mock_embeddings_instance.model.encode(["a", "b"], "data")
+        
+        # Assertions
+        assert vectors.dtype == np.float32
+        assert vectors.shape == (2, 4)
+    
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_fp16_on_cpu_falls_back(self, mock_embeddings_class, mock_storage_manager):
+        """Test that FP16 falls back to FP32 on the CPU."""
+        # Create the embedding manager
+        manager = EmbeddingManager({"device": "cpu", "precision": "fp16"}, mock_storage_manager)
+        
+        # Assertions
+        assert manager.precision == "fp32"
+        args, kwargs = mock_embeddings_class.call_args
+        assert "vectors" not in args[0]
+    
+    @patch("src.embeddings.embedding_manager.cpu_supports_bf16", return_value=True)
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_bf16_on_cpu(self, mock_embeddings_class, mock_cpu_bf16, mock_storage_manager):
+        """Test that BF16 loads the model in bfloat16 on a CPU with native BF16."""
+        # Create the embedding manager
+        manager = EmbeddingManager({"device": "cpu", "precision": "bf16"}, mock_storage_manager)
+        
+        # Assertions
+        assert manager.precision == "bf16"
+        args, kwargs = mock_embeddings_class.call_args
+        assert args[0]["vectors"] == {"model_kwargs": {"torch_dtype": "bfloat16"}}
+    
+    @patch("src.embeddings.embedding_manager.cpu_supports_bf16", return_value=False)
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_bf16_on_cpu_falls_back(self, mock_embeddings_class, mock_cpu_bf16, mock_storage_manager):
+        """Test that BF16 falls back to FP32 on a CPU without native BF16."""
+        # Create the embedding manager
+        manager = EmbeddingManager({"device": "cpu", "precision": "bf16"}, mock_storage_manager)
+        
+        # Assertions
+        assert manager.precision == "fp32"
+        args, kwargs = mock_embeddings_class.call_args
+        assert "vectors" not in args[0]
+    
+    @patch("src.embeddings.embedding_manager.torch.ao.quantization.quantize_dynamic")
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_int8_on_cpu(self, mock_embeddings_class, mock_quantize_dynamic, mock_storage_manager):
+        """Test that INT8 dynamically quantizes a private copy of the model on the CPU."""
+        # Set up the mock
+        mock_embeddings_instance = MagicMock()
+        mock_embeddings_class.return_value = mock_embeddings_instance
+        
+        # Create the embedding manager
+        EmbeddingManager({"device": "cpu", "precision": "int8"}, mock_storage_manager)
+        
+        # Assertions
+        args, kwargs = mock_embeddings_class.call_args
+        assert kwargs["models"] is not EmbeddingManager._MODEL_CACHE
+        mock_quantize_dynamic.assert_called_once()
+        assert mock_quantize_dynamic.call_args[0][0] is mock_embeddings_instance.model.model
+    
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_int8_with_onnx_backend(self, mock_embeddings_class, mock_storage_manager):
+        """Test that INT8 selects the quantized ONNX model with the onnx backend."""
+        # Create the embedding manager
+        EmbeddingManager({"device": "cpu", "backend": "onnx", "precision": "int8"}, mock_storage_manager)
+        
+        # Assertions
+        args, kwargs = mock_embeddings_class.call_args
+        assert args[0]["vectors"]["model_kwargs"]["file_name"] == QUANTIZED_ONNX_FILE
+
 @pytest.mark.unit
 class TestGenerateEmbeddings:
     """Test the generate_embeddings method."""
@@ -175,12 +515,13 @@ class TestGenerateEmbeddings:
         # Assertions
         assert result is True
         
-        # Check that the index method was called with the correct arguments
-        mock_embeddings_instance.index.assert_called_once()
-        args, kwargs = mock_embeddings_instance.index.call_args
+        # Check that the documents were upserted in a single call
+        mock_embeddings_instance.upsert.assert_called_once()
+        mock_embeddings_instance.index.assert_not_called()
+        args, kwargs = mock_embeddings_instance.upsert.call_args
         
-        # Check the documents passed to the index method
-        documents = args[0]
+        # Check the documents streamed to the upsert method
+        documents = list(args[0])
         assert len(documents) == 2
         assert documents[0]["id"] == SAMPLE_CHUNKS[0]["id"]
         assert documents[0]["text"] == SAMPLE_CHUNKS[0]["content"]
@@ -189,11 +530,11 @@ class TestGenerateEmbeddings:
         assert documents[0]["chunk_type"] == SAMPLE_CHUNKS[0]["chunk_type"]
         assert documents[0]["section_index"] == SAMPLE_CHUNKS[0]["section_index"]
         
-        # Check that the save method was called
+        # Check that the index is saved before returning
         mock_embeddings_instance.save.assert_called_once()
         
         # Check that the repository was marked as embedded
-        mock_storage_manager.mark_repository_embedded.assert_called_once_with(12345)
+        mock_storage_manager.mark_repositories_embedded.assert_called_once_with([12345])
     
     @patch("src.embeddings.embedding_manager.Embeddings")
     def test_generate_embeddings_no_chunks(self, mock_embeddings_class, mock_storage_manager):
@@ -211,14 +552,15 @@ class TestGenerateEmbeddings:
         # Assertions
         assert result is False
         
-        # Check that the index method was not called
+        # Check that nothing was embedded
         mock_embeddings_instance.index.assert_not_called()
+        mock_embeddings_instance.upsert.assert_not_called()
         
         # Check that the save method was not called
         mock_embeddings_instance.save.assert_not_called()
         
         # Check that the repository was not marked as embedded
-        mock_storage_manager.mark_repository_embedded.assert_not_called()
+        mock_storage_manager.mark_repositories_embedded.assert_not_called()
     
     @patch("src.embeddings.embedding_manager.Embeddings")
     def test_generate_embeddings_already_embedded(self, mock_embeddings_class, mock_storage_manager):
@@ -239,14 +581,15 @@ class TestGenerateEmbeddings:
         # Assertions
         assert result is True
         
-        # Check that the index method was not called
+        # Check that nothing was embedded
         mock_embeddings_instance.index.assert_not_called()
+        mock_embeddings_instance.upsert.assert_not_called()
         
         # Check that the save method was not called
         mock_embeddings_instance.save.assert_not_called()
         
         # Check that the repository was not marked as embedded
-        mock_storage_manager.mark_repository_embedded.assert_not_called()
+        mock_storage_manager.mark_repositories_embedded.assert_not_called()
     
     @patch("src.embeddings.embedding_manager.Embeddings")
     def test_generate_embeddings_cache_disabled(self, mock_embeddings_class, mock_storage_manager):
@@ -268,14 +611,250 @@ class TestGenerateEmbeddings:
         # Assertions
         assert result is True
         
-        # Check that the index method was called even though the repository has embeddings
-        mock_embeddings_instance.index.assert_called_once()
+        # Check that the documents were upserted even though the repository has embeddings
+        mock_embeddings_instance.upsert.assert_called_once()
         
-        # Check that the save method was called
+        # Check that the index is saved before returning
         mock_embeddings_instance.save.assert_called_once()
         
         # Check that the repository was marked as embedded
-        mock_storage_manager.mark_repository_embedded.assert_called_once_with(12345)
+        mock_storage_manager.mark_repositories_embedded.assert_called_once_with([12345])
+
+@pytest.mark.unit
+class TestGenerateEmbeddingsBatch:
+    """Test the generate_embeddings_batch method."""
+    
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_generate_embeddings_batch(self, mock_embeddings_class, mock_storage_manager):
+        """Test embedding the chunks of several repositories in one pass."""
+        # Set up the mock
+        mock_embeddings_instance = MagicMock()
+        mock_embeddings_class.return_value = mock_embeddings_instance
+        
+        other_chunks = [dict(chunk, id=f"67890-{i}", repo_id=67890) for i, chunk in enumerate(SAMPLE_CHUNKS)]
+        
+        # Create the embedding manager
+        manager = EmbeddingManager({}, mock_storage_manager)
+        mock_embeddings_instance.save.reset_mock()
+        
+        # Call the method
+        results = manager.generate_embeddings_batch({12345: SAMPLE_CHUNKS, 67890: other_chunks, 11111: []})
+        
+        # Assertions
+        assert results == {12345: True, 67890: True, 11111: False}
+        
+        # All documents are upserted together and saved once on flush
+        mock_embeddings_instance.upsert.assert_called_once()
+        documents = mock_embeddings_instance.upsert.call_args[0][0]
+        assert [document["id"] for document in documents] == ["12345-0", "12345-1", "67890-0", "67890-1"]
+        mock_storage_manager.mark_repositories_embedded.assert_not_called()
+        manager.flush()
+        manager.flush()
+        mock_embeddings_instance.save.assert_called_once()
+        
+        mock_storage_manager.mark_repositories_embedded.assert_called_once_with([12345, 67890])
+    
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_generate_embeddings_batch_skips_unchanged(self, mock_embeddings_class, mock_storage_manager):
+        """Test that chunks indexed with the same text are not upserted again."""
+        # Set up the mock with the first chunk already indexed
+        mock_embeddings_instance = MagicMock()
+        mock_embeddings_instance.search.return_value = [
+            {"id": "12345-0", "content_hash": content_hash(SAMPLE_CHUNKS[0]["content"])},
+            {"id": "12345-1", "content_hash": "outdated"}
+        ]
+        mock_embeddings_class.return_value = mock_embeddings_instance
+        
+        # Create the embedding manager
+        manager = EmbeddingManager({}, mock_storage_manager)
+        
+        # Call the method
+        results = manager.generate_embeddings_batch({12345: SAMPLE_CHUNKS})
+        
+        # Assertions
+        assert results == {12345: True}
+        query = mock_embeddings_instance.search.call_args[0][0]
+        assert query == "select id, content_hash from txtai where repo_id in (12345)"
+        documents = mock_embeddings_instance.upsert.call_args[0][0]
+        assert [document["id"] for document in documents] == ["12345-1"]
+        manager.flush()
+        mock_storage_manager.mark_repositories_embedded.assert_called_once_with([12345])
+    
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_generate_embeddings_batch_removes_stale_chunks(self, mock_embeddings_class, mock_storage_manager):
+        """Test that chunks of a repository re-embedded with fewer chunks are deleted."""
+        # Set up the mock with a third chunk from an earlier, longer README
+        mock_embeddings_instance = MagicMock()
+        mock_embeddings_instance.search.return_value = [
+            {"id": chunk["id"], "content_hash": content_hash(chunk["content"])} for chunk in SAMPLE_CHUNKS
+        ] + [{"id": "12345-2", "content_hash": "removed"}]
+        mock_embeddings_class.return_value = mock_embeddings_instance
+        
+        # Create the embedding manager
+        manager = EmbeddingManager({}, mock_storage_manager)
+        mock_embeddings_instance.save.reset_mock()
+        
+        # Call the method
+        results = manager.generate_embeddings_batch({12345: SAMPLE_CHUNKS})
+        manager.flush()
+        
+        # Assertions
+        assert results == {12345: True}
+        mock_embeddings_instance.delete.assert_called_once_with(["12345-2"])
+        mock_embeddings_instance.upsert.assert_not_called()
+        mock_embeddings_instance.save.assert_called_once()
+    
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_generate_embeddings_batch_all_unchanged(self, mock_embeddings_class, mock_storage_manager):
+        """Test that a repository with no changed chunks is marked embedded without upserting."""
+        # Set up the mock with every chunk already indexed
+        mock_embeddings_instance = MagicMock()
+        mock_embeddings_instance.search.return_value = [
+            {"id": chunk["id"], "content_hash": content_hash(chunk["content"])} for chunk in SAMPLE_CHUNKS
+        ]
+        mock_embeddings_class.return_value = mock_embeddings_instance
+        
+        # Create the embedding manager
+        manager = EmbeddingManager({}, mock_storage_manager)
+        mock_embeddings_instance.save.reset_mock()
+        
+        # Call the method
+        results = manager.generate_embeddings_batch({12345: SAMPLE_CHUNKS})
+        
+        # Assertions
+        assert results == {12345: True}
+        mock_embeddings_instance.upsert.assert_not_called()
+        manager.flush()
+        mock_embeddings_instance.save.assert_not_called()
+        mock_storage_manager.mark_repositories_embedded.assert_called_once_with([12345])
+    
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_generate_embeddings_batch_error(self, mock_embeddings_class, mock_storage_manager):
+        """Test that indexing errors are reported for every pending repository."""
+        # Set up the mock to fail on upsert
+        mock_embeddings_instance = MagicMock()
+        mock_embeddings_instance.upsert.side_effect = Exception("Test error")
+        mock_embeddings_class.return_value = mock_embeddings_instance
+        
+        # Create the embedding manager
+        manager = EmbeddingManager({}, mock_storage_manager)
+        
+        # Call the method
+        results = manager.generate_embeddings_batch({12345: SAMPLE_CHUNKS})
+        
+        # Assertions
+        assert results == {12345: False}
+        mock_storage_manager.mark_repositories_embedded.assert_not_called()
+    
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_generate_embeddings_batch_save_error(self, mock_embeddings_class, mock_storage_manager):
+        """Test that repositories are only marked embedded once the index is saved."""
+        # Set up the mock to fail on the first save
+        mock_embeddings_instance = MagicMock()
+        mock_embeddings_instance.save.side_effect = [Exception("Test error"), None]
+        mock_embeddings_class.return_value = mock_embeddings_instance
+        
+        # Create the embedding manager
+        manager = EmbeddingManager({}, mock_storage_manager)
+        manager.generate_embeddings_batch({12345: SAMPLE_CHUNKS})
+        
+        # Call the method
+        failed = manager.flush()
+        marked_after_failure = mock_storage_manager.mark_repositories_embedded.called
+        saved = manager.flush()
+        
+        # Assertions
+        assert failed is False
+        assert marked_after_failure is False
+        assert saved is True
+        mock_storage_manager.mark_repositories_embedded.assert_called_once_with([12345])
+
+@pytest.mark.unit
+class TestEmbeddingCacheIntegration:
+    """Test routing document encoding through the embedding cache."""
+    
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_document_encoding_is_cached(self, mock_embeddings_class, mock_storage_manager, tmp_path):
+        """Test that repeated chunks are only encoded once."""
+        # Set up the mock
+        mock_storage_manager.get_embeddings_path.return_value = tmp_path
+        mock_embeddings_instance = MagicMock()
+        encode = MagicMock(side_effect=lambda data, category: np.ones((len(data), 4), dtype=np.float32))
+        mock_embeddings_instance.model.encode = encode
+        mock_embeddings_class.return_value = mock_embeddings_instance
+        
+        # Create the embedding manager
+        manager = EmbeddingManager({}, mock_storage_manager)
+        
+        # Call the wrapped encoder as txtai would while indexing
+        model = mock_embeddings_instance.model
+        model.encode(["first", "second"], "data")
+        vectors = model.encode(["second", "third"], "data")
+        model.encode(["query"], "query")
+        
+        # Assertions
+        assert vectors.shape == (2, 4)
+        assert encode.call_args_list[1][0] == (["third"], "data")
+        assert encode.call_args_list[2][0] == (["query"], "query")
+        assert manager.get_cache_stats() == {"hits": 1, "fuzzy_hits": 0, "misses": 3, "hit_rate": 0.25}
+        assert (tmp_path / "cache" / "embeddings.db").exists()
+    
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_cache_is_not_shared_across_onnx_files(self, mock_embeddings_class, mock_storage_manager, tmp_path):
+        """Test that chunks cached for one ONNX model file are encoded again for another."""
+        # Set up the mock
+        mock_storage_manager.get_embeddings_path.return_value = tmp_path
+        mock_embeddings_instance = MagicMock()
+        encode = MagicMock(side_effect=lambda data, category: np.ones((len(data), 4), dtype=np.float32))
+        mock_embeddings_instance.model.encode = encode
+        mock_embeddings_class.return_value = mock_embeddings_instance
+        
+        # Call the method
+        EmbeddingManager({"backend": "onnx", "onnx_file": "onnx/model.onnx"}, mock_storage_manager)
+        mock_embeddings_instance.model.encode(["chunk"], "data")
+        mock_embeddings_instance.model.encode = encode
+        EmbeddingManager({"backend": "onnx", "onnx_file": "onnx/model_O4.onnx"}, mock_storage_manager)
+        mock_embeddings_instance.model.encode(["chunk"], "data")
+        
+        # Assertions
+        assert encode.call_count == 2
+    
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_cache_disabled(self, mock_embeddings_class, mock_storage_manager):
+        """Test that the encoder is left alone when caching is disabled."""
+        # Set up the mock
+        mock_embeddings_instance = MagicMock()
+        encode = MagicMock()
+        mock_embeddings_instance.model.encode = encode
+        mock_embeddings_class.return_value = mock_embeddings_instance
+        
+        # Create the embedding manager
+        manager = EmbeddingManager({"cache_enabled": False, "query_cache_size": 0}, mock_storage_manager)
+        
+        # Assertions
+        assert manager.embedding_cache is None
+        assert mock_embeddings_instance.model.encode is encode
+    
+    @patch("src.embeddings.embedding_manager.Embeddings")
+    def test_query_encoding_is_cached(self, mock_embeddings_class, mock_storage_manager):
+        """Test that repeated queries are only encoded once."""
+        # Set up the mock
+        mock_embeddings_instance = MagicMock()
+        encode = MagicMock(side_effect=lambda data, category: np.ones((len(data), 4), dtype=np.float32))
+        mock_embeddings_instance.model.encode = encode
+        mock_embeddings_class.return_value = mock_embeddings_instance
+        
+        # Create the embedding manager
+        EmbeddingManager({"cache_enabled": False}, mock_storage_manager)
+        
+        # Call the wrapped encoder as txtai would while searching
+        model = mock_embeddings_instance.model
+        model.encode(["machine learning"], "query")
+        vectors = model.encode(["machine  learning ", "python"], "query")
+        
+        # Assertions
+        assert vectors.shape == (2, 4)
+        assert [call[0] for call in encode.call_args_list] == [(["machine learning"], "query"), (["python"], "query")]
 
 @pytest.mark.unit
 class TestSearch:
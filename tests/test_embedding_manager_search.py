@@ -29,6 +29,11 @@ def mock_storage_manager():
         "description": "A test repository"
     }
     
+    # Look up several repositories through get_repository
+    mock.get_repositories.side_effect = lambda repo_ids: {
+        int(repo_id): mock.get_repository(int(repo_id)) for repo_id in repo_ids if mock.get_repository(int(repo_id))
+    }
+    
     return mock
 
 @pytest.fixture
@@ -53,6 +58,7 @@ class TestEmbeddingManagerSearch:
         """Test searching when no index exists."""
         # Set up the mock
         mock_embeddings = MagicMock()
+        mock_embeddings.count.return_value = 0
         mock_embeddings_class.return_value = mock_embeddings
         
         # Set up the storage manager to return a path that doesn't exist
@@ -71,8 +77,10 @@ class TestEmbeddingManagerSearch:
         
         # Assertions
         assert results == []
-        mock_embeddings.index.assert_called_once()
-        mock_embeddings.save.assert_called_once()
+        # Verify that no empty index was built or saved
+        mock_embeddings.search.assert_not_called()
+        mock_embeddings.index.assert_not_called()
+        mock_embeddings.save.assert_not_called()
     
     @patch("src.embeddings.embedding_manager.Embeddings")
     def test_search_with_results(self, mock_embeddings_class, mock_storage_manager, clean_test_data):
@@ -214,11 +222,14 @@ class TestEmbeddingManagerSearch:
         
         # Assertions
         assert results == []
-        # Verify that index was recreated
-        mock_embeddings.index.assert_called_once_with([])
-        mock_embeddings.save.assert_called_once()
+        # Verify that the empty replacement index was neither built nor saved
+        mock_embeddings.index.assert_not_called()
+        mock_embeddings.save.assert_not_called()
         # Verify that embeddings class was instantiated twice (once in init, once in error handling)
         assert mock_embeddings_class.call_count == 2
+        # Verify that the corrupted index was moved to the backup directory
+        assert not index_path.exists()
+        assert (embeddings_path / "backup" / "index.12345").exists()
     
     @patch("src.embeddings.embedding_manager.Embeddings")
     @patch("src.embeddings.embedding_manager.time")
@@ -249,9 +260,9 @@ class TestEmbeddingManagerSearch:
         
         # Assertions
         assert results == []
-        # Verify that index was recreated
-        mock_embeddings.index.assert_called_once_with([])
-        mock_embeddings.save.assert_called_once()
+        # Verify that the empty replacement index was neither built nor saved
+        mock_embeddings.index.assert_not_called()
+        mock_embeddings.save.assert_not_called()
         # Verify that embeddings class was instantiated twice (once in init, once in error handling)
         assert mock_embeddings_class.call_count == 2
     
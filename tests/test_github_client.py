@@ -3,12 +3,14 @@ Tests for the GitHub API client.
 """
 
 import os
+import json
+import time
+import asyncio
 import pytest
-from unittest.mock import patch, MagicMock
-from github import GithubException
+from unittest.mock import patch, MagicMock, AsyncMock
 
 # Import the module to test
-from src.api.github_client import GitHubClient
+from src.api.github_client import GitHubAPIError, GitHubClient, MAX_RATE_LIMIT_WAIT, README_NOT_MODIFIED, RAW_MEDIA_TYPE, decode_content, detect_language, language_sample, DETECT_TEXT_LENGTH
 
 # Sample test data
 SAMPLE_REPO = {
@@ -40,6 +42,28 @@ SAMPLE_REPO = {
 
 SAMPLE_README = "# Test Repository\n\nThis is a test repository for unit tests."
 
+FRENCH_README = "# Dépôt de test\n\nCeci est un dépôt de test pour les tests unitaires."
+
+class MockResponse:
+    """Minimal aiohttp response usable as an async context manager."""
+    
+    def __init__(self, status, data=None, headers=None):
+        self.status = status
+        self.data = data
+        self.headers = headers or {}
+    
+    async def json(self, loads=None):
+        return self.data
+    
+    async def read(self):
+        return self.data
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *args):
+        return False
+
 @pytest.fixture
 def mock_env_api_key(monkeypatch):
     """Set up a mock environment variable for the GitHub API key."""
@@ -73,233 +97,503 @@ class TestGitHubClientInit:
         assert client.max_retries == 3  # Default value
         assert client.timeout == 30  # Default value
         assert client.api_key == "test_api_key"
+    
+    def test_init_session_retries(self, mock_env_api_key):
+        """Test that the REST session retries rate limits and server errors."""
+        client = GitHubClient({"max_retries": 2})
+        
+        retry = client.session.get_adapter("https://api.github.com/graphql").max_retries
+        assert retry.total == 2
+        assert 429 in retry.status_forcelist
+        assert "POST" in retry.allowed_methods
+
+@pytest.mark.unit
+class TestRateLimit:
+    """Test waiting for the rate limit to reset before it runs out."""
+    
+    @patch("src.api.github_client.time.sleep")
+    def test_wait_for_rate_limit(self, mock_sleep, github_client):
+        """Test that the session hook sleeps until the reset once few requests remain."""
+        response = raw_response(200)
+        response.headers = {"X-RateLimit-Remaining": "10", "X-RateLimit-Reset": str(time.time() + 30)}
+        
+        # Call the method
+        github_client._wait_for_rate_limit(response)
+        
+        # Assertions
+        assert github_client._wait_for_rate_limit in github_client.session.hooks["response"]
+        mock_sleep.assert_called_once()
+        assert 29 < mock_sleep.call_args[0][0] <= 31
+    
+    @patch("src.api.github_client.time.sleep")
+    def test_wait_for_rate_limit_remaining(self, mock_sleep, github_client):
+        """Test that requests aren't delayed while plenty of the rate limit remains."""
+        response = raw_response(200)
+        response.headers = {"X-RateLimit-Remaining": "4000", "X-RateLimit-Reset": str(time.time() + 30)}
+        
+        # Call the method
+        github_client._wait_for_rate_limit(response)
+        
+        # Assertions
+        mock_sleep.assert_not_called()
+    
+    @patch("src.api.github_client.time.sleep")
+    def test_wait_for_rate_limit_capped(self, mock_sleep, github_client):
+        """Test that the wait for a reset far away is capped."""
+        response = raw_response(200)
+        response.headers = {"X-RateLimit-Remaining": "10", "X-RateLimit-Reset": str(time.time() + 3600)}
+        
+        # Call the method
+        github_client._wait_for_rate_limit(response)
+        
+        # Assertions
+        mock_sleep.assert_called_once_with(MAX_RATE_LIMIT_WAIT)
+    
+    @patch("src.api.github_client.time.sleep")
+    def test_wait_for_rate_limit_malformed_headers(self, mock_sleep, github_client):
+        """Test that malformed rate limit headers don't fail the request."""
+        response = raw_response(200)
+        response.headers = {"X-RateLimit-Remaining": "many", "X-RateLimit-Reset": "soon"}
+        
+        # Call the method
+        github_client._wait_for_rate_limit(response)
+        response.headers = {"Retry-After": "later"}
+        delay = github_client._rate_limit_delay(response)
+        
+        # Assertions
+        mock_sleep.assert_not_called()
+        assert delay is None
+    
+    @patch("src.api.github_client.asyncio.sleep", new_callable=AsyncMock)
+    @patch("src.api.github_client.detect_language")
+    def test_get_readme_async_waits_for_rate_limit(self, mock_detect, mock_sleep, github_client):
+        """Test that concurrent fetching pauses once few requests remain."""
+        # Mock language detection to return English
+        mock_detect.return_value = "en"
+        
+        session = MagicMock()
+        session.get.return_value = MockResponse(200, SAMPLE_README.encode("utf-8"), headers={
+            "X-RateLimit-Remaining": "10", "X-RateLimit-Reset": str(time.time() + 30)
+        })
+        
+        # Call the method
+        readme = asyncio.run(github_client.get_readme_async(session, "test-user/test-repo"))
+        
+        # Assertions
+        assert readme == SAMPLE_README
+        mock_sleep.assert_awaited_once()
+
+@pytest.mark.unit
+class TestDecodeContent:
+    """Test the decode_content function."""
+    
+    def test_decode_content(self):
+        """Test decoding raw content."""
+        # Call the function
+        content = decode_content(FRENCH_README.encode("utf-8"), 500000)
+        
+        # Assertions
+        assert content == FRENCH_README
+    
+    def test_decode_content_max_size(self):
+        """Test that content is cut at the maximum size without failing on a split character."""
+        # Call the function
+        content = decode_content(("é" * 200).encode("utf-8"), 99)
+        
+        # Assertions
+        assert content == "é" * 49 + "\ufffd"
+
+@pytest.mark.unit
+class TestLanguageSample:
+    """Test the language_sample function."""
+    
+    def test_language_sample_strips_code(self):
+        """Test that fenced code blocks, including one left open, are removed."""
+        readme = FRENCH_README + "\n\n```python\nprint('hello world')\n```\n\nFin.\n\n```bash\npip install"
+        
+        # Call the function
+        sample = language_sample(readme)
+        
+        # Assertions
+        assert "print" not in sample
+        assert "pip" not in sample
+        assert sample.startswith(FRENCH_README)
+        assert "Fin." in sample
+    
+    def test_language_sample_length(self):
+        """Test that the sample is cut to the detection length."""
+        # Call the function
+        sample = language_sample("a" * 100000)
+        
+        # Assertions
+        assert len(sample) == DETECT_TEXT_LENGTH
+
+def graphql_response(nodes, has_next_page=False, end_cursor=None, total_count=None):
+    """Create a mock GraphQL response for a page of starred repositories."""
+    response = MagicMock()
+    response.status_code = 200
+    response.content = json.dumps({"data": {"viewer": {"starredRepositories": {
+        "totalCount": len(nodes) if total_count is None else total_count,
+        "pageInfo": {"endCursor": end_cursor, "hasNextPage": has_next_page},
+        "nodes": nodes
+    }}}}).encode("utf-8")
+    return response
+
+def repository_node(repo_id, name, readme=None):
+    """Create a GraphQL repository node."""
+    return {
+        "databaseId": repo_id,
+        "name": name,
+        "nameWithOwner": f"test-user/{name}",
+        "description": f"Repository {name}",
+        "url": f"https://github.com/test-user/{name}",
+        "primaryLanguage": None,
+        "stargazerCount": 1,
+        "forkCount": 0,
+        "issues": {"totalCount": 0},
+        "pullRequests": {"totalCount": 0},
+        "repositoryTopics": {"nodes": []},
+        "createdAt": None,
+        "updatedAt": None,
+        "pushedAt": None,
+        "diskUsage": 10,
+        "defaultBranchRef": None,
+        "licenseInfo": None,
+        "owner": {"login": "test-user", "databaseId": 54321, "avatarUrl": None, "url": None},
+        "readme": {"text": readme} if readme else None
+    }
 
 @pytest.mark.unit
-@patch("src.api.github_client.Github")
 class TestGetStarredRepositories:
     """Test the get_starred_repositories method."""
     
-    def test_get_starred_repositories(self, mock_github, github_client):
-        """Test getting starred repositories."""
-        # Set up mock
-        mock_user = MagicMock()
-        mock_repo = MagicMock()
-        mock_repo.id = SAMPLE_REPO["id"]
-        mock_repo.name = SAMPLE_REPO["name"]
-        mock_repo.full_name = SAMPLE_REPO["full_name"]
-        mock_repo.description = SAMPLE_REPO["description"]
-        mock_repo.html_url = SAMPLE_REPO["html_url"]
-        mock_repo.clone_url = SAMPLE_REPO["clone_url"]
-        mock_repo.language = SAMPLE_REPO["language"]
-        mock_repo.stargazers_count = SAMPLE_REPO["stargazers_count"]
-        mock_repo.watchers_count = SAMPLE_REPO["watchers_count"]
-        mock_repo.forks_count = SAMPLE_REPO["forks_count"]
-        mock_repo.open_issues_count = SAMPLE_REPO["open_issues_count"]
-        mock_repo.topics = SAMPLE_REPO["topics"]
-        # Convert string dates to datetime objects for the mock
-        from datetime import datetime
-        mock_repo.created_at = datetime.fromisoformat(SAMPLE_REPO["created_at"].replace("Z", "+00:00"))
-        mock_repo.updated_at = datetime.fromisoformat(SAMPLE_REPO["updated_at"].replace("Z", "+00:00"))
-        mock_repo.pushed_at = datetime.fromisoformat(SAMPLE_REPO["pushed_at"].replace("Z", "+00:00"))
-        mock_repo.size = SAMPLE_REPO["size"]
-        mock_repo.default_branch = SAMPLE_REPO["default_branch"]
-        mock_repo.license = MagicMock()
-        mock_repo.license.key = SAMPLE_REPO["license"]["key"]
-        mock_repo.owner = MagicMock()
-        mock_repo.owner.login = SAMPLE_REPO["owner"]["login"]
-        mock_repo.owner.id = SAMPLE_REPO["owner"]["id"]
-        mock_repo.owner.avatar_url = SAMPLE_REPO["owner"]["avatar_url"]
-        mock_repo.owner.html_url = SAMPLE_REPO["owner"]["html_url"]
-        
-        mock_starred = MagicMock()
-        mock_starred.totalCount = 1
-        mock_starred.__iter__.return_value = [mock_repo]
-        
-        mock_user.get_starred.return_value = mock_starred
-        mock_github.return_value.get_user.return_value = mock_user
-        
-        # Patch the github attribute to avoid authentication issues
-        with patch.object(github_client, 'github', mock_github.return_value):
+    def test_get_starred_repositories(self, github_client):
+        """Test getting starred repositories and their READMEs from the GraphQL API."""
+        # Set up the GraphQL node for the sample repository
+        node = {
+            "databaseId": SAMPLE_REPO["id"],
+            "name": SAMPLE_REPO["name"],
+            "nameWithOwner": SAMPLE_REPO["full_name"],
+            "description": SAMPLE_REPO["description"],
+            "url": SAMPLE_REPO["html_url"],
+            "primaryLanguage": {"name": SAMPLE_REPO["language"]},
+            "stargazerCount": SAMPLE_REPO["stargazers_count"],
+            "forkCount": SAMPLE_REPO["forks_count"],
+            "issues": {"totalCount": 3},
+            "pullRequests": {"totalCount": 2},
+            "repositoryTopics": {"nodes": [{"topic": {"name": topic}} for topic in SAMPLE_REPO["topics"]]},
+            "createdAt": SAMPLE_REPO["created_at"],
+            "updatedAt": SAMPLE_REPO["updated_at"],
+            "pushedAt": SAMPLE_REPO["pushed_at"],
+            "diskUsage": SAMPLE_REPO["size"],
+            "defaultBranchRef": {"name": SAMPLE_REPO["default_branch"]},
+            "licenseInfo": {"key": SAMPLE_REPO["license"]["key"]},
+            "owner": {
+                "login": SAMPLE_REPO["owner"]["login"],
+                "databaseId": SAMPLE_REPO["owner"]["id"],
+                "avatarUrl": SAMPLE_REPO["owner"]["avatar_url"],
+                "url": SAMPLE_REPO["owner"]["html_url"]
+            },
+            "readme": {"text": SAMPLE_README}
+        }
+        
+        with patch.object(github_client.session, "post", return_value=graphql_response([node])) as mock_post:
+            # Call the method
+            repos = github_client.get_starred_repositories()
+        
+        # Assertions
+        mock_post.assert_called_once()
+        assert repos == [{
+            **SAMPLE_REPO,
+            "watchers_count": SAMPLE_REPO["stargazers_count"],
+            "license": SAMPLE_REPO["license"]["key"],
+            "created_at": "2022-01-01T00:00:00+00:00",
+            "updated_at": "2022-01-02T00:00:00+00:00",
+            "pushed_at": "2022-01-03T00:00:00+00:00"
+        }]
+        assert github_client.readmes == {SAMPLE_REPO["full_name"]: SAMPLE_README}
+    
+    def test_get_starred_repositories_pages(self, github_client):
+        """Test that pages are requested with the cursor of the previous page."""
+        responses = [
+            graphql_response([repository_node(1, "repo1")], has_next_page=True, end_cursor="cursor1", total_count=2),
+            graphql_response([repository_node(2, "repo2")], total_count=2)
+        ]
+        
+        with patch.object(github_client.session, "post", side_effect=responses) as mock_post:
             # Call the method
             repos = github_client.get_starred_repositories()
-            
-            # Assertions
-            assert len(repos) == 1
-            assert repos[0]["id"] == SAMPLE_REPO["id"]
-            assert repos[0]["name"] == SAMPLE_REPO["name"]
-            assert repos[0]["full_name"] == SAMPLE_REPO["full_name"]
-            assert repos[0]["description"] == SAMPLE_REPO["description"]
-            assert repos[0]["language"] == SAMPLE_REPO["language"]
-            assert repos[0]["stargazers_count"] == SAMPLE_REPO["stargazers_count"]
-    
-    def test_get_starred_repositories_with_limit(self, mock_github, github_client):
+        
+        # Assertions
+        assert [repo["id"] for repo in repos] == [1, 2]
+        assert mock_post.call_args_list[0].kwargs["json"]["variables"] == {"first": 10, "after": None}
+        assert mock_post.call_args_list[1].kwargs["json"]["variables"] == {"first": 10, "after": "cursor1"}
+    
+    def test_get_starred_repositories_with_limit(self, github_client):
         """Test getting starred repositories with a limit."""
-        # Set up mock
-        mock_user = MagicMock()
-        mock_repo1 = MagicMock()
-        mock_repo1.id = 1
-        mock_repo1.name = "repo1"
-        mock_repo1.full_name = "user/repo1"
-        mock_repo1.description = "Repository 1"
-        mock_repo1.created_at = None
-        mock_repo1.updated_at = None
-        mock_repo1.pushed_at = None
-        mock_repo1.license = None
-        mock_repo1.owner = MagicMock()
-        
-        mock_repo2 = MagicMock()
-        mock_repo2.id = 2
-        mock_repo2.name = "repo2"
-        mock_repo2.full_name = "user/repo2"
-        mock_repo2.description = "Repository 2"
-        mock_repo2.created_at = None
-        mock_repo2.updated_at = None
-        mock_repo2.pushed_at = None
-        mock_repo2.license = None
-        mock_repo2.owner = MagicMock()
-        
-        mock_starred = MagicMock()
-        mock_starred.totalCount = 2
-        mock_starred.__iter__.return_value = [mock_repo1, mock_repo2]
-        
-        mock_user.get_starred.return_value = mock_starred
-        mock_github.return_value.get_user.return_value = mock_user
-        
-        # Patch the github attribute to avoid authentication issues
-        with patch.object(github_client, 'github', mock_github.return_value):
+        response = graphql_response([repository_node(1, "repo1")], has_next_page=True, end_cursor="cursor1", total_count=2)
+        
+        with patch.object(github_client.session, "post", return_value=response) as mock_post:
             # Call the method with limit=1
             repos = github_client.get_starred_repositories(limit=1)
-            
-            # Assertions
-            assert len(repos) == 1
-            assert repos[0]["id"] == 1
-            assert repos[0]["name"] == "repo1"
+        
+        # Assertions
+        assert len(repos) == 1
+        assert repos[0]["id"] == 1
+        assert repos[0]["name"] == "repo1"
+        mock_post.assert_called_once()
+        assert mock_post.call_args.kwargs["json"]["variables"]["first"] == 1
     
-    def test_get_starred_repositories_error(self, mock_github, github_client):
+    def test_get_starred_repositories_error(self, github_client):
         """Test error handling when getting starred repositories."""
-        # Set up mock to raise an exception
-        mock_user = MagicMock()
-        mock_user.get_starred.side_effect = GithubException(status=500, data={"message": "API error"})
-        mock_github.return_value.get_user.return_value = mock_user
+        # Set up the response to return a GraphQL error
+        response = MagicMock()
+        response.status_code = 200
+        response.content = b'{"errors": [{"message": "API error"}]}'
         
-        # Patch the github attribute to avoid authentication issues
-        with patch.object(github_client, 'github', mock_github.return_value):
+        with patch.object(github_client.session, "post", return_value=response):
             # Call the method and check for exception
-            with pytest.raises(GithubException):
+            with pytest.raises(GitHubAPIError):
                 github_client.get_starred_repositories()
 
+def raw_response(status_code, content=b""):
+    """Create a mock requests response with raw content."""
+    response = MagicMock()
+    response.status_code = status_code
+    response.content = content
+    return response
+
 @pytest.mark.unit
-@patch("src.api.github_client.Github")
 class TestGetReadme:
     """Test the get_readme method."""
     
-    @patch("src.api.github_client.detect")
-    def test_get_readme(self, mock_detect, mock_github, github_client):
-        """Test getting a repository README."""
-        # Set up mock
-        mock_repo = MagicMock()
-        mock_readme = MagicMock()
-        mock_readme.content = "IyBUZXN0IFJlcG9zaXRvcnkKClRoaXMgaXMgYSB0ZXN0IHJlcG9zaXRvcnkgZm9yIHVuaXQgdGVzdHMu"  # Base64 encoded
-        
-        mock_repo.get_readme.return_value = mock_readme
-        mock_github.return_value.get_repo.return_value = mock_repo
-        
+    @patch("src.api.github_client.detect_language")
+    def test_get_readme(self, mock_detect, github_client):
+        """Test getting a repository README as raw content."""
         # Mock language detection to return English
         mock_detect.return_value = "en"
         
-        # Patch the github attribute to avoid authentication issues
-        with patch.object(github_client, 'github', mock_github.return_value):
+        with patch.object(github_client.session, "get", return_value=raw_response(200, SAMPLE_README.encode("utf-8"))) as mock_get:
             # Call the method
             readme = github_client.get_readme("test-user/test-repo")
-            
-            # Assertions
-            assert readme == SAMPLE_README
+        
+        # Assertions
+        assert readme == SAMPLE_README
+        mock_get.assert_called_once_with(
+            "https://api.github.com/repos/test-user/test-repo/readme",
+            headers={"Accept": RAW_MEDIA_TYPE}, timeout=github_client.timeout
+        )
     
-    def test_get_readme_not_found(self, mock_github, github_client):
+    def test_get_readme_not_found(self, github_client):
         """Test getting a README that doesn't exist."""
-        # Set up mock to raise a 404 exception
-        mock_github.return_value.get_repo.return_value.get_readme.side_effect = GithubException(
-            status=404, data={"message": "Not Found"}
-        )
-        
-        # Patch the github attribute to avoid authentication issues
-        with patch.object(github_client, 'github', mock_github.return_value):
+        with patch.object(github_client.session, "get", return_value=raw_response(404)):
             # Call the method
             readme = github_client.get_readme("test-user/test-repo")
-            
-            # Assertions
-            assert readme is None
+        
+        # Assertions
+        assert readme is None
     
-    def test_get_readme_error(self, mock_github, github_client):
+    def test_get_readme_error(self, github_client):
         """Test error handling when getting a README."""
-        # Set up mock to raise a non-404 exception
-        mock_github.return_value.get_repo.return_value.get_readme.side_effect = GithubException(
-            status=500, data={"message": "API error"}
-        )
-        
-        # Patch the github attribute to avoid authentication issues
-        with patch.object(github_client, 'github', mock_github.return_value):
+        with patch.object(github_client.session, "get", return_value=raw_response(500)):
             # Call the method
             readme = github_client.get_readme("test-user/test-repo")
-            
-            # Assertions
-            assert readme is None
+        
+        # Assertions
+        assert readme is None
 
 @pytest.mark.unit
-@patch("src.api.github_client.detect")
-@patch("src.api.github_client.Github")
+@patch("src.api.github_client.detect_language")
 class TestReadmeLanguageDetection:
     """Test README language detection."""
     
-    def test_english_readme(self, mock_github, mock_detect, github_client):
-        """Test detecting an English README."""
-        # Set up mocks
-        mock_repo = MagicMock()
-        mock_readme = MagicMock()
-        mock_readme.content = "IyBUZXN0IFJlcG9zaXRvcnkKClRoaXMgaXMgYSB0ZXN0IHJlcG9zaXRvcnkgZm9yIHVuaXQgdGVzdHMu"  # Base64 encoded
+    def test_english_readme(self, mock_detect, github_client):
+        """Test that an ASCII README with English words skips language detection."""
+        with patch.object(github_client.session, "get", return_value=raw_response(200, SAMPLE_README.encode("utf-8"))):
+            # Call the method
+            readme = github_client.get_readme("test-user/test-repo")
         
-        mock_repo.get_readme.return_value = mock_readme
-        mock_github.return_value.get_repo.return_value = mock_repo
+        # Assertions
+        assert readme == SAMPLE_README
+        mock_detect.assert_not_called()
+    
+    def test_non_english_readme(self, mock_detect, github_client):
+        """Test detecting a non-English README."""
+        # Mock language detection to return non-English
+        mock_detect.return_value = "fr"
         
+        # Return the default README, then no root directory listing (no English README found)
+        responses = [raw_response(200, FRENCH_README.encode("utf-8")), raw_response(404)]
+        with patch.object(github_client.session, "get", side_effect=responses):
+            # Call the method
+            readme = github_client.get_readme("test-user/test-repo")
+        
+        # Assertions
+        assert readme == FRENCH_README  # Should return the default README if no English version found
+        mock_detect.assert_called_once()
+    
+    def test_detect_language(self, mock_detect):
+        """Test detecting languages with the reduced set of profiles."""
+        # Call the method
+        languages = [detect_language.__wrapped__(FRENCH_README), detect_language.__wrapped__("这是一个用于单元测试的测试仓库")]
+        
+        # Assertions
+        assert languages == ["fr", "zh-cn"]
+
+@pytest.mark.unit
+class TestGetReadmesAsync:
+    """Test the concurrent README fetching methods."""
+    
+    @patch("src.api.github_client.detect_language")
+    def test_get_readme_async(self, mock_detect, github_client):
+        """Test getting a repository README with an aiohttp session."""
         # Mock language detection to return English
         mock_detect.return_value = "en"
         
-        # Patch the github attribute to avoid authentication issues
-        with patch.object(github_client, 'github', mock_github.return_value):
-            # Call the method
-            readme = github_client.get_readme("test-user/test-repo")
-            
-            # Assertions
-            assert readme == SAMPLE_README
-            mock_detect.assert_called_once()
+        # Set up the session to return the raw README
+        session = MagicMock()
+        session.get.return_value = MockResponse(200, SAMPLE_README.encode("utf-8"))
+        
+        # Call the method
+        readme = asyncio.run(github_client.get_readme_async(session, "test-user/test-repo"))
+        
+        # Assertions
+        assert readme == SAMPLE_README
+        session.get.assert_called_once_with("https://api.github.com/repos/test-user/test-repo/readme", headers={"Accept": RAW_MEDIA_TYPE})
     
-    def test_non_english_readme(self, mock_github, mock_detect, github_client):
-        """Test detecting a non-English README."""
-        # Set up mocks for default README
-        mock_repo = MagicMock()
-        mock_readme = MagicMock()
-        mock_readme.content = "IyBUZXN0IFJlcG9zaXRvcnkKClRoaXMgaXMgYSB0ZXN0IHJlcG9zaXRvcnkgZm9yIHVuaXQgdGVzdHMu"  # Base64 encoded
+    def test_get_readme_async_not_found(self, github_client):
+        """Test getting a README that doesn't exist with an aiohttp session."""
+        # Set up the session to return 404 for every request
+        session = MagicMock()
+        session.get.return_value = MockResponse(404)
         
-        mock_repo.get_readme.return_value = mock_readme
-        mock_github.return_value.get_repo.return_value = mock_repo
+        # Call the method
+        readme = asyncio.run(github_client.get_readme_async(session, "test-user/test-repo"))
         
-        # Mock language detection to return non-English
-        mock_detect.return_value = "fr"
+        # Assertions
+        assert readme is None
+    
+    @patch("src.api.github_client.detect_language")
+    def test_get_readme_async_records_etag(self, mock_detect, github_client):
+        """Test that the README ETag is recorded."""
+        # Mock language detection to return English
+        mock_detect.return_value = "en"
+        
+        # Set up the session to return the README with an ETag
+        session = MagicMock()
+        session.get.return_value = MockResponse(200, SAMPLE_README.encode("utf-8"), headers={"ETag": '"abc"'})
+        etags = {}
+        
+        # Call the method
+        readme = asyncio.run(github_client.get_readme_async(session, "test-user/test-repo", etags))
+        
+        # Assertions
+        assert readme == SAMPLE_README
+        assert etags == {"test-user/test-repo": '"abc"'}
+    
+    def test_get_readme_async_not_modified(self, github_client):
+        """Test that an unchanged README is reported without downloading it."""
+        # Set up the session to return 304 Not Modified
+        session = MagicMock()
+        session.get.return_value = MockResponse(304)
+        etags = {"test-user/test-repo": '"abc"'}
+        
+        # Call the method
+        readme = asyncio.run(github_client.get_readme_async(session, "test-user/test-repo", etags))
+        
+        # Assertions
+        assert readme is README_NOT_MODIFIED
+        session.get.assert_called_once_with(
+            "https://api.github.com/repos/test-user/test-repo/readme",
+            headers={"Accept": RAW_MEDIA_TYPE, "If-None-Match": '"abc"'}
+        )
+    
+    @patch("src.api.github_client.asyncio.sleep", new_callable=AsyncMock)
+    @patch("src.api.github_client.detect_language")
+    def test_get_readme_async_rate_limited(self, mock_detect, mock_sleep, mock_env_api_key):
+        """Test that a rate limited request is retried after the requested delay."""
+        # Mock language detection to return English
+        mock_detect.return_value = "en"
+        client = GitHubClient({"max_retries": 2})
+        
+        # Set up the session to be rate limited once before returning the README
+        session = MagicMock()
+        session.get.side_effect = [
+            MockResponse(403, headers={"Retry-After": "5"}),
+            MockResponse(200, SAMPLE_README.encode("utf-8"))
+        ]
+        
+        # Call the method
+        readme = asyncio.run(client.get_readme_async(session, "test-user/test-repo"))
+        
+        # Assertions
+        assert readme == SAMPLE_README
+        mock_sleep.assert_awaited_once_with(5.0)
+    
+    @patch("src.api.github_client.detect_language")
+    def test_get_readme_async_english_readme(self, mock_detect, github_client):
+        """Test that an English README is found from a single root directory listing."""
+        # Mock language detection to return non-English for the default README
+        mock_detect.return_value = "zh"
+        
+        # Set up the session to return the default README, the root tree and the English README blob
+        session = MagicMock()
+        session.get.side_effect = [
+            MockResponse(200, b"README"),
+            MockResponse(200, {"tree": [
+                {"path": "README.md", "type": "blob", "sha": "a1"},
+                {"path": "en", "type": "tree", "sha": "b2"},
+                {"path": "README_EN.md", "type": "blob", "sha": "c3"}
+            ]}),
+            MockResponse(200, SAMPLE_README.encode("utf-8"))
+        ]
+        
+        # Call the method
+        readme = asyncio.run(github_client.get_readme_async(session, "test-user/test-repo"))
+        
+        # Assertions
+        assert readme == SAMPLE_README
+        assert [call.args[0] for call in session.get.call_args_list[1:]] == [
+            "https://api.github.com/repos/test-user/test-repo/git/trees/HEAD",
+            "https://api.github.com/repos/test-user/test-repo/git/blobs/c3"
+        ]
+    
+    @patch("src.api.github_client.detect_language")
+    def test_get_readme_async_prefetched(self, mock_detect, github_client):
+        """Test that a README fetched with the starred repositories is used without a request."""
+        # Mock language detection to return English
+        mock_detect.return_value = "en"
+        github_client.readmes["test-user/test-repo"] = SAMPLE_README
+        session = MagicMock()
+        
+        # Call the method
+        readme = asyncio.run(github_client.get_readme_async(session, "test-user/test-repo"))
+        
+        # Assertions
+        assert readme == SAMPLE_README
+        session.get.assert_not_called()
+        assert github_client.readmes == {}
+    
+    def test_get_readmes(self, github_client):
+        """Test fetching READMEs for several repositories concurrently."""
+        async def fake_get_readme(session, repo_full_name, etags=None):
+            if repo_full_name == "test-user/broken-repo":
+                raise Exception("Test error")
+            return f"README for {repo_full_name}"
+        
+        callback = MagicMock()
+        with patch.object(github_client, "get_readme_async", AsyncMock(side_effect=fake_get_readme)):
+            # Call the method
+            readmes = github_client.get_readmes(["test-user/test-repo", "test-user/broken-repo"], concurrency=2, callback=callback)
         
-        # Patch the github attribute to avoid authentication issues
-        with patch.object(github_client, 'github', mock_github.return_value):
-            # Set up mock for session.get to return None (no English README found)
-            with patch.object(github_client.session, "get") as mock_get:
-                mock_response = MagicMock()
-                mock_response.status_code = 404
-                mock_get.return_value = mock_response
-                
-                # Call the method
-                readme = github_client.get_readme("test-user/test-repo")
-                
-                # Assertions
-                assert readme == SAMPLE_README  # Should return the default README if no English version found
-                mock_detect.assert_called_once()
+        # Assertions
+        assert readmes == {
+            "test-user/test-repo": "README for test-user/test-repo",
+            "test-user/broken-repo": None
+        }
+        assert callback.call_count == 2
+        callback.assert_any_call("test-user/test-repo", "README for test-user/test-repo")
+        callback.assert_any_call("test-user/broken-repo", None)
 
 @pytest.mark.api
 @pytest.mark.slow
@@ -58,8 +58,15 @@ def mock_github_client():
     # Mock the get_starred_repositories method
     client.get_starred_repositories.return_value = [SAMPLE_REPO]
     
-    # Mock the get_readme method
+    # Mock the get_readme and get_readmes methods
     client.get_readme.return_value = SAMPLE_README
+    def get_readmes(names, etags=None, callback=None):
+        for name in names:
+            if callback is not None:
+                callback(name, SAMPLE_README)
+        return {name: SAMPLE_README for name in names}
+    
+    client.get_readmes.side_effect = get_readmes
     
     return client
 
@@ -3,11 +3,13 @@ Tests for the search engine.
 """
 
 import pytest
+import bm25s
 import numpy as np
 from unittest.mock import patch, MagicMock
 
 # Import the module to test
-from src.search.search_engine import SearchEngine
+from src.search.search_engine import SearchEngine, bm25_top_k, fuse_scores, term_max_scores, tokenize_query
+from src.storage.storage_manager import build_repository_columns
 
 # Sample test data
 SAMPLE_REPO = {
@@ -59,14 +61,17 @@ def mock_embedding_manager():
     return embedding_manager
 
 @pytest.fixture
-def mock_storage_manager():
+def mock_storage_manager(tmp_path):
     """Create a mock storage manager."""
     storage_manager = MagicMock()
     
-    # Mock the get_all_repositories method
-    storage_manager.get_all_repositories.return_value = {
-        12345: SAMPLE_REPO
-    }
+    # Persist the BM25 index in a temporary directory
+    storage_manager.get_bm25_path.return_value = tmp_path / "bm25"
+    storage_manager.get_index_version.return_value = "test-version"
+    storage_manager.get_stored_at_map.return_value = {12345: "2023-01-01T00:00:00"}
+    
+    # Mock the get_repository_ids method
+    storage_manager.get_repository_ids.return_value = [12345]
     
     # Mock the get_repository_readme method
     storage_manager.get_repository_readme.return_value = "# Test Repository\n\nThis is a test repository for unit tests."
@@ -74,6 +79,22 @@ def mock_storage_manager():
     # Mock the get_repository method
     storage_manager.get_repository.return_value = SAMPLE_REPO
     
+    # Look up several repositories through get_repository
+    storage_manager.get_repositories.side_effect = lambda repo_ids: {
+        int(repo_id): storage_manager.get_repository(int(repo_id)) for repo_id in repo_ids if storage_manager.get_repository(int(repo_id))
+    }
+    
+    # Load the repositories and READMEs through get_repository and get_repository_readme
+    storage_manager.iter_repositories_with_readme.side_effect = lambda repo_ids: [
+        (repo_id, storage_manager.get_repository(repo_id), storage_manager.get_repository_readme(repo_id)) for repo_id in repo_ids
+    ]
+    
+    # Repositories are stored without tokens unless a test sets them
+    storage_manager.iter_repository_tokens.side_effect = lambda repo_ids: [(repo_id, None) for repo_id in repo_ids]
+    
+    # Mock the get_repository_columns method
+    storage_manager.get_repository_columns.return_value = build_repository_columns({12345: SAMPLE_REPO})
+    
     return storage_manager
 
 @pytest.fixture
@@ -95,8 +116,9 @@ def search_engine(mock_embedding_manager, mock_storage_manager):
     engine.bm25_documents = [["test", "repository", "for", "unit", "tests"]]
     engine.bm25_repo_map = {0: 12345}
     
-    # Mock the BM25 get_scores method
-    engine.bm25_index.get_scores.return_value = np.array([5.0])
+    # Mock the BM25 retrieval
+    engine.bm25_index.scores = {"num_docs": 1}
+    engine._retrieve_bm25 = MagicMock(return_value=(np.array([0]), np.array([5.0])))
     
     return engine
 
@@ -165,8 +187,8 @@ class TestInitializeBM25Index:
         # Create the search engine with hybrid_enabled=False to prevent automatic initialization
         engine = SearchEngine({"hybrid_enabled": False}, mock_embedding_manager, mock_storage_manager)
         
-        # Mock BM25Okapi
-        with patch("src.search.search_engine.BM25Okapi") as mock_bm25_class:
+        # Mock BM25
+        with patch("src.search.search_engine.bm25s.BM25") as mock_bm25_class:
             # Set up the mock
             mock_bm25_instance = MagicMock()
             mock_bm25_class.return_value = mock_bm25_instance
@@ -179,16 +201,16 @@ class TestInitializeBM25Index:
             assert len(engine.bm25_documents) > 0
             assert len(engine.bm25_repo_map) > 0
             
-            # Check that the BM25Okapi constructor was called with the documents
+            # Check that the BM25 index was built from the documents
             mock_bm25_class.assert_called_once()
-            args, kwargs = mock_bm25_class.call_args
+            args, kwargs = mock_bm25_instance.index.call_args
             assert len(args[0]) > 0  # Should have at least one document
     
-    @patch("src.search.search_engine.BM25Okapi")
+    @patch("src.search.search_engine.bm25s.BM25")
     def test_initialize_bm25_index_no_repositories(self, mock_bm25_class, mock_embedding_manager, mock_storage_manager):
         """Test initializing the BM25 index with no repositories."""
-        # Mock the get_all_repositories method to return an empty dictionary
-        mock_storage_manager.get_all_repositories.return_value = {}
+        # Mock the get_repository_ids method to return an empty list
+        mock_storage_manager.get_repository_ids.return_value = []
         
         # Create the search engine
         engine = SearchEngine({}, mock_embedding_manager, mock_storage_manager)
@@ -201,7 +223,7 @@ class TestInitializeBM25Index:
         assert engine.bm25_documents == []
         assert engine.bm25_repo_map == {}
         
-        # Check that the BM25Okapi constructor was not called
+        # Check that the BM25 index was not built
         mock_bm25_class.assert_not_called()
     
     def test_initialize_bm25_index_no_readme(self, mock_embedding_manager, mock_storage_manager):
@@ -212,8 +234,8 @@ class TestInitializeBM25Index:
         # Create the search engine with hybrid_enabled=False to prevent automatic initialization
         engine = SearchEngine({"hybrid_enabled": False}, mock_embedding_manager, mock_storage_manager)
         
-        # Mock BM25Okapi
-        with patch("src.search.search_engine.BM25Okapi") as mock_bm25_class:
+        # Mock BM25
+        with patch("src.search.search_engine.bm25s.BM25") as mock_bm25_class:
             # Set up the mock
             mock_bm25_instance = MagicMock()
             mock_bm25_class.return_value = mock_bm25_instance
@@ -226,9 +248,90 @@ class TestInitializeBM25Index:
             assert len(engine.bm25_documents) > 0
             assert len(engine.bm25_repo_map) > 0
             
-            # Check that the BM25Okapi constructor was called with the documents
+            # Check that the BM25 index was built
             mock_bm25_class.assert_called_once()
 
+@pytest.mark.unit
+class TestPersistedBM25Index:
+    """Test persisting the BM25 index."""
+    
+    def test_index_reloaded(self, mock_embedding_manager, mock_storage_manager):
+        """Test that a second search engine loads the index instead of reading READMEs."""
+        engine = SearchEngine({}, mock_embedding_manager, mock_storage_manager)
+        mock_storage_manager.get_repository_readme.reset_mock()
+        
+        # Create a second search engine
+        reloaded = SearchEngine({}, mock_embedding_manager, mock_storage_manager)
+        
+        # Assertions
+        mock_storage_manager.get_repository_readme.assert_not_called()
+        assert reloaded.bm25_documents == engine.bm25_documents
+        assert reloaded.bm25_repo_map == engine.bm25_repo_map
+        np.testing.assert_allclose(
+            reloaded.bm25_index.get_scores(["test", "repository"]),
+            engine.bm25_index.get_scores(["test", "repository"])
+        )
+    
+    def test_index_memory_mapped(self, mock_embedding_manager, mock_storage_manager):
+        """Test that the reloaded score arrays are mapped from disk."""
+        engine = SearchEngine({}, mock_embedding_manager, mock_storage_manager)
+        
+        # Create a second search engine
+        reloaded = SearchEngine({}, mock_embedding_manager, mock_storage_manager)
+        
+        # Assertions
+        assert isinstance(reloaded.bm25_index.scores["data"], np.memmap)
+        assert isinstance(reloaded.bm25_max_scores, np.memmap)
+        np.testing.assert_array_equal(reloaded.bm25_max_scores, engine.bm25_max_scores)
+        assert [result["score"] for result in reloaded._keyword_search("unit tests", limit=2)] == \
+            [result["score"] for result in engine._keyword_search("unit tests", limit=2)]
+    
+    def test_index_rebuilt_when_outdated(self, mock_embedding_manager, mock_storage_manager):
+        """Test that the index is rebuilt after repositories are stored."""
+        SearchEngine({}, mock_embedding_manager, mock_storage_manager)
+        mock_storage_manager.get_repository_readme.reset_mock()
+        mock_storage_manager.get_index_version.return_value = "new-version"
+        mock_storage_manager.get_stored_at_map.return_value = {12345: "2023-01-02T00:00:00"}
+        
+        # Create a second search engine
+        SearchEngine({}, mock_embedding_manager, mock_storage_manager)
+        
+        # Assertions
+        mock_storage_manager.get_repository_readme.assert_called()
+    
+    def test_index_rebuilt_from_cached_tokens(self, mock_embedding_manager, mock_storage_manager):
+        """Test that a rebuild only tokenizes repositories stored since the last build."""
+        engine = SearchEngine({}, mock_embedding_manager, mock_storage_manager)
+        mock_storage_manager.get_repository_readme.reset_mock()
+        
+        # Store another repository
+        other_repo = dict(SAMPLE_REPO, id=67890, description="Another repository")
+        mock_storage_manager.get_repository_ids.return_value = [12345, 67890]
+        mock_storage_manager.get_stored_at_map.return_value = {12345: "2023-01-01T00:00:00", 67890: "2023-01-02T00:00:00"}
+        mock_storage_manager.get_index_version.return_value = "new-version"
+        
+        # Create a second search engine
+        rebuilt = SearchEngine({}, mock_embedding_manager, mock_storage_manager)
+        
+        # Assertions
+        mock_storage_manager.get_repository_readme.assert_called_once_with(67890)
+        assert rebuilt.bm25_documents[:1] == engine.bm25_documents
+        assert list(rebuilt.bm25_repo_map.values()) == [12345, 67890]
+
+    def test_index_built_from_stored_tokens(self, mock_embedding_manager, mock_storage_manager):
+        """Test that the tokens stored with a repository are indexed without reading its README."""
+        mock_storage_manager.iter_repository_tokens.side_effect = lambda repo_ids: [
+            (repo_id, (["stored", "readme"], ["stored"])) for repo_id in repo_ids
+        ]
+        
+        # Call the method
+        engine = SearchEngine({}, mock_embedding_manager, mock_storage_manager)
+        
+        # Assertions
+        mock_storage_manager.get_repository_readme.assert_not_called()
+        assert engine.bm25_documents == [["stored", "readme", "stored"]]
+        assert engine.bm25_repo_map == {0: 12345}
+
 @pytest.mark.unit
 class TestPreprocessText:
     """Test the _preprocess_text method."""
@@ -242,6 +345,38 @@ class TestPreprocessText:
         assert processed == "this is a test with special characters"
         assert processed.islower()  # Should be lowercase
         assert "-" not in processed  # Special characters should be removed
+    
+    def test_tokenize_text(self, search_engine):
+        """Test tokenizing text for BM25 indexing in a single pass."""
+        # Call the method
+        tokens = search_engine._tokenize_text("  A snake_case TEST,\nwith special-characters! ")
+        
+        # Assertions
+        assert tokens == ["a", "snake_case", "test", "with", "special", "characters"]
+        assert tokens == search_engine._preprocess_text("  A snake_case TEST,\nwith special-characters! ").split()
+
+@pytest.mark.unit
+class TestSearchWithFilters:
+    """Test candidate selection for filtered searches."""
+    
+    def test_filters_widen_candidates(self, mock_embedding_manager, mock_storage_manager):
+        """Test that selective filters search more candidates until enough results match."""
+        engine = SearchEngine({"hybrid_enabled": False}, mock_embedding_manager, mock_storage_manager)
+        other_repo = {**SAMPLE_REPO, "id": 1, "language": "Go"}
+        
+        # Only the deeper candidate list contains a matching repository
+        mock_embedding_manager.search.side_effect = [
+            [{**SAMPLE_NEURAL_RESULTS[0], "repository": other_repo}] * 4,
+            [{**SAMPLE_NEURAL_RESULTS[0], "repository": other_repo}] * 4 + SAMPLE_NEURAL_RESULTS[:1]
+        ]
+        
+        # Call the method
+        results = engine.search("test", filters={"language": "Python"}, limit=1)
+        
+        # Assertions
+        assert len(results) == 1
+        assert results[0]["repository"] == SAMPLE_REPO
+        assert [call.kwargs["limit"] for call in mock_embedding_manager.search.call_args_list] == [4, 16]
 
 @pytest.mark.unit
 class TestKeywordSearch:
@@ -259,15 +394,51 @@ class TestKeywordSearch:
         assert results[0]["repository"] == SAMPLE_REPO
         assert results[0]["chunk_type"] == "bm25"
         
-        # Check that the BM25 get_scores method was called with the correct arguments
-        search_engine.bm25_index.get_scores.assert_called_once()
-        args, kwargs = search_engine.bm25_index.get_scores.call_args
-        assert args[0] == ["test", "repository"]
+        # Check that the BM25 retrieval was called with the correct arguments
+        search_engine._retrieve_bm25.assert_called_once_with(["test", "repository"], 1)
+    
+    def test_keyword_search_reuses_query_tokens(self, search_engine):
+        """Test that repeated queries are only tokenized once."""
+        tokenize_query.cache_clear()
+        
+        # Call the method
+        search_engine._keyword_search("Test repository!")
+        search_engine._keyword_search("Test repository!")
+        
+        # Assertions
+        assert tokenize_query.cache_info().hits == 1
+        assert search_engine._retrieve_bm25.call_args[0][0] == ["test", "repository"]
+    
+    def test_keyword_search_top_k(self, mock_embedding_manager, mock_storage_manager):
+        """Test that the top documents of a real index are returned best first."""
+        other_repo = dict(SAMPLE_REPO, id=67890, description="Unit tests")
+        mock_storage_manager.get_repository_ids.return_value = [12345, 67890]
+        mock_storage_manager.get_repository.side_effect = {12345: SAMPLE_REPO, 67890: other_repo}.get
+        engine = SearchEngine({"min_score": 0.0}, mock_embedding_manager, mock_storage_manager)
+        
+        # Call the method with a limit larger than the index
+        results = engine._keyword_search("unit tests", limit=10)
+        
+        # Assertions
+        assert len(results) == len(engine.bm25_documents) == 2
+        assert results[0]["score"] > results[1]["score"]
+        assert results[0]["repository"] == other_repo
+        assert results[1]["text"].startswith("test repository this is a test repository for unit tests a test repository")
+    
+    def test_keyword_search_one_document_per_repository(self, mock_embedding_manager, mock_storage_manager):
+        """Test that the README and description of a repository are scored as one weighted document."""
+        engine = SearchEngine({"min_score": 0.0}, mock_embedding_manager, mock_storage_manager)
+        weighted = SearchEngine({"min_score": 0.0, "description_weight": 1}, mock_embedding_manager, mock_storage_manager)
+        
+        # Assertions
+        assert engine.bm25_repo_map == {0: 12345}
+        assert engine.bm25_index.scores["num_docs"] == 1
+        assert weighted.bm25_index.get_scores(["a"])[0] < engine.bm25_index.get_scores(["a"])[0]
     
     def test_keyword_search_no_results(self, search_engine):
         """Test keyword search with no results."""
-        # Mock the get_scores method to return low scores
-        search_engine.bm25_index.get_scores.return_value = np.array([0.1])
+        # Mock the retrieval to return low scores
+        search_engine._retrieve_bm25.return_value = (np.array([0]), np.array([0.1]))
         
         # Call the method
         results = search_engine._keyword_search("test repository")
@@ -360,6 +531,36 @@ class TestMergeResults:
         repo1_found = any(r["repository"]["id"] == 12345 for r in merged)
         assert repo1_found, "First repository not found in results"
     
+    def test_merge_results_shown_text(self, search_engine):
+        """Test that the keyword match text is only shown for weak neural matches."""
+        weak_neural_results = [dict(SAMPLE_NEURAL_RESULTS[0], score=0.4)]
+        
+        # Call the method
+        strong = search_engine._merge_results(SAMPLE_NEURAL_RESULTS, SAMPLE_KEYWORD_RESULTS)
+        weak = search_engine._merge_results(weak_neural_results, SAMPLE_KEYWORD_RESULTS)
+        
+        # Assertions
+        assert strong[0]["text"] == SAMPLE_NEURAL_RESULTS[0]["text"]
+        assert strong[0]["chunk_type"] == "readme_section"
+        assert weak[0]["text"] == SAMPLE_KEYWORD_RESULTS[0]["text"]
+        assert weak[0]["chunk_type"] == "bm25"
+        assert weak[0]["neural_score"] == 0.4
+    
+    def test_merge_results_limit(self, search_engine):
+        """Test that the top results selected with a limit match the full ranking."""
+        scores = np.random.default_rng(0).random(50)
+        neural_results = [
+            dict(SAMPLE_NEURAL_RESULTS[0], score=float(score), repository=dict(SAMPLE_REPO, id=i))
+            for i, score in enumerate(scores)
+        ]
+        
+        # Call the method
+        merged = search_engine._merge_results(neural_results, SAMPLE_KEYWORD_RESULTS)
+        limited = search_engine._merge_results(neural_results, SAMPLE_KEYWORD_RESULTS, limit=5)
+        
+        # Assertions
+        assert limited == merged[:5]
+    
     def test_merge_results_empty(self, search_engine):
         """Test merging empty results."""
         # Call the method with empty lists
@@ -368,6 +569,63 @@ class TestMergeResults:
         # Assertions
         assert merged == []
 
+@pytest.mark.unit
+class TestFuseScores:
+    """Test the fuse_scores function."""
+    
+    def test_fuse_scores(self):
+        """Test that keyword scores are normalized and combined with neural scores."""
+        # Call the method
+        scores, keyword_scores = fuse_scores(np.array([0.9, 0.0, 0.5]), np.array([5.0, 20.0, 0.0]), 0.7, 0.3)
+        
+        # Assertions
+        np.testing.assert_allclose(keyword_scores, [0.5, 1.0, 0.0])
+        np.testing.assert_allclose(scores, [0.7 * 0.9 + 0.3 * 0.5, 0.3, 0.7 * 0.5])
+
+@pytest.mark.unit
+class TestBM25TopK:
+    """Test the bm25_top_k function."""
+    
+    def test_bm25_top_k_matches_full_scoring(self):
+        """Test that pruned retrieval returns the best scores of full scoring."""
+        rng = np.random.default_rng(0)
+        bm25 = bm25s.BM25()
+        bm25.index([[f"t{x}" for x in rng.zipf(1.5, 50) if x < 200] for _ in range(300)], show_progress=False)
+        scores = bm25.scores
+        max_scores = term_max_scores(scores["data"], scores["indptr"])
+        
+        for tokens in (["t1", "t2", "t50", "t120"], ["t1"], ["t150", "t1", "t3"]):
+            query_tokens_ids = np.array(bm25.get_tokens_ids(tokens), dtype=np.int32)
+            
+            # Call the method
+            top, top_scores = bm25_top_k(
+                scores["data"], scores["indptr"], scores["indices"], scores["num_docs"],
+                query_tokens_ids, max_scores, 10
+            )
+            
+            # Assertions
+            expected = bm25.get_scores(tokens)
+            np.testing.assert_allclose(top_scores, np.sort(expected)[::-1][:10], rtol=1e-5)
+            np.testing.assert_allclose(expected[top], top_scores, rtol=1e-5)
+    
+    def test_bm25_top_k_fewer_matches_than_k(self):
+        """Test that documents without a match fill up the results."""
+        bm25 = bm25s.BM25()
+        bm25.index([["json", "parser"], ["image", "resizer"], ["json"]], show_progress=False)
+        scores = bm25.scores
+        
+        # Call the method
+        top, top_scores = bm25_top_k(
+            scores["data"], scores["indptr"], scores["indices"], scores["num_docs"],
+            np.array(bm25.get_tokens_ids(["parser"]), dtype=np.int32),
+            term_max_scores(scores["data"], scores["indptr"]), 3
+        )
+        
+        # Assertions
+        assert top[0] == 0
+        assert sorted(top.tolist()) == [0, 1, 2]
+        assert top_scores[1:].tolist() == [0, 0]
+
 @pytest.mark.unit
 class TestApplyFilters:
     """Test the _apply_filters method."""
@@ -435,6 +693,20 @@ class TestApplyFilters:
         filtered = search_engine._apply_filters(SAMPLE_NEURAL_RESULTS, filters)
         assert len(filtered) == 2
     
+    def test_apply_filters_fractional_values(self, search_engine, mock_storage_manager):
+        """Test that column filters compare fractional values like the per-repository rules."""
+        repo = dict(SAMPLE_REPO, stargazers_count=100.7)
+        results = [dict(result, repository=repo) for result in SAMPLE_NEURAL_RESULTS]
+        mock_storage_manager.get_repository_columns.return_value = build_repository_columns({12345: repo})
+        filters = {"stargazers_count": {"max": 100.5}}
+        
+        # Call the method
+        filtered = search_engine._apply_filters(results, filters)
+        
+        # Assertions
+        assert filtered == []
+        assert search_engine._matches_filters(repo, filters) is False
+    
     def test_apply_filters_multiple(self, search_engine):
         """Test applying multiple filters."""
         # Create filters
@@ -459,6 +731,17 @@ class TestApplyFilters:
         
         filtered = search_engine._apply_filters(SAMPLE_NEURAL_RESULTS, filters)
         assert filtered == []
+    
+    def test_apply_filters_repository_without_columns(self, search_engine):
+        """Test that repositories stored after the columns were built are still filtered."""
+        other_repo = dict(SAMPLE_REPO, id=67890, language="Go")
+        results = SAMPLE_NEURAL_RESULTS + [dict(SAMPLE_NEURAL_RESULTS[0], repository=other_repo)]
+        
+        # Call the method
+        filtered = search_engine._apply_filters(results, {"language": "Go", "stargazers_count": {"min": 50}})
+        
+        # Assertions
+        assert [result["repository"]["id"] for result in filtered] == [67890]
 
 @pytest.mark.unit
 class TestSearch:
@@ -494,6 +777,31 @@ class TestSearch:
             search_engine.embedding_manager.search.assert_called_once_with("test query", limit=20)
             mock_keyword_search.assert_called_once_with("test query", limit=20)
     
+    def test_search_per_call_settings(self, search_engine):
+        """Test that weights and hybrid search given to a search only apply to it."""
+        with patch.object(search_engine, '_keyword_search', return_value=SAMPLE_KEYWORD_RESULTS) as mock_keyword_search:
+            # Call the method
+            keyword_results = search_engine.search("test query", neural_weight=0.0, keyword_weight=1.0)
+            neural_results = search_engine.search("test query", hybrid_enabled=False)
+            
+            # Assertions
+            assert keyword_results[0]["score"] == pytest.approx(0.5)
+            assert neural_results[0]["score"] == 0.9
+            mock_keyword_search.assert_called_once()
+            assert search_engine.neural_weight == 0.7
+            assert search_engine.hybrid_enabled is True
+    
+    def test_keyword_search_only(self, search_engine):
+        """Test that a keyword-only search skips the neural search."""
+        with patch.object(search_engine, '_keyword_search', return_value=SAMPLE_KEYWORD_RESULTS):
+            # Call the method
+            results = search_engine.keyword_search("test query", filters={"language": "Python"})
+        
+        # Assertions
+        assert len(results) == 1
+        assert results[0]["score"] == pytest.approx(0.5)
+        search_engine.embedding_manager.search.assert_not_called()
+    
     def test_search_with_filters(self, search_engine):
         """Test search with filters."""
         # Mock the _apply_filters method
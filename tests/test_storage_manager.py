@@ -7,11 +7,13 @@ import json
 import shutil
 import tempfile
 import pytest
+import numpy as np
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
 # Import the module to test
-from src.storage.storage_manager import StorageManager
+from src.storage.storage_manager import StorageManager, build_repository_columns, read_json
+from src.processor.content_processor import tokenize_text
 
 # Sample test data
 SAMPLE_REPO = {
@@ -241,6 +243,37 @@ class TestGetRepository:
         # Assertions
         assert repo == SAMPLE_REPO
     
+    def test_get_repository_cached(self, storage_manager):
+        """Test that metadata is read from disk once and updated when stored."""
+        storage_manager.store_repository(SAMPLE_REPO, SAMPLE_README, SAMPLE_CHUNKS)
+        
+        # Forget the stored metadata, as in a new process
+        storage_manager._metadata_cache.clear()
+        
+        # Call the method
+        with patch("src.storage.storage_manager.read_json", wraps=read_json) as mock_read:
+            first = storage_manager.get_repository(SAMPLE_REPO["id"])
+            second = storage_manager.get_repository(str(SAMPLE_REPO["id"]))
+        
+        storage_manager.update_repository_metadata(dict(SAMPLE_REPO, stargazers_count=200))
+        
+        # Assertions
+        assert mock_read.call_count == 1
+        assert first == second == SAMPLE_REPO
+        assert storage_manager.get_repository(SAMPLE_REPO["id"])["stargazers_count"] == 200
+    
+    def test_get_repository_cached_copy(self, storage_manager):
+        """Test that changing returned or stored metadata leaves the cached metadata unchanged."""
+        repo = dict(SAMPLE_REPO)
+        storage_manager.store_repository(repo, SAMPLE_README, SAMPLE_CHUNKS)
+        
+        # Call the method and change the results
+        repo["stargazers_count"] = 0
+        storage_manager.get_repository(SAMPLE_REPO["id"])["score"] = 0.9
+        
+        # Assertions
+        assert storage_manager.get_repository(SAMPLE_REPO["id"]) == SAMPLE_REPO
+    
     def test_get_repository_not_found(self, storage_manager):
         """Test getting a repository that doesn't exist."""
         # Call the method
@@ -248,6 +281,41 @@ class TestGetRepository:
         
         # Assertions
         assert repo is None
+    
+    def test_get_repositories(self, storage_manager):
+        """Test getting several repositories, each loaded once."""
+        # Store a repository
+        storage_manager.store_repository(SAMPLE_REPO, SAMPLE_README, SAMPLE_CHUNKS)
+        
+        # Call the method
+        with patch.object(storage_manager, "get_repository", wraps=storage_manager.get_repository) as mock_get:
+            repositories = storage_manager.get_repositories([SAMPLE_REPO["id"], str(SAMPLE_REPO["id"]), 99999])
+        
+        # Assertions
+        assert repositories == {SAMPLE_REPO["id"]: storage_manager.get_repository(SAMPLE_REPO["id"])}
+        assert mock_get.call_count == 2
+
+    def test_iter_repositories_with_readme(self, storage_manager):
+        """Test loading the metadata and README of several repositories in order."""
+        # Store a repository
+        storage_manager.store_repository(SAMPLE_REPO, SAMPLE_README, SAMPLE_CHUNKS)
+        
+        # Call the method
+        repositories = list(storage_manager.iter_repositories_with_readme([99999, SAMPLE_REPO["id"]]))
+        
+        # Assertions
+        assert repositories == [(99999, None, None), (SAMPLE_REPO["id"], SAMPLE_REPO, SAMPLE_README)]
+    
+    def test_iter_repository_tokens(self, storage_manager):
+        """Test that the BM25 tokens of a repository are stored with it."""
+        # Store a repository
+        storage_manager.store_repository(SAMPLE_REPO, SAMPLE_README, SAMPLE_CHUNKS)
+        
+        # Call the method
+        tokens = list(storage_manager.iter_repository_tokens([99999, SAMPLE_REPO["id"]]))
+        
+        # Assertions
+        assert tokens == [(99999, None), (SAMPLE_REPO["id"], (tokenize_text(SAMPLE_README), tokenize_text(SAMPLE_REPO["description"])))]
 
 @pytest.mark.unit
 class TestGetRepositoryReadme:
@@ -287,6 +355,18 @@ class TestGetRepositoryChunks:
         # Assertions
         assert chunks == SAMPLE_CHUNKS
     
+    @patch("src.storage.storage_manager.orjson", None)
+    def test_get_repository_chunks_without_orjson(self, storage_manager):
+        """Test that chunks are stored and loaded with the standard library without orjson."""
+        # First store the repository
+        storage_manager.store_repository(SAMPLE_REPO, SAMPLE_README, SAMPLE_CHUNKS)
+        
+        # Call the method
+        chunks = storage_manager.get_repository_chunks(SAMPLE_REPO["id"])
+        
+        # Assertions
+        assert chunks == SAMPLE_CHUNKS
+    
     def test_get_repository_chunks_not_found(self, storage_manager):
         """Test getting chunks for a repository that doesn't exist."""
         # Call the method
@@ -360,6 +440,48 @@ class TestIsRepositoryOutdated:
         # Assertions
         assert is_outdated is True
 
+@pytest.mark.unit
+class TestRepositoryUpdates:
+    """Test updating stored repositories without a new push."""
+    
+    def test_get_pushed_at_map(self, storage_manager):
+        """Test getting the push time of every stored repository."""
+        # First store the repository
+        storage_manager.store_repository(SAMPLE_REPO, SAMPLE_README, SAMPLE_CHUNKS)
+        
+        # Call the method
+        pushed_at = storage_manager.get_pushed_at_map()
+        
+        # Assertions
+        assert pushed_at == {SAMPLE_REPO["id"]: SAMPLE_REPO.get("pushed_at")}
+    
+    def test_update_repository_metadata(self, storage_manager):
+        """Test that metadata is updated and the README and chunks are kept."""
+        # First store the repository
+        storage_manager.store_repository(SAMPLE_REPO, SAMPLE_README, SAMPLE_CHUNKS)
+        
+        # Call the method with more stars
+        updated_repo = {**SAMPLE_REPO, "stargazers_count": 500, "updated_at": "2022-02-01T00:00:00Z"}
+        result = storage_manager.update_repository_metadata(updated_repo)
+        
+        # Assertions
+        assert result is True
+        assert storage_manager.get_repository(SAMPLE_REPO["id"]) == updated_repo
+        assert storage_manager.get_repository_readme(SAMPLE_REPO["id"]) == SAMPLE_README
+        assert storage_manager.is_repository_outdated(updated_repo) is False
+        assert storage_manager.update_repository_metadata({**SAMPLE_REPO, "id": 99999}) is False
+    
+    def test_update_repository_metadata_tokens(self, storage_manager):
+        """Test that the description tokens follow the metadata and the README tokens are kept."""
+        # First store the repository
+        storage_manager.store_repository(SAMPLE_REPO, SAMPLE_README, SAMPLE_CHUNKS)
+        
+        # Call the method with a new description
+        storage_manager.update_repository_metadata({**SAMPLE_REPO, "description": "Renamed project"})
+        
+        # Assertions
+        assert storage_manager.get_repository_tokens(SAMPLE_REPO["id"]) == (tokenize_text(SAMPLE_README), ["renamed", "project"])
+
 @pytest.mark.unit
 class TestMarkRepositoryEmbedded:
     """Test the mark_repository_embedded method."""
@@ -382,6 +504,121 @@ class TestMarkRepositoryEmbedded:
         
         # Assertions
         assert "99999" not in storage_manager.repository_index
+    
+    def test_mark_repositories_embedded(self, storage_manager):
+        """Test that several repositories are marked embedded with one index save."""
+        # First store the repository
+        storage_manager.store_repository(SAMPLE_REPO, SAMPLE_README, SAMPLE_CHUNKS)
+        
+        # Call the method
+        with patch.object(storage_manager, "_save_repository_index") as mock_save:
+            storage_manager.mark_repositories_embedded([SAMPLE_REPO["id"], 99999])
+        
+        # Assertions
+        assert storage_manager.repository_index[str(SAMPLE_REPO["id"])]["embedded"] is True
+        assert "99999" not in storage_manager.repository_index
+        mock_save.assert_called_once()
+
+@pytest.mark.unit
+class TestReadmeEtags:
+    """Test the README ETag methods."""
+    
+    def test_get_readme_etags_empty(self, storage_manager):
+        """Test getting ETags when none are stored."""
+        # Call the method
+        etags = storage_manager.get_readme_etags()
+        
+        # Assertions
+        assert etags == {}
+    
+    def test_update_readme_etags(self, storage_manager):
+        """Test storing and merging README ETags."""
+        # Call the method
+        storage_manager.update_readme_etags({"test-user/test-repo": '"abc"', "test-user/other-repo": '"def"'})
+        storage_manager.update_readme_etags({"test-user/test-repo": '"xyz"'})
+        
+        # Assertions
+        assert storage_manager.get_readme_etags() == {
+            "test-user/test-repo": '"xyz"',
+            "test-user/other-repo": '"def"'
+        }
+
+@pytest.mark.unit
+class TestIndexVersion:
+    """Test the get_index_version method."""
+    
+    def test_index_version_changes_on_store(self, storage_manager):
+        """Test that storing a repository changes the index version."""
+        version = storage_manager.get_index_version()
+        
+        # Call the method
+        storage_manager.store_repository(SAMPLE_REPO, SAMPLE_README, SAMPLE_CHUNKS)
+        
+        # Assertions
+        assert storage_manager.get_index_version() != version
+        assert storage_manager.get_index_version() == storage_manager.get_index_version()
+    
+    def test_get_stored_at_map(self, storage_manager):
+        """Test that the storage time of each repository changes when it is stored again."""
+        storage_manager.store_repository(SAMPLE_REPO, SAMPLE_README, SAMPLE_CHUNKS)
+        stored_at = storage_manager.get_stored_at_map()
+        
+        # Call the method
+        storage_manager.update_repository_metadata(dict(SAMPLE_REPO, stargazers_count=200))
+        
+        # Assertions
+        assert list(stored_at) == [SAMPLE_REPO["id"]]
+        assert stored_at[SAMPLE_REPO["id"]] is not None
+        assert storage_manager.get_stored_at_map()[SAMPLE_REPO["id"]] != stored_at[SAMPLE_REPO["id"]]
+
+@pytest.mark.unit
+class TestRepositoryColumns:
+    """Test the repository filter columns."""
+    
+    def test_build_repository_columns(self):
+        """Test that filter fields become one column row per repository."""
+        repositories = {
+            1: {"id": 1, "language": "Python", "stargazers_count": 100, "forks_count": 5},
+            2: {"id": 2, "language": None, "stargazers_count": 7},
+            3: {"id": 3, "language": "Python", "stargazers_count": 3, "forks_count": 1}
+        }
+        
+        # Call the method
+        columns = build_repository_columns(repositories)
+        
+        # Assertions
+        assert columns["rows"] == {1: 0, 2: 1, 3: 2}
+        assert columns["numeric"]["stargazers_count"].tolist() == [100, 7, 3]
+        assert "forks_count" not in columns["numeric"]
+        codes, values = columns["categorical"]["language"]
+        assert codes.tolist() == [0, 1, 0]
+        assert values == {"Python": 0, None: 1}
+    
+    def test_build_repository_columns_float(self):
+        """Test that float values are kept exactly rather than truncated."""
+        repositories = {
+            1: {"id": 1, "stargazers_count": 7.5, "forks_count": 2 ** 40},
+            2: {"id": 2, "stargazers_count": 3, "forks_count": 1}
+        }
+        
+        # Call the method
+        columns = build_repository_columns(repositories)
+        
+        # Assertions
+        assert columns["numeric"]["stargazers_count"].dtype == np.float64
+        assert columns["numeric"]["stargazers_count"].tolist() == [7.5, 3]
+        assert columns["numeric"]["forks_count"].tolist() == [2 ** 40, 1]
+    
+    def test_columns_rebuilt_on_store(self, storage_manager):
+        """Test that storing a repository rebuilds the columns."""
+        columns = storage_manager.get_repository_columns()
+        
+        # Call the method
+        storage_manager.store_repository(SAMPLE_REPO, SAMPLE_README, SAMPLE_CHUNKS)
+        
+        # Assertions
+        assert columns["rows"] == {}
+        assert storage_manager.get_repository_columns()["rows"] == {12345: 0}
 
 @pytest.mark.unit
 class TestHasEmbeddings:
@@ -455,6 +692,20 @@ class TestGetAllRepositories:
         
         # Assertions
         assert repos == {}
+    
+    def test_get_repository_ids(self, storage_manager):
+        """Test getting the repository IDs without reading metadata."""
+        # First store the repository
+        storage_manager.store_repository(SAMPLE_REPO, SAMPLE_README, SAMPLE_CHUNKS)
+        storage_manager._metadata_cache.clear()
+        
+        # Call the method
+        with patch.object(storage_manager, "get_repository") as mock_get_repository:
+            repo_ids = storage_manager.get_repository_ids()
+        
+        # Assertions
+        assert repo_ids == [SAMPLE_REPO["id"]]
+        mock_get_repository.assert_not_called()
 
 @pytest.mark.unit
 class TestGetRepositoryCount: